@@ -41,6 +41,7 @@ from blueprints.python_strategy import python_strategy_bp  # Import the python s
 from blueprints.telegram import telegram_bp  # Import the telegram blueprint
 from blueprints.security import security_bp  # Import the security blueprint
 from blueprints.sandbox import sandbox_bp  # Import the sandbox blueprint
+from blueprints.metrics import metrics_bp  # Import the metrics blueprint
 from services.telegram_bot_service import telegram_bot_service
 from database.telegram_db import get_bot_config
 
@@ -179,6 +180,7 @@ def create_app():
     app.register_blueprint(telegram_bp)  # Register Telegram blueprint
     app.register_blueprint(security_bp)  # Register Security blueprint
     app.register_blueprint(sandbox_bp)  # Register Sandbox blueprint
+    app.register_blueprint(metrics_bp)  # Register Prometheus metrics blueprint
 
 
     # Exempt webhook endpoints from CSRF protection after app initialization
@@ -327,6 +329,10 @@ app = create_app()
 # Explicitly call the setup environment function
 setup_environment(app)
 
+# Schedule pre-market broker connection warmup
+from utils.connection_warmup import start_warmup_scheduler
+start_warmup_scheduler()
+
 # Auto-start execution engine and squareoff scheduler if in analyzer mode
 with app.app_context():
     try:
@@ -11,18 +11,17 @@ from database.auth_db import get_api_key_for_tradingview
 from utils.session import check_session_validity
 from limiter import limiter
 import json
-from datetime import datetime, time
+from datetime import datetime
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
 from utils.logging import get_logger
+from utils.rate_governor import TokenBucket, parse_rate_limit
 import requests
 import os
 import uuid
 import time as time_module
 import queue
 import threading
-from collections import deque
-from time import time
 
 logger = get_logger(__name__)
 
@@ -43,15 +42,21 @@ BASE_URL = os.getenv('HOST_SERVER', 'http://127.0.0.1:5000')
 VALID_EXCHANGES = ['NSE', 'BSE']
 
 # Separate queues for different order types
-regular_order_queue = queue.Queue()  # For placeorder (up to 10/sec)
-smart_order_queue = queue.Queue()    # For placesmartorder (1/sec)
+regular_order_queue = queue.Queue()  # For placeorder
+smart_order_queue = queue.Queue()    # For placesmartorder
 
 # Order processor state
 order_processor_running = False
 order_processor_lock = threading.Lock()
 
-# Rate limiting state for regular orders
-last_regular_orders = deque(maxlen=10)  # Track last 10 regular order timestamps
+# Queue pacing stays within the inbound API limits so queued orders never trip them;
+# the broker rate governor in the services layer paces the broker calls themselves.
+regular_order_bucket = TokenBucket.from_limit(os.getenv('ORDER_QUEUE_RATE_LIMIT', os.getenv('ORDER_RATE_LIMIT', '10 per second')))
+# Smart orders are spaced from completion, not from start: after each one returns, nothing
+# (regular orders included) is sent for one interval (default 1 second), giving the broker
+# time to update the position the next smart order is sized against.
+_smart_count, _smart_period = parse_rate_limit(os.getenv('SMART_ORDER_QUEUE_RATE_LIMIT', '1 per second'))
+SMART_ORDER_GAP_SECONDS = _smart_period / max(_smart_count, 1)
 
 def process_orders():
     """Background task to process orders from both queues with rate limiting"""
@@ -59,57 +64,35 @@ def process_orders():
     
     while True:
         try:
-            # Process smart orders first (1 per second)
+            # Smart orders take priority over regular orders
             try:
-                smart_order = smart_order_queue.get_nowait()
-                if smart_order is None:  # Poison pill
-                    break
-                
-                try:
-                    response = requests.post(f'{BASE_URL}/api/v1/placesmartorder', json=smart_order['payload'])
-                    if response.ok:
-                        logger.info(f'Smart order placed for {smart_order["payload"]["symbol"]} in strategy {smart_order["payload"]["strategy"]}')
-                    else:
-                        logger.error(f'Error placing smart order for {smart_order["payload"]["symbol"]}: {response.text}')
-                except Exception as e:
-                    logger.error(f'Error placing smart order: {str(e)}')
-                
-                # Always wait 1 second after smart order
-                time_module.sleep(1)
-                continue  # Start next iteration
-                
+                order = smart_order_queue.get_nowait()
+                endpoint = 'placesmartorder'
             except queue.Empty:
-                pass  # No smart orders, continue to regular orders
-            
-            # Process regular orders (up to 10 per second)
-            now = time()
-            
-            # Clean up old timestamps
-            while last_regular_orders and now - last_regular_orders[0] > 1:
-                last_regular_orders.popleft()
-            
-            # Process regular orders if under rate limit
-            if len(last_regular_orders) < 10:
                 try:
-                    regular_order = regular_order_queue.get_nowait()
-                    if regular_order is None:  # Poison pill
-                        break
-                    
-                    try:
-                        response = requests.post(f'{BASE_URL}/api/v1/placeorder', json=regular_order['payload'])
-                        if response.ok:
-                            logger.info(f'Regular order placed for {regular_order["payload"]["symbol"]} in strategy {regular_order["payload"]["strategy"]}')
-                            last_regular_orders.append(now)
-                        else:
-                            logger.error(f'Error placing regular order for {regular_order["payload"]["symbol"]}: {response.text}')
-                    except Exception as e:
-                        logger.error(f'Error placing regular order: {str(e)}')
-                        
+                    order = regular_order_queue.get(timeout=0.1)
+                    endpoint = 'placeorder'
                 except queue.Empty:
-                    time_module.sleep(0.1)  # No orders to process
-            else:
-                # Rate limit hit, wait until next second
-                time_module.sleep(0.1)
+                    continue  # No orders to process
+
+            if order is None:  # Poison pill
+                break
+
+            if endpoint == 'placeorder':
+                regular_order_bucket.acquire()
+            order_kind = 'Smart' if endpoint == 'placesmartorder' else 'Regular'
+            try:
+                response = requests.post(f'{BASE_URL}/api/v1/{endpoint}', json=order['payload'])
+                if response.ok:
+                    logger.info(f'{order_kind} order placed for {order["payload"]["symbol"]} in strategy {order["payload"]["strategy"]}')
+                else:
+                    logger.error(f'Error placing {order_kind.lower()} order for {order["payload"]["symbol"]}: {response.text}')
+            except Exception as e:
+                logger.error(f'Error placing {order_kind.lower()} order: {str(e)}')
+
+            if endpoint == 'placesmartorder':
+                # This thread sends every queued order, so sleeping here holds back both queues
+                time_module.sleep(SMART_ORDER_GAP_SECONDS)
                 
         except Exception as e:
             logger.error(f'Error in order processor: {str(e)}')
@@ -1,12 +1,12 @@
 from flask import Blueprint, jsonify, render_template, request, session, Response
-from database.latency_db import OrderLatency, latency_session
+from database.latency_db import (
+    OrderLatency, LatencyRollup, LatencySketch, latency_session, HTTP_SKETCH_STAGES, HTTP_SKETCH_TYPE
+)
 from utils.session import check_session_validity
 from limiter import limiter
 from utils.logging import get_logger
-from sqlalchemy import func
 from collections import defaultdict
-import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
 import csv
 import io
@@ -33,52 +33,7 @@ def format_ist_time(timestamp):
 def get_histogram_data(broker=None):
     """Get histogram data for RTT distribution"""
     try:
-        query = OrderLatency.query
-        if broker:
-            query = query.filter_by(broker=broker)
-        
-        # Get all RTT values
-        rtts = [r[0] for r in query.with_entities(OrderLatency.rtt_ms).all()]
-        
-        if not rtts:
-            return {
-                'bins': [],
-                'counts': [],
-                'avg_rtt': 0,
-                'min_rtt': 0,
-                'max_rtt': 0
-            }
-        
-        # Calculate statistics
-        avg_rtt = sum(rtts) / len(rtts)
-        min_rtt = min(rtts)
-        max_rtt = max(rtts)
-        
-        # Create histogram bins
-        bin_count = 30  # Number of bins
-        bin_width = (max_rtt - min_rtt) / bin_count if max_rtt > min_rtt else 1
-        
-        # Create histogram using numpy
-        counts, bins = np.histogram(rtts, bins=bin_count, range=(min_rtt, max_rtt))
-        
-        # Convert to list for JSON serialization
-        counts = counts.tolist()
-        bins = bins.tolist()
-        
-        # Create bin labels (use the start of each bin)
-        bin_labels = [f"{bins[i]:.1f}" for i in range(len(bins)-1)]
-        
-        data = {
-            'bins': bin_labels,
-            'counts': counts,
-            'avg_rtt': float(avg_rtt),
-            'min_rtt': float(min_rtt),
-            'max_rtt': float(max_rtt)
-        }
-        
-        # logger.info(f"Histogram data for broker {broker}: {data}")  # Commented out to reduce log verbosity
-        return data
-        
+        return LatencyRollup.get_histogram(broker=broker)
     except Exception as e:
         logger.error(f"Error getting histogram data: {e}")
         return {
@@ -123,10 +78,8 @@ def latency_dashboard():
     
     # Get histogram data for each broker
     broker_histograms = {}
-    brokers = [b[0] for b in OrderLatency.query.with_entities(OrderLatency.broker).distinct().all()]
-    for broker in brokers:
-        if broker:  # Skip None values
-            broker_histograms[broker] = get_histogram_data(broker)
+    for broker in LatencyRollup.get_brokers():
+        broker_histograms[broker] = get_histogram_data(broker)
     
     # logger.info(f"Broker histograms data: {broker_histograms}")  # Commented out to reduce log verbosity
     
@@ -203,6 +156,37 @@ def get_broker_stats(broker):
         logger.error(f"Error fetching broker stats: {e}")
         return jsonify({'error': str(e)}), 500
 
+@latency_bp.route('/api/percentiles', methods=['GET'])
+@check_session_validity
+@limiter.limit("60/minute")
+def get_percentiles():
+    """API endpoint to get per-stage latency percentiles over a time window"""
+    try:
+        broker = request.args.get('broker')
+        api_type = request.args.get('api_type')
+        minutes = request.args.get('minutes', type=int)
+        since = datetime.utcnow() - timedelta(minutes=minutes) if minutes else None
+        return jsonify(LatencySketch.get_stage_percentiles(broker=broker, order_type=api_type, since=since))
+    except Exception as e:
+        logger.error(f"Error fetching latency percentiles: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@latency_bp.route('/api/http', methods=['GET'])
+@check_session_validity
+@limiter.limit("60/minute")
+def get_http_phases():
+    """API endpoint to get broker HTTP phase percentiles (connect, TLS, TTFB, total) per host"""
+    try:
+        host = request.args.get('host')
+        minutes = request.args.get('minutes', type=int)
+        since = datetime.utcnow() - timedelta(minutes=minutes) if minutes else None
+        return jsonify(LatencySketch.get_stage_percentiles(
+            broker=host, order_type=HTTP_SKETCH_TYPE, since=since, stages=HTTP_SKETCH_STAGES
+        ))
+    except Exception as e:
+        logger.error(f"Error fetching broker HTTP phase latency: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @latency_bp.route('/export', methods=['GET'])
 @check_session_validity
 @limiter.limit("10/minute")
@@ -0,0 +1,72 @@
+from flask import Blueprint, Response, request, abort
+from utils.metrics import registry, metrics_authorized, CONTENT_TYPE
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+metrics_bp = Blueprint('metrics_bp', __name__)
+
+# Scrapers must send METRICS_TOKEN as a bearer token. There is no loopback exemption:
+# behind a reverse proxy on the same host every request arrives from 127.0.0.1.
+
+def _symbol_cache_collector():
+    """Symbol cache hit/miss counters from BrokerSymbolCache"""
+    from database.token_db_enhanced import get_cache
+    stats = get_cache().stats
+    return [
+        ('openalgo_symbol_cache_hits_total', 'counter', 'Symbol cache hits', [({}, stats.hits)]),
+        ('openalgo_symbol_cache_misses_total', 'counter', 'Symbol cache misses', [({}, stats.misses)]),
+        ('openalgo_symbol_cache_db_queries_total', 'counter', 'Symbol lookups that fell back to the database', [({}, stats.db_queries)]),
+        ('openalgo_symbol_cache_hit_ratio', 'gauge', 'Symbol cache hit ratio (0-1)', [({}, stats.get_hit_rate() / 100)]),
+        ('openalgo_symbol_cache_symbols', 'gauge', 'Symbols loaded in the cache', [({}, stats.total_symbols)]),
+    ]
+
+def _market_data_collector():
+    """Market data service cache metrics"""
+    from services.market_data_service import get_market_data_service
+    metrics = get_market_data_service().get_cache_metrics()
+    return [
+        ('openalgo_market_data_updates_total', 'counter', 'Market data updates processed', [({}, metrics['total_updates'])]),
+        ('openalgo_market_data_cache_hits_total', 'counter', 'Market data cache hits', [({}, metrics['cache_hits'])]),
+        ('openalgo_market_data_cache_misses_total', 'counter', 'Market data cache misses', [({}, metrics['cache_misses'])]),
+        ('openalgo_market_data_symbols', 'gauge', 'Symbols in the market data cache', [({}, metrics['total_symbols'])]),
+        ('openalgo_market_data_subscribers', 'gauge', 'Market data subscribers', [({}, metrics['total_subscribers'])]),
+    ]
+
+def _queue_collector():
+    """Depths of the in-memory write-behind queues"""
+    from utils.traffic_logger import traffic_log_writer
+    from utils.api_key_throttle import invalid_api_key_throttle
+    writer_stats = traffic_log_writer.get_stats()
+    return [
+        ('openalgo_queue_depth', 'gauge', 'Items waiting in in-memory queues', [
+            ({'queue': 'traffic_log'}, writer_stats['queue_depth']),
+            ({'queue': 'invalid_api_key'}, invalid_api_key_throttle.pending_count()),
+        ]),
+        ('openalgo_traffic_log_rows_written_total', 'counter', 'Traffic log rows written', [({}, writer_stats['written'])]),
+        ('openalgo_traffic_log_rows_dropped_total', 'counter', 'Traffic log rows dropped', [({}, writer_stats['dropped'])]),
+    ]
+
+def _http_pool_collector():
+    """Open connections per broker host and traffic class"""
+    from utils.httpx_client import get_pool_stats
+    pools = get_pool_stats()
+    return [
+        ('openalgo_broker_http_connections', 'gauge', 'Open broker HTTP connections per pool', [
+            ({'host': p['host'], 'traffic_class': p['traffic_class']}, p['connections']) for p in pools
+        ]),
+        ('openalgo_broker_http_idle_connections', 'gauge', 'Idle broker HTTP connections per pool', [
+            ({'host': p['host'], 'traffic_class': p['traffic_class']}, p['idle']) for p in pools
+        ]),
+    ]
+
+for _collector in (_symbol_cache_collector, _market_data_collector, _queue_collector, _http_pool_collector):
+    registry.register_collector(_collector)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of the process metrics"""
+    if not metrics_authorized(request.headers.get('Authorization', '')):
+        abort(403)
+
+    return Response(registry.render(), mimetype=CONTENT_TYPE)
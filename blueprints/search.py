@@ -1,3 +1,4 @@
+import os
 from flask import Blueprint, render_template, session, redirect, url_for, request, flash, jsonify
 from database.symbol import enhanced_search_symbols
 from utils.session import check_session_validity
@@ -6,6 +7,9 @@ from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Suggestions returned per request by the search-as-you-type endpoint
+SEARCH_SUGGESTION_LIMIT = int(os.getenv('SEARCH_SUGGESTION_LIMIT', '50'))
+
 search_bp = Blueprint('search_bp', __name__, url_prefix='/search')
 
 @search_bp.route('/token')
@@ -57,13 +61,15 @@ def api_search():
     """API endpoint for AJAX search suggestions"""
     query = request.args.get('q', '').strip()
     exchange = request.args.get('exchange')
+    limit = request.args.get('limit', SEARCH_SUGGESTION_LIMIT, type=int)
+    offset = request.args.get('offset', 0, type=int)
     
     if not query:
         logger.debug("Empty API search query received")
         return jsonify({'results': []})
     
     logger.debug(f"API search for symbol: {query}, exchange: {exchange}")
-    results = enhanced_search_symbols(query, exchange)
+    results = enhanced_search_symbols(query, exchange, limit=limit, offset=offset)
     results_dicts = [{
         'symbol': result.symbol,
         'brsymbol': result.brsymbol,
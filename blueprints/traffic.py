@@ -1,8 +1,7 @@
 from flask import Blueprint, jsonify, render_template, request, session, Response
-from database.traffic_db import TrafficLog, logs_session
+from database.traffic_db import TrafficLog, TrafficRollup, logs_session
 from utils.session import check_session_validity
 from limiter import limiter
-from sqlalchemy import func
 import logging
 from datetime import datetime
 import pytz
@@ -102,20 +101,10 @@ def get_stats():
     """API endpoint to get traffic statistics"""
     try:
         # Get overall stats
-        all_logs = TrafficLog.query
-        overall_stats = {
-            'total_requests': all_logs.count(),
-            'error_requests': all_logs.filter(TrafficLog.status_code >= 400).count(),
-            'avg_duration': round(float(all_logs.with_entities(func.avg(TrafficLog.duration_ms)).scalar() or 0), 2)
-        }
+        overall_stats = TrafficRollup.get_stats()
         
         # Get API-specific stats
-        api_logs = TrafficLog.query.filter(TrafficLog.path.like('/api/v1/%'))
-        api_stats = {
-            'total_requests': api_logs.count(),
-            'error_requests': api_logs.filter(TrafficLog.status_code >= 400).count(),
-            'avg_duration': round(float(api_logs.with_entities(func.avg(TrafficLog.duration_ms)).scalar() or 0), 2)
-        }
+        api_stats = TrafficRollup.get_stats(path_prefix='/api/v1/')
         
         # Get endpoint usage stats
         endpoint_stats = {}
@@ -125,12 +114,11 @@ def get_stats():
             'tradebook', 'positionbook', 'holdings', 'basketorder', 'splitorder',
             'orderstatus', 'openposition'
         ]:
-            path = f'/api/v1/{endpoint}'
-            endpoint_logs = TrafficLog.query.filter(TrafficLog.path.like(f'{path}%'))
+            stats = TrafficRollup.get_stats(path_prefix=f'/api/v1/{endpoint}')
             endpoint_stats[endpoint] = {
-                'total': endpoint_logs.count(),
-                'errors': endpoint_logs.filter(TrafficLog.status_code >= 400).count(),
-                'avg_duration': round(float(endpoint_logs.with_entities(func.avg(TrafficLog.duration_ms)).scalar() or 0), 2)
+                'total': stats['total_requests'],
+                'errors': stats['error_requests'],
+                'avg_duration': stats['avg_duration']
             }
         
         return jsonify({
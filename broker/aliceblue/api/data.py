@@ -641,7 +641,7 @@ class BrokerData:
                 }
                 
                 try:
-                    response = client.post(SCRIP_DETAILS_URL, headers=headers, json=payload, timeout=timeout)
+                    response = client.post(SCRIP_DETAILS_URL, headers=headers, json=payload, timeout=timeout, extensions={'traffic_class': 'data'})
                     response.raise_for_status()
                     data = response.json()
                     
@@ -1092,7 +1092,7 @@ class BrokerData:
             
             # Make request to historical API
             client = get_httpx_client()
-            response = client.post(HISTORICAL_API_URL, headers=headers, json=payload, timeout=10)
+            response = client.post(HISTORICAL_API_URL, headers=headers, json=payload, timeout=10, extensions={'traffic_class': 'data'})
             response.raise_for_status()
             data = response.json()
             
@@ -8,9 +8,13 @@ from database.token_db import get_br_symbol, get_oa_symbol
 from broker.aliceblue.mapping.transform_data import transform_data , map_product_type, reverse_map_product_type, transform_modify_order_data
 from utils.config import get_broker_api_key , get_broker_api_secret
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
+# Order API base URL (utils/connection_warmup pre-opens connections to it)
+BASE_URL = 'https://ant.aliceblueonline.com'
+
 
 def get_api_response(endpoint, auth, method="GET", payload=None):
     """Make API requests to AliceBlue API using shared connection pooling."""
@@ -19,7 +23,7 @@ def get_api_response(endpoint, auth, method="GET", payload=None):
         client = get_httpx_client()
         
         AUTH_TOKEN = auth
-        url = f"https://ant.aliceblueonline.com{endpoint}"
+        url = f"{BASE_URL}{endpoint}"
         
         headers = {
             'Authorization': f'Bearer {get_broker_api_secret()} {AUTH_TOKEN}',
@@ -133,7 +137,7 @@ def place_order_api(data, auth):
         logger.debug(f"Place order payload: {json.dumps(payload, indent=2)}")
         
         # Make the API request
-        url = "https://ant.aliceblueonline.com/rest/AliceBlueAPIService/api/placeOrder/executePlaceOrder"
+        url = f"{BASE_URL}/rest/AliceBlueAPIService/api/placeOrder/executePlaceOrder"
         response = client.post(url, json=payload, headers=headers)
         response.raise_for_status()
         
@@ -284,6 +288,7 @@ def close_all_positions(current_api_key,auth):
 
 
     if positions_response:
+        rate_limited_positions = []
         # Loop through each position to close
         for position in positions_response:
             # Skip if net quantity is zero
@@ -310,6 +315,10 @@ def close_all_positions(current_api_key,auth):
 
             logger.info(f"{place_order_payload}")
 
+            # Each square-off order waits for the broker's order rate budget
+            if not rate_governor.acquire('aliceblue', ORDERS):
+                rate_limited_positions.append(symbol)
+                continue
             # Place the order to close the position
             _, api_response, _ =   place_order_api(place_order_payload,AUTH_TOKEN)
 
@@ -317,6 +326,8 @@ def close_all_positions(current_api_key,auth):
             
             # Note: Ensure place_order_api handles any errors and logs accordingly
 
+    if rate_limited_positions:
+        return rate_limited_squareoff_response(rate_limited_positions), 429
     return {'status': 'success', "message": "All Open Positions SquaredOff"}, 200
 
 
@@ -353,7 +364,7 @@ def cancel_order(orderid, auth):
         logger.debug(f"Cancel order payload: {json.dumps(payload, indent=2)}")
         
         # Make the API request
-        url = "https://ant.aliceblueonline.com/rest/AliceBlueAPIService/api/placeOrder/cancelOrder"
+        url = f"{BASE_URL}/rest/AliceBlueAPIService/api/placeOrder/cancelOrder"
         response = client.post(url, json=payload, headers=headers)
         response.raise_for_status()
         
@@ -394,7 +405,7 @@ def modify_order(data, auth):
         logger.debug(f"Modify order payload: {json.dumps(newdata, indent=2)}")
         
         # Make the API request
-        url = "https://ant.aliceblueonline.com/rest/AliceBlueAPIService/api/placeOrder/modifyOrder"
+        url = f"{BASE_URL}/rest/AliceBlueAPIService/api/placeOrder/modifyOrder"
         response = client.post(url, json=newdata, headers=headers)
         response.raise_for_status()
         
@@ -435,6 +446,10 @@ def cancel_all_orders_api(data,auth):
     # Cancel the filtered orders
     for order in orders_to_cancel:
         orderid = order['Nstordno']
+        # Each cancel waits for the broker's order rate budget
+        if not rate_governor.acquire('aliceblue', ORDERS):
+            failed_cancellations.append(orderid)
+            continue
         cancel_response, status_code = cancel_order(orderid,AUTH_TOKEN)
         if status_code == 200:
             canceled_orders.append(orderid)
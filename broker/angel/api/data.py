@@ -38,11 +38,11 @@ def get_api_response(endpoint, auth, method="GET", payload=''):
     
     try:
         if method == "GET":
-            response = client.get(url, headers=headers)
+            response = client.get(url, headers=headers, extensions={'traffic_class': 'data'})
         elif method == "POST":
-            response = client.post(url, headers=headers, content=payload)
+            response = client.post(url, headers=headers, content=payload, extensions={'traffic_class': 'data'})
         else:
-            response = client.request(method, url, headers=headers, content=payload)
+            response = client.request(method, url, headers=headers, content=payload, extensions={'traffic_class': 'data'})
         
         # Add status attribute for compatibility with the existing codebase
         response.status = response.status_code
@@ -4,21 +4,20 @@ import httpx
 from database.auth_db import get_auth_token
 from database.token_db import get_token , get_br_symbol, get_symbol
 from broker.angel.mapping.transform_data import transform_data , map_product_type, reverse_map_product_type, transform_modify_order_data
-from utils.httpx_client import get_httpx_client
+from utils.httpx_client import get_httpx_client, async_request, run_concurrently
+from utils.rate_governor import rate_governor, rate_limited_response, rate_limited_squareoff_response, ORDERS
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Order API base URL (utils/connection_warmup pre-opens connections to it)
+BASE_URL = 'https://apiconnect.angelbroking.com'
 
-def get_api_response(endpoint, auth, method="GET", payload=''):
-    AUTH_TOKEN = auth
-    api_key = os.getenv('BROKER_API_KEY')
 
-    # Get the shared httpx client with connection pooling
-    client = get_httpx_client()
-    
-    headers = {
-      'Authorization': f'Bearer {AUTH_TOKEN}',
+def get_api_headers(auth):
+    """Request headers for the Angel SmartAPI"""
+    return {
+      'Authorization': f'Bearer {auth}',
       'Content-Type': 'application/json',
       'Accept': 'application/json',
       'X-UserType': 'USER',
@@ -26,10 +25,16 @@ def get_api_response(endpoint, auth, method="GET", payload=''):
       'X-ClientLocalIP': 'CLIENT_LOCAL_IP',
       'X-ClientPublicIP': 'CLIENT_PUBLIC_IP',
       'X-MACAddress': 'MAC_ADDRESS',
-      'X-PrivateKey': api_key
+      'X-PrivateKey': os.getenv('BROKER_API_KEY')
     }
+
+def get_api_response(endpoint, auth, method="GET", payload=''):
+    # Get the shared httpx client with connection pooling
+    client = get_httpx_client()
+    
+    headers = get_api_headers(auth)
     
-    url = f"https://apiconnect.angelbroking.com{endpoint}"
+    url = f"{BASE_URL}{endpoint}"
     
     if method == "GET":
         response = client.get(url, headers=headers)
@@ -51,6 +56,20 @@ def get_api_response(endpoint, auth, method="GET", payload=''):
         logger.error(f"Failed to parse JSON response from {endpoint}: {response.text}")
         return {}
 
+async def get_api_response_async(endpoint, auth, method="GET", payload=''):
+    """Async variant of get_api_response; returns (parsed JSON, HTTP status code)"""
+    url = f"{BASE_URL}{endpoint}"
+    response = await async_request(method, url, headers=get_api_headers(auth), content=payload or None)
+
+    if not response.text:
+        return {}, response.status_code
+
+    try:
+        return json.loads(response.text), response.status_code
+    except json.JSONDecodeError:
+        logger.error(f"Failed to parse JSON response from {endpoint}: {response.text}")
+        return {}, response.status_code
+
 def get_order_book(auth):
     return get_api_response("/rest/secure/angelbroking/order/v1/getOrderBook",auth)
 
@@ -120,7 +139,7 @@ def place_order_api(data,auth):
     
     # Make the request using the shared client
     response = client.post(
-        "https://apiconnect.angelbroking.com/rest/secure/angelbroking/order/v1/placeOrder",
+        f"{BASE_URL}/rest/secure/angelbroking/order/v1/placeOrder",
         headers=headers,
         content=payload
     )
@@ -237,6 +256,7 @@ def close_all_positions(current_api_key,auth):
         return {"message": "No Open Positions Found"}, 200
 
     if positions_response['status']:
+        rate_limited_positions = []
         # Loop through each position to close
         for position in positions_response['data']:
             # Skip if net quantity is zero
@@ -266,6 +286,10 @@ def close_all_positions(current_api_key,auth):
 
             logger.info(f"{place_order_payload}")
 
+            # Each square-off order waits for the broker's order rate budget
+            if not rate_governor.acquire('angel', ORDERS):
+                rate_limited_positions.append(symbol)
+                continue
             # Place the order to close the position
             res, response, orderid =   place_order_api(place_order_payload,auth)
 
@@ -277,6 +301,8 @@ def close_all_positions(current_api_key,auth):
             
             # Note: Ensure place_order_api handles any errors and logs accordingly
 
+    if rate_limited_positions:
+        return rate_limited_squareoff_response(rate_limited_positions), 429
     return {'status': 'success', "message": "All Open Positions SquaredOff"}, 200
 
 
@@ -309,7 +335,7 @@ def cancel_order(orderid,auth):
     
     # Make the request using the shared client
     response = client.post(
-        "https://apiconnect.angelbroking.com/rest/secure/angelbroking/order/v1/cancelOrder",
+        f"{BASE_URL}/rest/secure/angelbroking/order/v1/cancelOrder",
         headers=headers,
         content=payload
     )
@@ -328,6 +354,27 @@ def cancel_order(orderid,auth):
         return {"status": "error", "message": data.get("message", "Failed to cancel order")}, response.status
 
 
+async def cancel_order_async(orderid, auth):
+    """Async variant of cancel_order, used to cancel many orders concurrently"""
+    # Concurrent cancels still respect the broker's order rate budget; a
+    # rate-limited cancel is reported per order and cancel_all_orders_api
+    # records it as failed while the other cancels go ahead
+    if not await rate_governor.acquire_async('angel', ORDERS):
+        return rate_limited_response(ORDERS), 429
+
+    payload = json.dumps({
+        "variety": "NORMAL",
+        "orderid": orderid,
+    })
+    data, status_code = await get_api_response_async(
+        "/rest/secure/angelbroking/order/v1/cancelOrder", auth, method="POST", payload=payload
+    )
+
+    if data.get("status"):
+        return {"status": "success", "orderid": orderid}, 200
+    return {"status": "error", "message": data.get("message", "Failed to cancel order")}, status_code
+
+
 def modify_order(data,auth):
 
     # Assuming you have a function to get the authentication token
@@ -357,7 +404,7 @@ def modify_order(data,auth):
 
     # Make the request using the shared client
     response = client.post(
-        "https://apiconnect.angelbroking.com/rest/secure/angelbroking/order/v1/modifyOrder",
+        f"{BASE_URL}/rest/secure/angelbroking/order/v1/modifyOrder",
         headers=headers,
         content=payload
     )
@@ -391,11 +438,14 @@ def cancel_all_orders_api(data,auth):
     canceled_orders = []
     failed_cancellations = []
 
-    # Cancel the filtered orders
-    for order in orders_to_cancel:
-        orderid = order['orderid']
-        cancel_response, status_code = cancel_order(orderid,auth)
-        if status_code == 200:
+    # Cancel the filtered orders concurrently on the shared event loop
+    orderids = [order['orderid'] for order in orders_to_cancel]
+    results = run_concurrently([cancel_order_async(orderid, auth) for orderid in orderids])
+    for orderid, result in zip(orderids, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error cancelling order {orderid}: {result}")
+            failed_cancellations.append(orderid)
+        elif result[1] == 200:
             canceled_orders.append(orderid)
         else:
             failed_cancellations.append(orderid)
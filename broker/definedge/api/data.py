@@ -52,7 +52,7 @@ def get_quotes(symbol, exchange, auth_token):
         # But the full path includes /dart/v1
         url = f"https://integrate.definedgesecurities.com/dart/v1/quotes/{api_exchange}/{token_id}"
         
-        response = client.get(url, headers=headers)
+        response = client.get(url, headers=headers, extensions={'traffic_class': 'data'})
         
         logger.debug(f"Quotes API Response Status: {response.status_code}")
         
@@ -317,7 +317,7 @@ class BrokerData:
                         'Authorization': api_session_key
                     }
                     
-                    response = client.get(url, headers=headers)
+                    response = client.get(url, headers=headers, extensions={'traffic_class': 'data'})
                     
                     logger.debug(f"Debug - Response status: {response.status_code}")
                     logger.debug(f"Debug - Response headers: {dict(response.headers)}")
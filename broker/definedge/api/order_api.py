@@ -6,9 +6,13 @@ from database.token_db import get_token, get_br_symbol, get_oa_symbol
 from broker.definedge.mapping.transform_data import transform_data, map_product_type, reverse_map_product_type, transform_modify_order_data
 from utils.httpx_client import get_httpx_client
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
+# Order API base URL (utils/connection_warmup pre-opens connections to it)
+BASE_URL = 'https://integrate.definedgesecurities.com'
+
 def get_api_response(endpoint, auth, method="GET", payload=None):
     """Make API requests to DefinedGe API using shared connection pooling."""
     try:
@@ -18,7 +22,7 @@ def get_api_response(endpoint, auth, method="GET", payload=None):
         # Get the shared httpx client with connection pooling
         client = get_httpx_client()
         
-        url = f"https://integrate.definedgesecurities.com/dart/v1{endpoint}"
+        url = f"{BASE_URL}/dart/v1{endpoint}"
         
         headers = {
             'Authorization': api_session_key,
@@ -163,7 +167,7 @@ def place_order_api(data, auth):
         logger.info(f"Place order payload being sent to Definedge: {json.dumps(newdata, indent=2)}")
         
         # Make the API request
-        url = "https://integrate.definedgesecurities.com/dart/v1/placeorder"
+        url = f"{BASE_URL}/dart/v1/placeorder"
         response = client.post(url, json=newdata, headers=headers)
         
         # Log the raw response
@@ -384,6 +388,7 @@ def close_all_positions(current_api_key, auth):
     # Track results
     closed_positions = []
     failed_positions = []
+    rate_limited_positions = []
     
     # Loop through each position to close
     for position in positions_to_close:
@@ -426,6 +431,10 @@ def close_all_positions(current_api_key, auth):
             
             logger.info(f"Square-off order payload: {place_order_payload}")
             
+            # Each square-off order waits for the broker's order rate budget
+            if not rate_governor.acquire('definedge', ORDERS):
+                rate_limited_positions.append(tradingsymbol)
+                continue
             # Place the order to close the position
             res, response, orderid = place_order_api(place_order_payload, auth)
             
@@ -460,6 +469,10 @@ def close_all_positions(current_api_key, auth):
     if failed_positions:
         logger.error(f"Failed positions: {failed_positions}")
     
+    # Positions skipped for the rate limit are still open, so the caller must retry them
+    if rate_limited_positions:
+        return rate_limited_squareoff_response(rate_limited_positions), 429
+
     # Return success even if some positions failed to close
     return {"message": "All Open Positions SquaredOff", "status": "success"}, 200
 
@@ -481,7 +494,7 @@ def cancel_order(orderid, auth):
         }
         
         # According to API docs, cancel is a GET request with orderid in URL
-        url = f"https://integrate.definedgesecurities.com/dart/v1/cancel/{orderid}"
+        url = f"{BASE_URL}/dart/v1/cancel/{orderid}"
         
         logger.info(f"Making GET request to: {url}")
         
@@ -563,7 +576,7 @@ def modify_order(data,auth):
 
     # Make the request using the shared client
     response = client.post(
-        "https://integrate.definedgesecurities.com/dart/v1/modify",
+        f"{BASE_URL}/dart/v1/modify",
         headers=headers,
         content=payload
     )
@@ -650,6 +663,10 @@ def cancel_all_orders_api(data, auth):
         if orderid:
             logger.info(f"Attempting to cancel order: {orderid}")
             try:
+                # Each cancel waits for the broker's order rate budget
+                if not rate_governor.acquire('definedge', ORDERS):
+                    failed_cancellations.append(orderid)
+                    continue
                 cancel_response, status_code = cancel_order(orderid, auth)
                 
                 if status_code == 200:
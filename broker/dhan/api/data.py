@@ -38,11 +38,11 @@ def get_api_response(endpoint, auth, method="POST", payload=''):
     #logger.info(f"Payload: {payload}")
     
     if method == "GET":
-        res = client.get(url, headers=headers)
+        res = client.get(url, headers=headers, extensions={'traffic_class': 'data'})
     elif method == "POST":
-        res = client.post(url, headers=headers, content=payload)
+        res = client.post(url, headers=headers, content=payload, extensions={'traffic_class': 'data'})
     else:
-        res = client.request(method, url, headers=headers, content=payload)
+        res = client.request(method, url, headers=headers, content=payload, extensions={'traffic_class': 'data'})
     
     # Add status attribute for compatibility with existing codebase
     res.status = res.status_code
@@ -9,6 +9,7 @@ from broker.dhan.mapping.transform_data import map_exchange_type, map_exchange
 from utils.httpx_client import get_httpx_client
 from broker.dhan.api.baseurl import get_url
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
@@ -257,6 +258,7 @@ def close_all_positions(current_api_key,auth):
         return {"message": "No Open Positions Found"}, 200
 
     if positions_response:
+        rate_limited_positions = []
         # Loop through each position to close
         for position in positions_response:
             # Skip if net quantity is zero
@@ -288,6 +290,10 @@ def close_all_positions(current_api_key,auth):
 
             logger.debug(f"Close position payload: {place_order_payload}")
 
+            # Each square-off order waits for the broker's order rate budget
+            if not rate_governor.acquire('dhan', ORDERS):
+                rate_limited_positions.append(symbol)
+                continue
             # Place the order to close the position
             _, api_response, _ =   place_order_api(place_order_payload,AUTH_TOKEN)
 
@@ -295,6 +301,8 @@ def close_all_positions(current_api_key,auth):
             
             # Note: Ensure place_order_api handles any errors and logs accordingly
 
+    if rate_limited_positions:
+        return rate_limited_squareoff_response(rate_limited_positions), 429
     return {'status': 'success', "message": "All Open Positions SquaredOff"}, 200
 
 
@@ -399,6 +407,10 @@ def cancel_all_orders_api(data,auth):
     # Cancel the filtered orders
     for order in orders_to_cancel:
         orderid = order['orderId']
+        # Each cancel waits for the broker's order rate budget
+        if not rate_governor.acquire('dhan', ORDERS):
+            failed_cancellations.append(orderid)
+            continue
         cancel_response, status_code = cancel_order(orderid,AUTH_TOKEN)
         if status_code == 200:
             canceled_orders.append(orderid)
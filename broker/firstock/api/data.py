@@ -59,7 +59,7 @@ def get_api_response(endpoint, auth, method="POST", payload=None, custom_timeout
         else:
             # Get the shared httpx client with connection pooling for regular requests
             client = get_httpx_client()
-            response = client.request(method, url, json=data, headers=headers)
+            response = client.request(method, url, json=data, headers=headers, extensions={'traffic_class': 'data'})
         
         # Add status attribute for compatibility
         response.status = response.status_code
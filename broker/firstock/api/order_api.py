@@ -4,11 +4,15 @@ from database.auth_db import get_auth_token
 from database.token_db import get_token, get_br_symbol, get_symbol
 from broker.firstock.mapping.transform_data import transform_data, map_product_type, reverse_map_product_type, transform_modify_order_data
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_squareoff_response, ORDERS
 from utils.httpx_client import get_httpx_client
 
 # Initialize logger
 logger = get_logger(__name__)
 
+# Order API base URL (utils/connection_warmup pre-opens connections to it)
+BASE_URL = 'https://api.firstock.in'
+
 
 def get_api_response(endpoint, auth, method="POST", payload=None):
     """
@@ -31,7 +35,7 @@ def get_api_response(endpoint, auth, method="POST", payload=None):
             }
         
         headers = {'Content-Type': 'application/json'}
-        url = f"https://api.firstock.in/V1{endpoint}"
+        url = f"{BASE_URL}/V1{endpoint}"
         
         # Make request using shared httpx client
         response = client.request(method, url, json=payload, headers=headers, timeout=30)
@@ -176,7 +180,7 @@ def place_order_api(data, auth):
         client = get_httpx_client()
         
         headers = {'Content-Type': 'application/json'}
-        url = f"https://api.firstock.in/V1/placeOrder"
+        url = f"{BASE_URL}/V1/placeOrder"
         
         # Make request using shared httpx client
         response = client.request("POST", url, json=transformed_data, headers=headers, timeout=30)
@@ -306,6 +310,7 @@ def close_all_positions(current_api_key, auth):
     positions_closed = 0
     positions_failed = 0
     error_messages = []
+    rate_limited_positions = []
 
     # Check if the positions data is null or empty
     if not positions_response or positions_response.get('status') != 'success':
@@ -356,6 +361,10 @@ def close_all_positions(current_api_key, auth):
                 "disclosed_quantity": "0"
             }
 
+            # Each square-off order waits for the broker's order rate budget
+            if not rate_governor.acquire('firstock', ORDERS):
+                rate_limited_positions.append(symbol)
+                continue
             # Place the order to close the position
             res, response, orderid = place_order_api(place_order_payload, auth)
             
@@ -370,6 +379,9 @@ def close_all_positions(current_api_key, auth):
             positions_failed += 1
             error_messages.append(f"Error processing position: {str(e)}")
 
+    if rate_limited_positions:
+        return rate_limited_squareoff_response(rate_limited_positions), 429
+
     # Prepare response message
     response = {
         "status": "success" if positions_failed == 0 else "partial",
@@ -430,7 +442,7 @@ def cancel_order(orderid, auth):
         client = get_httpx_client()
         
         headers = {'Content-Type': 'application/json'}
-        url = f"https://api.firstock.in/V1/cancelOrder"
+        url = f"{BASE_URL}/V1/cancelOrder"
         
         # Make request using shared httpx client
         response = client.request("POST", url, json=request_data, headers=headers, timeout=30)
@@ -500,7 +512,7 @@ def modify_order(data, auth):
         client = get_httpx_client()
         
         headers = {'Content-Type': 'application/json'}
-        url = f"https://api.firstock.in/V1/modifyOrder"
+        url = f"{BASE_URL}/V1/modifyOrder"
         
         # Make request using shared httpx client
         response = client.request("POST", url, json=transformed_data, headers=headers, timeout=30)
@@ -555,6 +567,10 @@ def cancel_all_orders_api(data,auth):
     # Cancel the filtered orders
     for order in orders_to_cancel:
         orderid = order['orderNumber']
+        # Each cancel waits for the broker's order rate budget
+        if not rate_governor.acquire('firstock', ORDERS):
+            failed_cancellations.append(orderid)
+            continue
         cancel_response, status_code = cancel_order(orderid,auth)
         if status_code == 200:
             canceled_orders.append(orderid)
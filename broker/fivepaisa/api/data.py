@@ -72,13 +72,15 @@ def get_api_response(endpoint: str, auth: str, method: str = "GET", payload: str
         if method.upper() == "GET":
             response = client.get(
                 f"{BASE_URL}{endpoint}",
-                headers=headers
+                headers=headers,
+                extensions={'traffic_class': 'data'}
             )
         else:  # POST
             response = client.post(
                 f"{BASE_URL}{endpoint}",
                 content=payload,  # Use content since payload is already JSON string
-                headers=headers
+                headers=headers,
+                extensions={'traffic_class': 'data'}
             )
             
         response.raise_for_status()
@@ -151,7 +153,8 @@ class BrokerData:
             response = client.post(
                 f"{BASE_URL}/VendorsAPI/Service1.svc/V2/MarketDepth",
                 json=json_data,
-                headers=headers
+                headers=headers,
+                extensions={'traffic_class': 'data'}
             )
             response.raise_for_status()
             response = response.json()
@@ -236,7 +239,8 @@ class BrokerData:
             snapshot_response = client.post(
                 f"{BASE_URL}/VendorsAPI/Service1.svc/MarketSnapshot",
                 json=snapshot_data,
-                headers=headers
+                headers=headers,
+                extensions={'traffic_class': 'data'}
             )
             snapshot_response.raise_for_status()
             snapshot_response = snapshot_response.json()
@@ -267,7 +271,8 @@ class BrokerData:
             depth_response = client.post(
                 f"{BASE_URL}/VendorsAPI/Service1.svc/V2/MarketDepth",
                 json=depth_data,
-                headers=headers
+                headers=headers,
+                extensions={'traffic_class': 'data'}
             )
             depth_response.raise_for_status()
             depth_response = depth_response.json()
@@ -383,7 +388,8 @@ class BrokerData:
             response = client.post(
                 f"{BASE_URL}/VendorsAPI/Service1.svc/MarketSnapshot",
                 json=json_data,
-                headers=headers
+                headers=headers,
+                extensions={'traffic_class': 'data'}
             )
             response.raise_for_status()
             response = response.json()
@@ -557,7 +563,8 @@ class BrokerData:
                     }
                     response = client.get(
                         f"{BASE_URL}{url}",
-                        headers=headers
+                        headers=headers,
+                        extensions={'traffic_class': 'data'}
                     )
                     response.raise_for_status()
                     response = response.json()
@@ -8,11 +8,12 @@ from database.token_db import get_token, get_br_symbol, get_symbol, get_oa_symbo
 from broker.fivepaisa.mapping.transform_data import transform_data, map_product_type, reverse_map_product_type, transform_modify_order_data
 from broker.fivepaisa.mapping.transform_data import map_exchange, map_exchange_type, reverse_map_exchange
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
 
-# Base URL for 5Paisa API
+# Base URL for 5Paisa API (utils/connection_warmup pre-opens connections to it)
 BASE_URL = "https://Openapi.5paisa.com"
 
 # Retrieve the BROKER_API_KEY and BROKER_API_SECRET environment variables
@@ -377,6 +378,7 @@ def close_all_positions(current_api_key: str, auth: str) -> Dict[str, Any]:
         return {"message": "No Open Positions Found"}, 200
 
     if positions_response['body']['NetPositionDetail']:
+        rate_limited_positions = []
         # Loop through each position to close
         for position in positions_response['body']['NetPositionDetail']:
             # Skip if net quantity is zero
@@ -406,6 +408,10 @@ def close_all_positions(current_api_key: str, auth: str) -> Dict[str, Any]:
 
             logger.info(f"{place_order_payload}")
 
+            # Each square-off order waits for the broker's order rate budget
+            if not rate_governor.acquire('fivepaisa', ORDERS):
+                rate_limited_positions.append(symbol)
+                continue
             # Place the order to close the position
             res, response, orderid =   place_order_api(place_order_payload,auth)
 
@@ -417,6 +423,8 @@ def close_all_positions(current_api_key: str, auth: str) -> Dict[str, Any]:
             
             # Note: Ensure place_order_api handles any errors and logs accordingly
 
+    if rate_limited_positions:
+        return rate_limited_squareoff_response(rate_limited_positions), 429
     return {'status': 'success', "message": "All Open Positions SquaredOff"}, 200
 
 
@@ -619,6 +627,10 @@ def cancel_all_orders_api(data: Dict[str, Any], auth: str) -> Dict[str, Any]:
         for order in orders_to_cancel:
             try:
                 orderid = order['BrokerOrderId']
+                # Each cancel waits for the broker's order rate budget
+                if not rate_governor.acquire('fivepaisa', ORDERS):
+                    failed_cancellations.append(orderid)
+                    continue
                 cancel_response, status_code = cancel_order(orderid, auth)
                 
                 if status_code == 200:
@@ -55,11 +55,11 @@ def get_api_response(endpoint, auth, method="GET", payload='', feed_token=None,
 
         # Perform the request
         if method.upper() == "GET":
-            response = client.get(url, headers=headers, params=params)
+            response = client.get(url, headers=headers, params=params, extensions={'traffic_class': 'data'})
         elif method.upper() == "POST":
-            response = client.post(url, headers=headers, json=payload)
+            response = client.post(url, headers=headers, json=payload, extensions={'traffic_class': 'data'})
         else:
-            response = client.request(method, url, headers=headers, json=payload)
+            response = client.request(method, url, headers=headers, json=payload, extensions={'traffic_class': 'data'})
 
         # Log response details
         logger.info("=== API Response Details ===")
@@ -41,11 +41,11 @@ def get_api_response(endpoint, auth, method="GET", payload=''):
         
         # Make the request
         if method == "GET":
-            response = client.get(url, headers=headers)
+            response = client.get(url, headers=headers, extensions={'traffic_class': 'data'})
         elif method == "POST":
-            response = client.post(url, headers=headers, json=payload if isinstance(payload, dict) else json.loads(payload))
+            response = client.post(url, headers=headers, json=payload if isinstance(payload, dict) else json.loads(payload), extensions={'traffic_class': 'data'})
         else:
-            response = client.request(method, url, headers=headers, json=payload if isinstance(payload, dict) else json.loads(payload))
+            response = client.request(method, url, headers=headers, json=payload if isinstance(payload, dict) else json.loads(payload), extensions={'traffic_class': 'data'})
         
         # Add status attribute for compatibility
         response.status = response.status_code
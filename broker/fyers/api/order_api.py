@@ -5,9 +5,13 @@ from database.token_db import get_br_symbol, get_oa_symbol
 from broker.fyers.mapping.transform_data import transform_data, map_product_type, reverse_map_product_type, transform_modify_order_data
 from utils.httpx_client import get_httpx_client
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, ORDERS
 
 logger = get_logger(__name__)
 
+# Order API base URL (utils/connection_warmup pre-opens connections to it)
+BASE_URL = 'https://api-t1.fyers.in'
+
 
 
 def get_api_response(endpoint, auth, method="GET", payload=''):
@@ -30,7 +34,7 @@ def get_api_response(endpoint, auth, method="GET", payload=''):
         AUTH_TOKEN = auth
         api_key = os.getenv('BROKER_API_KEY')
         
-        url = f"https://api-t1.fyers.in{endpoint}"
+        url = f"{BASE_URL}{endpoint}"
         headers = {
             'Authorization': f'{api_key}:{AUTH_TOKEN}',
             'Content-Type': 'application/json'
@@ -117,7 +121,7 @@ def place_order_api(data, auth):
         BROKER_API_KEY = os.getenv('BROKER_API_KEY')
         data['apikey'] = BROKER_API_KEY
         
-        url = "https://api-t1.fyers.in/api/v3/orders/sync"
+        url = f"{BASE_URL}/api/v3/orders/sync"
         headers = {
             'Authorization': f'{BROKER_API_KEY}:{AUTH_TOKEN}',
             'Content-Type': 'application/json'
@@ -265,7 +269,7 @@ def close_all_positions(current_api_key, auth):
         AUTH_TOKEN = auth
         api_key = os.getenv('BROKER_API_KEY')
         
-        url = "https://api-t1.fyers.in/api/v3/positions"
+        url = f"{BASE_URL}/api/v3/positions"
         headers = {
             'Authorization': f'{api_key}:{AUTH_TOKEN}',
             'Content-Type': 'application/json'
@@ -317,7 +321,7 @@ def cancel_order(orderid, auth):
         AUTH_TOKEN = auth
         api_key = os.getenv('BROKER_API_KEY')
         
-        url = "https://api-t1.fyers.in/api/v3/orders/sync"
+        url = f"{BASE_URL}/api/v3/orders/sync"
         headers = {
             'Authorization': f'{api_key}:{AUTH_TOKEN}',
             'Content-Type': 'application/json'
@@ -370,7 +374,7 @@ def modify_order(data, auth):
         AUTH_TOKEN = auth
         api_key = os.getenv('BROKER_API_KEY')
         
-        url = "https://api-t1.fyers.in/api/v3/orders/sync"
+        url = f"{BASE_URL}/api/v3/orders/sync"
         headers = {
             'Authorization': f'{api_key}:{AUTH_TOKEN}',
             'Content-Type': 'application/json'
@@ -448,6 +452,10 @@ def cancel_all_orders_api(data, auth):
             logger.warning(f"Skipping order with no ID: {order}")
             continue
             
+        # Each cancel waits for the broker's order rate budget
+        if not rate_governor.acquire('fyers', ORDERS):
+            failed_cancellations.append(orderid)
+            continue
         cancel_response, status_code = cancel_order(orderid, AUTH_TOKEN)
         if status_code == 200:
             logger.info(f"Successfully canceled order {orderid}.")
@@ -67,13 +67,13 @@ def get_api_response(endpoint, auth_token, method="GET", params=None, data=None,
     try:
         # Make the request based on the HTTP method
         if method.upper() == 'GET':
-            response = client.get(url, headers=headers, params=params)
+            response = client.get(url, headers=headers, params=params, extensions={'traffic_class': 'data'})
         elif method.upper() == 'POST':
-            response = client.post(url, headers=headers, json=data)
+            response = client.post(url, headers=headers, json=data, extensions={'traffic_class': 'data'})
         elif method.upper() == 'PUT':
-            response = client.put(url, headers=headers, json=data)
+            response = client.put(url, headers=headers, json=data, extensions={'traffic_class': 'data'})
         elif method.upper() == 'DELETE':
-            response = client.delete(url, headers=headers, params=params)
+            response = client.delete(url, headers=headers, params=params, extensions={'traffic_class': 'data'})
         else:
             logger.error(f"Unsupported HTTP method: {method}")
             return {"error": f"Unsupported HTTP method: {method}"}
@@ -23,11 +23,15 @@ from broker.groww.mapping.transform_data import (
     ORDER_STATUS_NEW, ORDER_STATUS_ACKED, ORDER_STATUS_APPROVED, ORDER_STATUS_CANCELLED
 )
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_response, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
+# Order API base URL (utils/connection_warmup pre-opens connections to it)
+BASE_URL = 'https://api.groww.in'
+
 # API Endpoints
-GROWW_BASE_URL = 'https://api.groww.in'
+GROWW_BASE_URL = BASE_URL
 GROWW_ORDER_LIST_URL = f'{GROWW_BASE_URL}/v1/order/list'
 GROWW_PLACE_ORDER_URL = f'{GROWW_BASE_URL}/v1/order/create'
 GROWW_MODIFY_ORDER_URL = f'{GROWW_BASE_URL}/v1/order/modify'
@@ -1781,6 +1785,7 @@ def close_all_positions(token=None, auth=None):
         success_count = 0
         failure_count = 0
         detailed_results = []
+        rate_limited_positions = []
         
         logger.info(f"Total positions to process: {len(positions)}")
         
@@ -1842,6 +1847,10 @@ def close_all_positions(token=None, auth=None):
 
                 logger.info(f"Prepared square-off order payload: {json.dumps(place_order_payload, indent=2)}")
                 
+                # Each square-off order waits for the broker's order rate budget
+                if not rate_governor.acquire('groww', ORDERS):
+                    rate_limited_positions.append(trading_symbol)
+                    continue
                 # Place the order
                 res, api_response, order_id = place_order_api(place_order_payload, auth)
                 logger.info(f"Square-off response: {api_response}, order_id: {order_id}")
@@ -1889,6 +1898,8 @@ def close_all_positions(token=None, auth=None):
                 
         msg = f"Squared off {success_count} positions. Failed: {failure_count}"
         logger.info(msg)
+        if rate_limited_positions:
+            return rate_limited_squareoff_response(rate_limited_positions), 429
         return {
             'status': 'success', 
             "message": msg, 
@@ -2568,6 +2579,10 @@ def cancel_all_orders_api(data, auth):
                         elif segment_value == 'COMMODITY':
                             segment = SEGMENT_COMMODITY
                     
+                    # Each cancel waits for the broker's order rate budget
+                    if not rate_governor.acquire('groww', ORDERS):
+                        failed_to_cancel.append({'order_id': orderid, 'message': rate_limited_response(ORDERS)['message']})
+                        continue
                     # Use our enhanced cancel_order function which returns (response_data, status_code)
                     cancel_result = cancel_order(orderid, auth, segment)
                     
@@ -44,11 +44,11 @@ def get_api_response(endpoint, auth, method="GET", params=None):
     
     try:
         if method == "GET":
-            res = client.get(url, headers=headers, params=params)
+            res = client.get(url, headers=headers, params=params, extensions={'traffic_class': 'data'})
         elif method == "POST":
-            res = client.post(url, headers=headers, json=params)
+            res = client.post(url, headers=headers, json=params, extensions={'traffic_class': 'data'})
         else:
-            res = client.request(method, url, headers=headers, params=params)
+            res = client.request(method, url, headers=headers, params=params, extensions={'traffic_class': 'data'})
         
         logger.info(f"Request completed. Status code: {res.status_code}")
         logger.info(f"Actual request URL: {res.url}")
@@ -9,6 +9,7 @@ from broker.indmoney.mapping.transform_data import map_exchange_type, map_exchan
 from utils.httpx_client import get_httpx_client
 from broker.indmoney.api.baseurl import get_url
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
@@ -352,6 +353,7 @@ def close_all_positions(current_api_key,auth):
         return {"message": "No Open Positions Found"}, 200
 
     if all_positions:
+        rate_limited_positions = []
         # Loop through each position to close
         for position in all_positions:
             if not isinstance(position, dict):
@@ -406,6 +408,10 @@ def close_all_positions(current_api_key,auth):
 
             logger.debug(f"Close position payload: {place_order_payload}")
 
+            # Each square-off order waits for the broker's order rate budget
+            if not rate_governor.acquire('indmoney', ORDERS):
+                rate_limited_positions.append(symbol)
+                continue
             # Place the order to close the position
             _, api_response, _ =   place_order_api(place_order_payload,AUTH_TOKEN)
 
@@ -413,6 +419,8 @@ def close_all_positions(current_api_key,auth):
             
             # Note: Ensure place_order_api handles any errors and logs accordingly
 
+    if rate_limited_positions:
+        return rate_limited_squareoff_response(rate_limited_positions), 429
     return {'status': 'success', "message": "All Open Positions SquaredOff"}, 200
 
 
@@ -530,6 +538,10 @@ def cancel_all_orders_api(data,auth):
     # Cancel the filtered orders
     for order in orders_to_cancel:
         orderid = order['id']
+        # Each cancel waits for the broker's order rate budget
+        if not rate_governor.acquire('indmoney', ORDERS):
+            failed_cancellations.append(orderid)
+            continue
         cancel_response, status_code = cancel_order(orderid,AUTH_TOKEN)
         if status_code == 200:
             canceled_orders.append(orderid)
@@ -6,6 +6,7 @@ from database.auth_db import get_auth_token
 from database.token_db import get_token , get_br_symbol, get_symbol
 from broker.kotak.mapping.transform_data import transform_data , map_product_type, reverse_map_product_type, transform_modify_order_data, reverse_map_exchange,map_exchange
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
@@ -178,6 +179,7 @@ def close_all_positions(current_api_key, auth_token):
         return {"message": "No Open Positions Found"}, 200
 
     if positions_response['data']:
+        rate_limited_positions = []
         # Loop through each position to close
         for position in positions_response['data']:
             # Skip if net quantity is zero
@@ -214,6 +216,10 @@ def close_all_positions(current_api_key, auth_token):
 
             logger.info(f"{place_order_payload}")
 
+            # Each square-off order waits for the broker's order rate budget
+            if not rate_governor.acquire('kotak', ORDERS):
+                rate_limited_positions.append(symbol)
+                continue
             # Place the order to close the position
             res, response, orderid =   place_order_api(place_order_payload, auth_token)
 
@@ -223,6 +229,8 @@ def close_all_positions(current_api_key, auth_token):
 
             # Note: Ensure place_order_api handles any errors and logs accordingly
 
+    if rate_limited_positions:
+        return rate_limited_squareoff_response(rate_limited_positions), 429
     return {'status': 'success', "message": "All Open Positions SquaredOff"}, 200
 
 def cancel_order(orderid, auth_token):
@@ -303,6 +311,10 @@ def cancel_all_orders_api(data, auth_token):
     # Cancel the filtered orders
     for order in orders_to_cancel:
         orderid = order['nOrdNo']
+        # Each cancel waits for the broker's order rate budget
+        if not rate_governor.acquire('kotak', ORDERS):
+            failed_cancellations.append(orderid)
+            continue
         cancel_response, status_code = cancel_order(orderid, auth_token)
         if status_code == 200:
             canceled_orders.append(orderid)
@@ -6,9 +6,13 @@ from database.token_db import get_token , get_br_symbol, get_symbol
 from broker.motilal.mapping.transform_data import transform_data , map_product_type, reverse_map_product_type, transform_modify_order_data
 from utils.httpx_client import get_httpx_client
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
+# Order API base URL (utils/connection_warmup pre-opens connections to it)
+BASE_URL = os.getenv('BROKER_API_URL', 'https://openapi.motilaloswal.com')
+
 
 def get_api_response(endpoint, auth, method="GET", payload=''):
     AUTH_TOKEN = auth
@@ -40,7 +44,7 @@ def get_api_response(endpoint, auth, method="GET", payload=''):
     }
 
     # Use Production or UAT URL based on environment
-    base_url = os.getenv('BROKER_API_URL', 'https://openapi.motilaloswal.com')
+    base_url = BASE_URL
     url = f"{base_url}{endpoint}"
 
     if method == "GET":
@@ -170,7 +174,7 @@ def place_order_api(data,auth):
     client = get_httpx_client()
 
     # Use Production or UAT URL based on environment
-    base_url = os.getenv('BROKER_API_URL', 'https://openapi.motilaloswal.com')
+    base_url = BASE_URL
 
     # Make the request using the shared client
     response = client.post(
@@ -299,6 +303,7 @@ def close_all_positions(current_api_key,auth):
         return {"message": "No Open Positions Found"}, 200
 
     if positions_response.get('status') == 'SUCCESS':
+        rate_limited_positions = []
         # Loop through each position to close
         for position in positions_response['data']:
             # Calculate net quantity from buy and sell quantities
@@ -333,6 +338,10 @@ def close_all_positions(current_api_key,auth):
 
             logger.info(f"{place_order_payload}")
 
+            # Each square-off order waits for the broker's order rate budget
+            if not rate_governor.acquire('motilal', ORDERS):
+                rate_limited_positions.append(symbol)
+                continue
             # Place the order to close the position
             res, response, orderid =   place_order_api(place_order_payload,auth)
 
@@ -344,6 +353,8 @@ def close_all_positions(current_api_key,auth):
 
             # Note: Ensure place_order_api handles any errors and logs accordingly
 
+    if rate_limited_positions:
+        return rate_limited_squareoff_response(rate_limited_positions), 429
     return {'status': 'success', "message": "All Open Positions SquaredOff"}, 200
 
 
@@ -383,7 +394,7 @@ def cancel_order(orderid,auth):
     })
 
     # Use Production or UAT URL based on environment
-    base_url = os.getenv('BROKER_API_URL', 'https://openapi.motilaloswal.com')
+    base_url = BASE_URL
 
     # Make the request using the shared client
     response = client.post(
@@ -444,7 +455,7 @@ def modify_order(data,auth):
     payload = json.dumps(transformed_data)
 
     # Use Production or UAT URL based on environment
-    base_url = os.getenv('BROKER_API_URL', 'https://openapi.motilaloswal.com')
+    base_url = BASE_URL
 
     # Make the request using the shared client
     response = client.post(
@@ -489,6 +500,10 @@ def cancel_all_orders_api(data,auth):
     for order in orders_to_cancel:
         # Motilal uses uniqueorderid
         orderid = order['uniqueorderid']
+        # Each cancel waits for the broker's order rate budget
+        if not rate_governor.acquire('motilal', ORDERS):
+            failed_cancellations.append(orderid)
+            continue
         cancel_response, status_code = cancel_order(orderid,auth)
         if status_code == 200:
             canceled_orders.append(orderid)
@@ -33,9 +33,9 @@ def get_api_response(endpoint, auth, method="GET", payload=''):
         # Use a longer timeout for Paytm API requests
         timeout = httpx.Timeout(60.0, connect=30.0)
         if method == "GET":
-            response = client.get(f"{base_url}{endpoint}", headers=headers, timeout=timeout)
+            response = client.get(f"{base_url}{endpoint}", headers=headers, timeout=timeout, extensions={'traffic_class': 'data'})
         else:
-            response = client.post(f"{base_url}{endpoint}", headers=headers, content=payload, timeout=timeout)
+            response = client.post(f"{base_url}{endpoint}", headers=headers, content=payload, timeout=timeout, extensions={'traffic_class': 'data'})
 
         # Log the complete response
         logger.debug("=== API Response Details ===")
@@ -14,11 +14,15 @@ from broker.paytm.mapping.transform_data import (
     reverse_map_order_type
 )
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, ORDERS
 
 logger = get_logger(__name__)
 
+# Order API base URL (utils/connection_warmup pre-opens connections to it)
+BASE_URL = 'https://developer.paytmmoney.com'
+
 def get_api_response(endpoint, auth, method="GET", payload='', max_retries=3, retry_delay=2):
-    base_url = "https://developer.paytmmoney.com"
+    base_url = BASE_URL
     headers = {
         'x-jwt-token': auth,
         'Content-Type': 'application/json',
@@ -590,6 +594,10 @@ def cancel_all_orders_api(data, auth):
     # Cancel the filtered orders
     for order in orders_to_cancel:
         orderid = order['order_no']
+        # Each cancel waits for the broker's order rate budget
+        if not rate_governor.acquire('paytm', ORDERS):
+            failed_cancellations.append(orderid)
+            continue
         cancel_response, status_code = cancel_order(orderid, auth)
         if status_code == 200:
             canceled_orders.append(orderid)
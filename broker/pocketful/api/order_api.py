@@ -6,13 +6,14 @@ from database.token_db import get_br_symbol, get_oa_symbol
 from database.auth_db import Auth, db_session
 from broker.pocketful.mapping.transform_data import transform_data, map_product_type, reverse_map_product_type, transform_modify_order_data
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
 
 
 
-# Pocketful API endpoints
+# Pocketful API endpoints (utils/connection_warmup pre-opens connections to BASE_URL)
 BASE_URL = 'https://trade.pocketful.in'
 ORDER_ENDPOINT = f"{BASE_URL}/api/v1/orders"
 
@@ -720,6 +721,7 @@ def close_all_positions(current_api_key, auth):
         closed_count = 0
         successful_closes = []
         failed_closes = []
+        rate_limited_positions = []
         
         # Process each position
         for position in positions:
@@ -757,6 +759,10 @@ def close_all_positions(current_api_key, auth):
                 
                 # Try to place the order
                 try:
+                    # Each square-off order waits for the broker's order rate budget
+                    if not rate_governor.acquire('pocketful', ORDERS):
+                        rate_limited_positions.append(symbol)
+                        continue
                     status, api_response, orderid = place_order_api(place_order_payload, auth)
                     logger.debug(f"DEBUG - Order response: {api_response}")
                     
@@ -787,6 +793,8 @@ def close_all_positions(current_api_key, auth):
                 })
         
         # Return a summary of the operation
+        if rate_limited_positions:
+            return rate_limited_squareoff_response(rate_limited_positions), 429
         if closed_count > 0:
             if len(failed_closes) == 0:
                 return {"status": "success", "message": f"Successfully closed {closed_count} positions", "data": successful_closes}, 200
@@ -1064,6 +1072,10 @@ def cancel_all_orders_api(data, auth):
             
         logger.debug(f"DEBUG - Attempting to cancel order: {orderid}")
         try:
+            # Each cancel waits for the broker's order rate budget
+            if not rate_governor.acquire('pocketful', ORDERS):
+                failed_cancellations.append(orderid)
+                continue
             cancel_response, status_code = cancel_order(orderid, AUTH_TOKEN)
             
             # Check both status code and response status
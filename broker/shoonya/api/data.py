@@ -36,7 +36,7 @@ def get_api_response(endpoint, auth, method="POST", payload=None):
     headers = {'Content-Type': 'application/x-www-form-urlencoded'}
     url = f"https://api.shoonya.com{endpoint}"
 
-    response = client.request(method, url, content=payload_str, headers=headers)
+    response = client.request(method, url, content=payload_str, headers=headers, extensions={'traffic_class': 'data'})
     data = response.text
     
     # Print raw response for debugging
@@ -6,9 +6,13 @@ from database.token_db import get_token , get_br_symbol, get_symbol
 from broker.shoonya.mapping.transform_data import transform_data , map_product_type, reverse_map_product_type, transform_modify_order_data
 from utils.httpx_client import get_httpx_client
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
+# Order API base URL (utils/connection_warmup pre-opens connections to it)
+BASE_URL = 'https://api.shoonya.com'
+
 
 
 def get_api_response(endpoint, auth, method="GET", payload=''):
@@ -29,7 +33,7 @@ def get_api_response(endpoint, auth, method="GET", payload=''):
     client = get_httpx_client()
     
     headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-    url = f"https://api.shoonya.com{endpoint}"
+    url = f"{BASE_URL}{endpoint}"
 
     response = client.request(method, url, content=payload_str, headers=headers)
     data = response.text
@@ -89,7 +93,7 @@ def place_order_api(data,auth):
     
     # Get the shared httpx client
     client = get_httpx_client()
-    url = "https://api.shoonya.com/NorenWClientTP/PlaceOrder"
+    url = f"{BASE_URL}/NorenWClientTP/PlaceOrder"
     
     response = client.post(url, content=payload_str, headers=headers)
     response_data = json.loads(response.text)
@@ -203,6 +207,7 @@ def close_all_positions(current_api_key,auth):
         return {"message": "No Open Positions Found"}, 200
 
     if positions_response:
+        rate_limited_positions = []
         # Loop through each position to close
         for position in positions_response:
             # Skip if net quantity is zero
@@ -232,6 +237,10 @@ def close_all_positions(current_api_key,auth):
 
             logger.info(f"{place_order_payload}")
 
+            # Each square-off order waits for the broker's order rate budget
+            if not rate_governor.acquire('shoonya', ORDERS):
+                rate_limited_positions.append(symbol)
+                continue
             # Place the order to close the position
             res, response, orderid =   place_order_api(place_order_payload,auth)
 
@@ -243,6 +252,8 @@ def close_all_positions(current_api_key,auth):
             
             # Note: Ensure place_order_api handles any errors and logs accordingly
 
+    if rate_limited_positions:
+        return rate_limited_squareoff_response(rate_limited_positions), 429
     return {'status': 'success', "message": "All Open Positions SquaredOff"}, 200
 
 
@@ -260,7 +271,7 @@ def cancel_order(orderid,auth):
 
     # Get the shared httpx client
     client = get_httpx_client()
-    url = "https://api.shoonya.com/NorenWClientTP/CancelOrder"
+    url = f"{BASE_URL}/NorenWClientTP/CancelOrder"
     
     response = client.post(url, content=payload_str, headers=headers)
     data = json.loads(response.text)
@@ -296,7 +307,7 @@ def modify_order(data,auth):
 
     # Get the shared httpx client
     client = get_httpx_client()
-    url = "https://api.shoonya.com/NorenWClientTP/ModifyOrder"
+    url = f"{BASE_URL}/NorenWClientTP/ModifyOrder"
     
     response = client.post(url, content=payload_str, headers=headers)
     response_data = json.loads(response.text)
@@ -332,6 +343,10 @@ def cancel_all_orders_api(data,auth):
     # Cancel the filtered orders
     for order in orders_to_cancel:
         orderid = order['norenordno']
+        # Each cancel waits for the broker's order rate budget
+        if not rate_governor.acquire('shoonya', ORDERS):
+            failed_cancellations.append(orderid)
+            continue
         cancel_response, status_code = cancel_order(orderid,auth)
         if status_code == 200:
             canceled_orders.append(orderid)
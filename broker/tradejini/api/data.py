@@ -733,7 +733,8 @@ class BrokerData:
                 url,
                 params=params,
                 headers=headers,
-                timeout=30.0
+                timeout=30.0,
+                extensions={'traffic_class': 'data'}
             )
             
             logger.debug(f"Response status: {response.status_code}")
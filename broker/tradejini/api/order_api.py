@@ -10,9 +10,13 @@ from ..mapping.order_data import transform_tradebook_data, transform_holdings_da
 
 from utils.httpx_client import get_httpx_client
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_response, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
+# Order API base URL (utils/connection_warmup pre-opens connections to it)
+BASE_URL = 'https://api.tradejini.com'
+
 
 # Configure logging
 logger = get_logger(__name__)
@@ -53,13 +57,13 @@ def get_api_response(endpoint, auth, method="GET", data=None, params=None):
         # Make API request
         if method == "GET":
             response = client.get(
-                f"https://api.tradejini.com/v2{endpoint}",
+                f"{BASE_URL}/v2{endpoint}",
                 headers=headers,
                 params=params if params else data
             )
         elif method == "DELETE":
             response = client.delete(
-                f"https://api.tradejini.com/v2{endpoint}",
+                f"{BASE_URL}/v2{endpoint}",
                 headers=headers,
                 params=params
             )
@@ -70,7 +74,7 @@ def get_api_response(endpoint, auth, method="GET", data=None, params=None):
                 logger.debug(f"get_api_response - Sending data: {data_str}")
             
             response = client.put(
-                f"https://api.tradejini.com/v2{endpoint}",
+                f"{BASE_URL}/v2{endpoint}",
                 headers=headers,
                 data=data_str if data else None
             )
@@ -84,19 +88,19 @@ def get_api_response(endpoint, auth, method="GET", data=None, params=None):
             logger.warning("get_api_response - API endpoint not found. Trying without /v2 prefix")
             if method == "GET":
                 response = client.get(
-                    f"https://api.tradejini.com{endpoint}",
+                    f"{BASE_URL}{endpoint}",
                     headers=headers,
                     params=params if params else data
                 )
             elif method == "DELETE":
                 response = client.delete(
-                    f"https://api.tradejini.com{endpoint}",
+                    f"{BASE_URL}{endpoint}",
                     headers=headers,
                     params=params
                 )
             else:
                 response = client.put(
-                    f"https://api.tradejini.com{endpoint}",
+                    f"{BASE_URL}{endpoint}",
                     headers=headers,
                     data=data_str if data else None
                 )
@@ -145,7 +149,7 @@ def get_order_book(auth):
         
         # Make API request
         response = client.get(
-            "https://api.tradejini.com/v2/api/oms/orders",
+            f"{BASE_URL}/v2/api/oms/orders",
             headers=headers,
             params={"symDetails": "true"}
         )
@@ -250,7 +254,7 @@ def get_trade_book(auth):
         # Make API request
         logger.info("get_trade_book - Making request to TradeJini API")
         response = client.get(
-            "https://api.tradejini.com/v2/api/oms/trades",
+            f"{BASE_URL}/v2/api/oms/trades",
             headers=headers,
             params={"symDetails": "true"}
         )
@@ -390,7 +394,7 @@ def get_positions(auth):
         
         # Make API request directly - not using any helper functions
         response = client.get(
-            "https://api.tradejini.com/v2/api/oms/positions",
+            f"{BASE_URL}/v2/api/oms/positions",
             headers=headers,
             params={"symDetails": "true"},
             timeout=10
@@ -870,7 +874,7 @@ def place_order_api(data, auth):
         # Make API request
         try:
             client = get_httpx_client()
-            url = "https://api.tradejini.com/v2/oms/place-order"
+            url = f"{BASE_URL}/v2/oms/place-order"
             
             logger.info(f"place_order_api - Sending request to {url}")
             logger.debug(f"place_order_api - Headers: {headers}")
@@ -1136,6 +1140,7 @@ def close_all_positions(current_api_key, auth):
         
         success_count = 0
         failed_count = 0
+        rate_limited_positions = []
         
         for position in positions:
             try:
@@ -1180,6 +1185,10 @@ def close_all_positions(current_api_key, auth):
                 }
                 
                 logger.debug(f"close_all_positions - Placing order: {order_data}")
+                # Each square-off order waits for the broker's order rate budget
+                if not rate_governor.acquire('tradejini', ORDERS):
+                    rate_limited_positions.append(symbol)
+                    continue
                 res, response, orderid = place_order_api(order_data, auth)
                 
                 if response.get('status') == 'success' and orderid:
@@ -1196,6 +1205,8 @@ def close_all_positions(current_api_key, auth):
                 failed_count += 1
         
         # Prepare final response in OpenAlgo format
+        if rate_limited_positions:
+            return rate_limited_squareoff_response(rate_limited_positions), 429
         if success_count > 0 or failed_count == 0:
             message = "All Open Positions SquaredOff" if success_count > 0 else "No positions to close"
             response_data = {
@@ -1335,6 +1346,10 @@ def cancel_all_orders_api(data, auth):
                     logger.debug(f"cancel_all_orders_api - Cancelling order: {order_id}")
                     
                     try:
+                        # Each cancel waits for the broker's order rate budget
+                        if not rate_governor.acquire('tradejini', ORDERS):
+                            failed_cancellations.append({"orderId": order_id, "error": rate_limited_response(ORDERS)['message']})
+                            continue
                         cancel_response, status_code = cancel_order(order_id, auth)
                         logger.debug(f"cancel_all_orders_api - Cancel response: {cancel_response}, status: {status_code}")
                         
@@ -29,13 +29,13 @@ def get_api_response(endpoint, auth, method="GET", payload=''):
     logger.debug(f"Making {method} request to Upstox v3 API: {url}")
     
     if method == "GET":
-        response = client.get(url, headers=headers)
+        response = client.get(url, headers=headers, extensions={'traffic_class': 'data'})
     elif method == "POST":
-        response = client.post(url, headers=headers, content=payload)
+        response = client.post(url, headers=headers, content=payload, extensions={'traffic_class': 'data'})
     elif method == "PUT":
-        response = client.put(url, headers=headers, content=payload)
+        response = client.put(url, headers=headers, content=payload, extensions={'traffic_class': 'data'})
     elif method == "DELETE":
-        response = client.delete(url, headers=headers)
+        response = client.delete(url, headers=headers, extensions={'traffic_class': 'data'})
     
     # Add status attribute for compatibility with existing code that expects http.client response
     response.status = response.status_code
@@ -195,7 +195,7 @@ class BrokerData:
                     'Accept': 'application/json'
                 }
                 full_url = f"https://api.upstox.com{v2_url}"
-                v2_response = client.get(full_url, headers=headers)
+                v2_response = client.get(full_url, headers=headers, extensions={'traffic_class': 'data'})
                 v2_data = v2_response.json()
                 
                 if v2_data.get('status') == 'success':
@@ -673,7 +673,7 @@ class BrokerData:
                 'Accept': 'application/json'
             }
             full_url = f"https://api.upstox.com{url}"
-            response = client.get(full_url, headers=headers)
+            response = client.get(full_url, headers=headers, extensions={'traffic_class': 'data'})
             response = response.json()
             
             if response.get('status') != 'success':
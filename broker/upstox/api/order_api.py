@@ -6,9 +6,13 @@ from database.auth_db import get_auth_token
 from database.token_db import get_token, get_br_symbol, get_symbol
 from broker.upstox.mapping.transform_data import transform_data, map_product_type, reverse_map_product_type, transform_modify_order_data
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
+# Order API base URL (utils/connection_warmup pre-opens connections to it)
+BASE_URL = 'https://api.upstox.com'
+
 
 def get_api_response(endpoint, auth, method="GET", payload=''):
     """
@@ -34,7 +38,7 @@ def get_api_response(endpoint, auth, method="GET", payload=''):
             'Content-Type': 'application/json',
             'Accept': 'application/json',
         }
-        url = f"https://api.upstox.com{endpoint}"
+        url = f"{BASE_URL}{endpoint}"
 
         if method == "GET":
             response = client.get(url, headers=headers)
@@ -145,7 +149,7 @@ def place_order_api(data, auth):
 
         client = get_httpx_client()
         headers = {'Authorization': f'Bearer {auth}', 'Content-Type': 'application/json', 'Accept': 'application/json'}
-        response = client.post("https://api.upstox.com/v2/order/place", headers=headers, content=payload)
+        response = client.post(f"{BASE_URL}/v2/order/place", headers=headers, content=payload)
         response.raise_for_status()
         
         # Add status attribute to make response compatible with place_order_service.py
@@ -227,6 +231,7 @@ def close_all_positions(current_api_key, auth):
             logger.info("No open positions found to close.")
             return {"message": "No Open Positions Found"}, 200
 
+        rate_limited_positions = []
         for position in positions_response['data']:
             if int(position.get('quantity', 0)) == 0:
                 continue
@@ -250,10 +255,16 @@ def close_all_positions(current_api_key, auth):
                 "quantity": str(quantity)
             }
             logger.debug(f"Closing position with payload: {place_order_payload}")
+            # Each square-off order waits for the broker's order rate budget
+            if not rate_governor.acquire('upstox', ORDERS):
+                rate_limited_positions.append(symbol)
+                continue
             _, api_response, _ = place_order_api(place_order_payload, auth)
             logger.info(f"Close position response for {symbol}: {api_response}")
 
         logger.info("Successfully initiated closing of all open positions.")
+        if rate_limited_positions:
+            return rate_limited_squareoff_response(rate_limited_positions), 429
         return {'status': 'success', "message": "All Open Positions SquaredOff"}, 200
 
     except Exception as e:
@@ -334,6 +345,10 @@ def cancel_all_orders_api(data, auth):
 
         for order in orders_to_cancel:
             orderid = order['order_id']
+            # Each cancel waits for the broker's order rate budget
+            if not rate_governor.acquire('upstox', ORDERS):
+                failed_cancellations.append(orderid)
+                continue
             cancel_response, status_code = cancel_order(orderid, auth)
             if status_code == 200:
                 canceled_orders.append(orderid)
@@ -8,6 +8,7 @@ from broker.wisdom.mapping.transform_data import transform_data , map_product_ty
 from utils.httpx_client import get_httpx_client
 from broker.wisdom.baseurl import INTERACTIVE_URL
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
@@ -210,6 +211,7 @@ def close_all_positions(current_api_key,auth):
     if not positions_list:
         return {"message": "No Open Positions Found"}, 200
 
+    rate_limited_positions = []
     # If response has positions
     for position in positions_list:
         # Skip if net quantity is zero
@@ -241,6 +243,10 @@ def close_all_positions(current_api_key,auth):
             "orderUniqueIdentifier": "openalgo"
         }
 
+        # Each square-off order waits for the broker's order rate budget
+        if not rate_governor.acquire('wisdom', ORDERS):
+            rate_limited_positions.append(f"{exchange_segment}:{instrument_id}")
+            continue
         # Place the order to close the position
         res, response, orderid =   place_order_api(place_order_payload,auth)
 
@@ -252,6 +258,8 @@ def close_all_positions(current_api_key,auth):
             
             # Note: Ensure place_order_api handles any errors and logs accordingly
 
+    if rate_limited_positions:
+        return rate_limited_squareoff_response(rate_limited_positions), 429
     return {'status': 'success', "message": "All Open Positions SquaredOff"}, 200
 
 
@@ -357,6 +365,10 @@ def cancel_all_orders_api(data,auth):
     # Cancel the filtered orders
     for order in orders_to_cancel:
         orderid = order['AppOrderID']
+        # Each cancel waits for the broker's order rate budget
+        if not rate_governor.acquire('wisdom', ORDERS):
+            failed_cancellations.append(orderid)
+            continue
         cancel_response, status_code = cancel_order(orderid,auth)
         if status_code == 200:
             logger.info(f"Canceled order {orderid}")
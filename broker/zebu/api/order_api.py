@@ -6,9 +6,13 @@ from database.token_db import get_token , get_br_symbol, get_symbol
 from broker.zebu.mapping.transform_data import transform_data , map_product_type, reverse_map_product_type, transform_modify_order_data
 from utils.httpx_client import get_httpx_client
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
+# Order API base URL (utils/connection_warmup pre-opens connections to it)
+BASE_URL = 'https://go.mynt.in'
+
 
 
 def get_api_response(endpoint, auth, method="GET", payload=''):
@@ -28,7 +32,7 @@ def get_api_response(endpoint, auth, method="GET", payload=''):
     client = get_httpx_client()
 
     headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-    url = f"https://go.mynt.in{endpoint}"
+    url = f"{BASE_URL}{endpoint}"
 
     response = client.request(method, url, content=payload, headers=headers)
     data = response.text
@@ -83,7 +87,7 @@ def place_order_api(data,auth):
 
     # Get the shared httpx client
     client = get_httpx_client()
-    url = "https://go.mynt.in/NorenWClientTP/PlaceOrder"
+    url = f"{BASE_URL}/NorenWClientTP/PlaceOrder"
 
     res = client.post(url, content=payload, headers=headers)
     # Add status attribute for compatibility with existing code
@@ -196,6 +200,7 @@ def close_all_positions(current_api_key,auth):
         return {"message": "No Open Positions Found"}, 200
 
     if positions_response:
+        rate_limited_positions = []
         # Loop through each position to close
         for position in positions_response:
             # Skip if net quantity is zero
@@ -225,6 +230,10 @@ def close_all_positions(current_api_key,auth):
 
             logger.info(f"{place_order_payload}")
 
+            # Each square-off order waits for the broker's order rate budget
+            if not rate_governor.acquire('zebu', ORDERS):
+                rate_limited_positions.append(symbol)
+                continue
             # Place the order to close the position
             res, response, orderid =   place_order_api(place_order_payload,auth)
 
@@ -236,6 +245,8 @@ def close_all_positions(current_api_key,auth):
             
             # Note: Ensure place_order_api handles any errors and logs accordingly
 
+    if rate_limited_positions:
+        return rate_limited_squareoff_response(rate_limited_positions), 429
     return {'status': 'success', "message": "All Open Positions SquaredOff"}, 200
 
 
@@ -251,7 +262,7 @@ def cancel_order(orderid,auth):
 
     # Get the shared httpx client
     client = get_httpx_client()
-    url = "https://go.mynt.in/NorenWClientTP/CancelOrder"
+    url = f"{BASE_URL}/NorenWClientTP/CancelOrder"
 
     # Send the request using httpx
     res = client.post(url, content=payload, headers=headers)
@@ -287,7 +298,7 @@ def modify_order(data,auth):
 
     # Get the shared httpx client
     client = get_httpx_client()
-    url = "https://go.mynt.in/NorenWClientTP/ModifyOrder"
+    url = f"{BASE_URL}/NorenWClientTP/ModifyOrder"
 
     res = client.post(url, content=payload, headers=headers)
     response = json.loads(res.text)
@@ -322,6 +333,10 @@ def cancel_all_orders_api(data,auth):
     # Cancel the filtered orders
     for order in orders_to_cancel:
         orderid = order['norenordno']
+        # Each cancel waits for the broker's order rate budget
+        if not rate_governor.acquire('zebu', ORDERS):
+            failed_cancellations.append(orderid)
+            continue
         cancel_response, status_code = cancel_order(orderid,auth)
         if status_code == 200:
             canceled_orders.append(orderid)
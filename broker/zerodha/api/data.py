@@ -76,7 +76,8 @@ def get_api_response(endpoint, auth, method="GET", payload=None):
             response = client.get(
                 url,
                 headers=headers,
-                params=params
+                params=params,
+                extensions={'traffic_class': 'data'}
             )
         elif method.upper() == 'POST':
             headers['Content-Type'] = 'application/json'
@@ -84,7 +85,8 @@ def get_api_response(endpoint, auth, method="GET", payload=None):
                 url,
                 headers=headers,
                 params=params,
-                json=payload
+                json=payload,
+                extensions={'traffic_class': 'data'}
             )
         else:
             raise ZerodhaAPIError(f"Unsupported HTTP method: {method}")
@@ -7,9 +7,13 @@ from database.token_db import get_br_symbol, get_oa_symbol
 from broker.zerodha.mapping.transform_data import transform_data, map_product_type, reverse_map_product_type, transform_modify_order_data
 from utils.httpx_client import get_httpx_client
 from utils.logging import get_logger
+from utils.rate_governor import rate_governor, rate_limited_squareoff_response, ORDERS
 
 logger = get_logger(__name__)
 
+# Order API base URL (utils/connection_warmup pre-opens connections to it)
+BASE_URL = 'https://api.kite.trade'
+
 
 
 
@@ -27,7 +31,7 @@ def get_api_response(endpoint, auth, method="GET", payload=None):
         dict: API response data
     """
     AUTH_TOKEN = auth
-    base_url = 'https://api.kite.trade'
+    base_url = BASE_URL
     
     # Get the shared httpx client with connection pooling
     client = get_httpx_client()
@@ -153,7 +157,7 @@ def place_order_api(data,auth):
     
     # Make the request using the shared client
     response = client.post(
-        'https://api.kite.trade/orders/regular',
+        f'{BASE_URL}/orders/regular',
         headers=headers,
         content=payload_encoded
     )
@@ -260,6 +264,7 @@ def close_all_positions(current_api_key,auth):
         return {"message": "No Open Positions Found"}, 200
 
     if positions_response['status']:
+        rate_limited_positions = []
         # Loop through each position to close
         for position in positions_response['data']['net']:
             # Skip if net quantity is zero
@@ -286,6 +291,10 @@ def close_all_positions(current_api_key,auth):
 
             logger.info(f"Close position payload: {place_order_payload}")
 
+            # Each square-off order waits for the broker's order rate budget
+            if not rate_governor.acquire('zerodha', ORDERS):
+                rate_limited_positions.append(symbol)
+                continue
             # Place the order to close the position
             _, api_response, _ =   place_order_api(place_order_payload,AUTH_TOKEN)
 
@@ -293,6 +302,8 @@ def close_all_positions(current_api_key,auth):
             
             # Note: Ensure place_order_api handles any errors and logs accordingly
 
+    if rate_limited_positions:
+        return rate_limited_squareoff_response(rate_limited_positions), 429
     return {'status': 'success', "message": "All Open Positions SquaredOff"}, 200
 
 
@@ -321,7 +332,7 @@ def cancel_order(orderid, auth):
         
         # Make the DELETE request using the shared client
         response = client.delete(
-            f'https://api.kite.trade/orders/regular/{orderid}',
+            f'{BASE_URL}/orders/regular/{orderid}',
             headers=headers
         )
         
@@ -374,7 +385,7 @@ def modify_order(data,auth):
     
     # Make the request using the shared client
     response = client.put(
-        f'https://api.kite.trade/orders/regular/{data["orderid"]}',
+        f'{BASE_URL}/orders/regular/{data["orderid"]}',
         headers=headers,
         content=payload_encoded
     )
@@ -410,6 +421,10 @@ def cancel_all_orders_api(data,auth):
     # Cancel the filtered orders
     for order in orders_to_cancel:
         orderid = order['order_id']
+        # Each cancel waits for the broker's order rate budget
+        if not rate_governor.acquire('zerodha', ORDERS):
+            failed_cancellations.append(orderid)
+            continue
         cancel_response, status_code = cancel_order(orderid,AUTH_TOKEN)
         if status_code == 200:
             canceled_orders.append(orderid)
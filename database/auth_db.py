@@ -2,7 +2,12 @@
 
 import os
 import base64
-from sqlalchemy import create_engine, UniqueConstraint
+import hmac
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import create_engine, UniqueConstraint, inspect, text
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
@@ -81,8 +86,15 @@ def get_session_based_cache_ttl():
 auth_cache = TTLCache(maxsize=1024, ttl=get_session_based_cache_ttl())
 # Define feed token cache with same TTL
 feed_token_cache = TTLCache(maxsize=1024, ttl=get_session_based_cache_ttl())
+# Define per-user broker context cache (decrypted tokens + broker) with same TTL
+broker_context_cache = TTLCache(maxsize=1024, ttl=get_session_based_cache_ttl())
 # Define a cache for broker names with a 5-minute TTL (longer since broker rarely changes)
 broker_cache = TTLCache(maxsize=1024, ttl=3000)
+# Define a cache for verified API keys so repeat calls skip Argon2 entirely.
+# Keyed by an HMAC digest of the presented key (never the plaintext key) and
+# bounded (LRU eviction + TTL). upsert_api_key invalidates entries for the user.
+verified_api_key_cache = TTLCache(maxsize=1024, ttl=int(os.getenv('API_KEY_CACHE_TTL', '900')))
+verified_api_key_cache_lock = threading.Lock()
 
 # Conditionally create engine based on DB type
 if DATABASE_URL and 'sqlite' in DATABASE_URL:
@@ -116,17 +128,43 @@ class Auth(Base):
     user_id = Column(String(255), nullable=True)  # Add user_id column
     is_revoked = Column(Boolean, default=False)
 
+@dataclass(frozen=True)
+class BrokerContext:
+    """Immutable, already-decrypted broker session for a user (served from memory)"""
+    user_id: str
+    broker: str
+    auth_token: Optional[str]
+    feed_token: Optional[str] = None
+
 class ApiKeys(Base):
     __tablename__ = 'api_keys'
     id = Column(Integer, primary_key=True)
     user_id = Column(String, nullable=False, unique=True)
     api_key_hash = Column(Text, nullable=False)  # For verification
     api_key_encrypted = Column(Text, nullable=False)  # For retrieval
+    api_key_fingerprint = Column(String(64), nullable=True, index=True)  # Peppered HMAC for indexed lookup
     created_at = Column(DateTime(timezone=True), default=func.now())
 
+def _ensure_api_key_fingerprint_column():
+    """
+    Add api_key_fingerprint to an api_keys table created before the column existed
+    (create_all does not alter existing tables). Rows are fingerprinted on first use;
+    upgrade/migrate_api_key_fingerprint.py backfills them all at once.
+    """
+    columns = {column['name'] for column in inspect(engine).get_columns('api_keys')}
+    if 'api_key_fingerprint' in columns:
+        return
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE api_keys ADD COLUMN api_key_fingerprint VARCHAR(64)"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_api_keys_api_key_fingerprint ON api_keys (api_key_fingerprint)"
+        ))
+    logger.info("Added api_key_fingerprint column to api_keys")
+
 def init_db():
     logger.info("Initializing Auth DB")
     Base.metadata.create_all(bind=engine)
+    _ensure_api_key_fingerprint_column()
 
 def encrypt_token(token):
     """Encrypt auth token"""
@@ -170,6 +208,9 @@ def upsert_auth(name, auth_token, broker, feed_token=None, user_id=None, revoke=
         auth_obj = Auth(name=name, auth=encrypted_token, feed_token=encrypted_feed_token, broker=broker, user_id=user_id, is_revoked=revoke)
         db_session.add(auth_obj)
     db_session.commit()
+
+    # Tokens changed (login, refresh or revoke), so any cached broker context is stale
+    broker_context_cache.pop(name, None)
     return auth_obj.id
 
 def get_auth_token(name):
@@ -272,6 +313,25 @@ def get_user_id(name):
         logger.error(f"Error while querying the database for user_id: {e}")
         return None
 
+def _api_key_digest(api_key):
+    """Keyed (peppered) HMAC-SHA256 digest of an API key, used as a non-reversible lookup key"""
+    return hmac.new(PEPPER.encode(), api_key.encode(), hashlib.sha256).hexdigest()
+
+def invalidate_api_key_cache(user_id=None):
+    """Drop verified API key cache entries for a user (or all entries if user_id is None)"""
+    with verified_api_key_cache_lock:
+        if user_id is None:
+            verified_api_key_cache.clear()
+        else:
+            stale_keys = [digest for digest, cached_user in verified_api_key_cache.items() if cached_user == user_id]
+            for digest in stale_keys:
+                verified_api_key_cache.pop(digest, None)
+    # broker_cache is keyed by the plaintext key, so it cannot be filtered by user
+    broker_cache.clear()
+
+    from utils.api_key_throttle import invalid_api_key_throttle
+    invalid_api_key_throttle.forget_rejected_keys()
+
 def upsert_api_key(user_id, api_key):
     """Store both hashed and encrypted API key"""
     # Hash with Argon2 for verification
@@ -280,19 +340,27 @@ def upsert_api_key(user_id, api_key):
     
     # Encrypt for retrieval
     encrypted_key = encrypt_token(api_key)
+
+    # Non-reversible fingerprint to find the candidate row without scanning
+    fingerprint = _api_key_digest(api_key)
     
     api_key_obj = ApiKeys.query.filter_by(user_id=user_id).first()
     if api_key_obj:
         api_key_obj.api_key_hash = hashed_key
         api_key_obj.api_key_encrypted = encrypted_key
+        api_key_obj.api_key_fingerprint = fingerprint
     else:
         api_key_obj = ApiKeys(
             user_id=user_id,
             api_key_hash=hashed_key,
-            api_key_encrypted=encrypted_key
+            api_key_encrypted=encrypted_key,
+            api_key_fingerprint=fingerprint
         )
         db_session.add(api_key_obj)
     db_session.commit()
+
+    # The previous key for this user must stop verifying immediately
+    invalidate_api_key_cache(user_id)
     return api_key_obj.id
 
 def get_api_key(user_id):
@@ -315,43 +383,70 @@ def get_api_key_for_tradingview(user_id):
         logger.error(f"Error while querying the database for API key: {e}")
         return None
 
+def _track_invalid_api_key(throttle, client_ip, api_key_hash):
+    """Track an invalid attempt in memory (flushed to the traffic DB in the background)"""
+    try:
+        throttle.record(client_ip, api_key_hash)
+    except Exception as track_error:
+        logger.warning(f"Could not track invalid API key attempt: {track_error}")
+
 def verify_api_key(provided_api_key):
     """Verify an API key using Argon2"""
-    from flask import request, has_request_context
+    from flask import has_request_context
     from utils.ip_helper import get_real_ip
-    from database.traffic_db import InvalidAPIKeyTracker
-    import hashlib
+    from utils.api_key_throttle import invalid_api_key_throttle
+
+    if not provided_api_key:
+        return None
+
+    # Fast path: key already verified recently, skip Argon2
+    key_digest = _api_key_digest(provided_api_key)
+    with verified_api_key_cache_lock:
+        cached_user_id = verified_api_key_cache.get(key_digest)
+    if cached_user_id is not None:
+        return cached_user_id
+
+    # Check if we're in a request context
+    client_ip = get_real_ip() if has_request_context() else '127.0.0.1'
+
+    # Hash the API key for tracking (don't store plaintext)
+    api_key_hash = hashlib.sha256(provided_api_key.encode()).hexdigest()[:16]
+
+    # The same bad key again is answered from memory without touching Argon2 or the database,
+    # but still counts towards the IP's attempts so a repeated key escalates to a ban
+    if invalid_api_key_throttle.is_rejected_key(api_key_hash):
+        _track_invalid_api_key(invalid_api_key_throttle, client_ip, api_key_hash)
+        return None
 
     peppered_key = provided_api_key + PEPPER
     try:
-        # Query all API keys
-        api_keys = ApiKeys.query.all()
+        # Indexed lookup of the single candidate row by fingerprint
+        api_keys = ApiKeys.query.filter_by(api_key_fingerprint=key_digest).all()
+        if not api_keys:
+            # An IP with too many bad keys is refused here, before the Argon2 scan; a valid
+            # key from the same (e.g. NAT-shared) IP matched its fingerprint above and still passes
+            if invalid_api_key_throttle.is_throttled(client_ip):
+                _track_invalid_api_key(invalid_api_key_throttle, client_ip, api_key_hash)
+                return None
+            # Keys stored before the fingerprint column existed have no fingerprint yet
+            api_keys = ApiKeys.query.filter(ApiKeys.api_key_fingerprint.is_(None)).all()
 
-        # Try to verify against each stored hash
+        # Verify the candidate(s) with Argon2
         for api_key_obj in api_keys:
             try:
                 ph.verify(api_key_obj.api_key_hash, peppered_key)
+                if api_key_obj.api_key_fingerprint is None:
+                    # Backfill so the next miss is a single indexed lookup
+                    api_key_obj.api_key_fingerprint = key_digest
+                    db_session.commit()
+                with verified_api_key_cache_lock:
+                    verified_api_key_cache[key_digest] = api_key_obj.user_id
                 return api_key_obj.user_id
             except VerifyMismatchError:
                 continue
 
         # If we reach here, the API key is invalid
-        # Track the invalid attempt
-        try:
-            # Check if we're in a request context
-            if has_request_context():
-                client_ip = get_real_ip()
-            else:
-                client_ip = '127.0.0.1'
-
-            # Hash the API key for tracking (don't store plaintext)
-            api_key_hash = hashlib.sha256(provided_api_key.encode()).hexdigest()[:16]
-
-            # Track the invalid API key attempt
-            InvalidAPIKeyTracker.track_invalid_api_key(client_ip, api_key_hash)
-
-        except Exception as track_error:
-            logger.warning(f"Could not track invalid API key attempt: {track_error}")
+        _track_invalid_api_key(invalid_api_key_throttle, client_ip, api_key_hash)
 
         return None
     except Exception as e:
@@ -386,21 +481,47 @@ def get_broker_name(provided_api_key):
             return None
     return None
 
+def get_broker_context(user_id):
+    """Get the cached BrokerContext for a user, decrypting tokens only on a cache miss"""
+    if not user_id:
+        return None
+
+    context = broker_context_cache.get(user_id)
+    if context is not None:
+        return context
+
+    auth_obj = Auth.query.filter_by(name=user_id).first()
+    if not auth_obj or auth_obj.is_revoked:
+        logger.warning(f"No valid auth token or broker found for user_id '{user_id}'.")
+        return None
+
+    context = BrokerContext(
+        user_id=user_id,
+        broker=auth_obj.broker,
+        auth_token=decrypt_token(auth_obj.auth),
+        feed_token=decrypt_token(auth_obj.feed_token) if auth_obj.feed_token else None
+    )
+    if context.auth_token is not None:
+        # Don't cache a failed decryption
+        broker_context_cache[user_id] = context
+    return context
+
 def get_auth_token_broker(provided_api_key, include_feed_token=False):
     """Get auth token, feed token (optional) and broker for a valid API key"""
     user_id = verify_api_key(provided_api_key)
     
     if user_id:
         try:
-            auth_obj = Auth.query.filter_by(name=user_id).first()
-            if auth_obj and not auth_obj.is_revoked:
-                decrypted_token = decrypt_token(auth_obj.auth)
+            context = get_broker_context(user_id)
+            if context:
+                from flask import g, has_request_context
+                if has_request_context():
+                    # Lets the traffic logger key its rollups by broker
+                    g.broker = context.broker
                 if include_feed_token:
-                    decrypted_feed_token = decrypt_token(auth_obj.feed_token) if auth_obj.feed_token else None
-                    return decrypted_token, decrypted_feed_token, auth_obj.broker
-                return decrypted_token, auth_obj.broker
+                    return context.auth_token, context.feed_token, context.broker
+                return context.auth_token, context.broker
             else:
-                logger.warning(f"No valid auth token or broker found for user_id '{user_id}'.")
                 return (None, None, None) if include_feed_token else (None, None)
         except Exception as e:
             logger.error(f"Error while querying the database for auth token and broker: {e}")
@@ -0,0 +1,238 @@
+"""
+Derivatives index over the broker symbol cache.
+
+Built once per SymbolTable when the master contract is loaded. Options and
+futures are grouped by (underlying, exchange, expiry date); each group holds
+one sorted strike array with the CE and PE row ids aligned to it, plus the
+futures rows. Option resolution, nearest strike, ATM +/- N and option chain
+queries are a dictionary lookup and a bisection, with no string building.
+
+Expiry calendars per (underlying, exchange, futures/options) are derived from
+the same groups, with the monthly expiry (last of each month) flagged.
+"""
+
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import pytz
+
+# Row id placeholder for a strike that only trades on the other side
+NO_ROW = 0xFFFFFFFF
+
+FUTURE_TYPES = {'FUT', 'FUTIDX', 'FUTSTK', 'FUTCOM', 'FUTENR', 'FUTCUR', 'FUTIRC', 'FUTIVX', 'FUTBLN', 'FUTBAS'}
+OPTION_TYPES = {'CE', 'PE', 'OPTIDX', 'OPTSTK', 'OPTFUT', 'OPTCUR', 'OPTIRC', 'OPTCOM', 'OPTBLN'}
+
+_EXPIRY_FORMATS = ('%d-%b-%y', '%d-%b-%Y', '%d%b%y', '%d%b%Y', '%Y-%m-%d')
+
+ExpiryLike = Union[str, date, datetime]
+
+# Calendar classes (the instrumenttype values accepted by the expiry API)
+FUTURES = 'futures'
+OPTIONS = 'options'
+
+# Calendar filters: weekly covers every expiry (the weekly cycle includes the monthly one)
+WEEKLY = 'weekly'
+MONTHLY = 'monthly'
+
+def parse_expiry(expiry: ExpiryLike) -> Optional[date]:
+    """Parse an expiry such as 28-OCT-25, 28OCT25, 28-OCT-2025 or 2025-10-28"""
+    if isinstance(expiry, datetime):
+        return expiry.date()
+    if isinstance(expiry, date):
+        return expiry
+    if not expiry:
+        return None
+    text = expiry.strip().upper()
+    for fmt in _EXPIRY_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def _option_side(symbol: str, instrumenttype: str) -> Optional[str]:
+    if instrumenttype in ('CE', 'PE'):
+        return instrumenttype
+    suffix = symbol[-2:]
+    return suffix if suffix in ('CE', 'PE') else None
+
+class ExpirySeries:
+    """Options and futures of one underlying, exchange and expiry"""
+
+    __slots__ = ('underlying', 'exchange', 'expiry', 'expiry_date', 'strikes', 'ce_rows', 'pe_rows', 'futures')
+
+    def __init__(self, underlying: str, exchange: str, expiry: str, expiry_date: date):
+        self.underlying = underlying
+        self.exchange = exchange
+        self.expiry = expiry
+        self.expiry_date = expiry_date
+        self.strikes = array('d')
+        self.ce_rows = array('I')
+        self.pe_rows = array('I')
+        self.futures = array('I')
+
+    def _build(self, options: List[Tuple[float, str, int]]):
+        by_strike: Dict[float, List[int]] = {}
+        for strike, side, row in options:
+            rows = by_strike.setdefault(strike, [NO_ROW, NO_ROW])
+            rows[0 if side == 'CE' else 1] = row
+        for strike in sorted(by_strike):
+            ce_row, pe_row = by_strike[strike]
+            self.strikes.append(strike)
+            self.ce_rows.append(ce_row)
+            self.pe_rows.append(pe_row)
+
+    def _side_rows(self, option_type: str) -> array:
+        return self.ce_rows if option_type.upper() == 'CE' else self.pe_rows
+
+    def find_option(self, strike: float, option_type: str) -> Optional[int]:
+        """Row of the option at exactly this strike"""
+        i = bisect_left(self.strikes, strike)
+        if i < len(self.strikes) and self.strikes[i] == strike:
+            row = self._side_rows(option_type)[i]
+            return None if row == NO_ROW else row
+        return None
+
+    def nearest_index(self, price: float, option_type: Optional[str] = None) -> Optional[int]:
+        """Position of the strike closest to price (ties go to the lower strike)"""
+        strikes = self.strikes
+        if not strikes:
+            return None
+        i = bisect_left(strikes, price)
+        if option_type is None:
+            candidates = [j for j in (i - 1, i) if 0 <= j < len(strikes)]
+        else:
+            # Walk outwards to the closest strike listed on the requested side
+            rows = self._side_rows(option_type)
+            below = next((j for j in range(min(i, len(strikes)) - 1, -1, -1) if rows[j] != NO_ROW), None)
+            above = next((j for j in range(i, len(strikes)) if rows[j] != NO_ROW), None)
+            candidates = [j for j in (below, above) if j is not None]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda j: (abs(strikes[j] - price), strikes[j]))
+
+    def chain(self, start: int = 0, end: Optional[int] = None) -> List[Tuple[float, Optional[int], Optional[int]]]:
+        """(strike, CE row, PE row) for strike positions start..end"""
+        end = len(self.strikes) if end is None else end
+        return [
+            (self.strikes[i],
+             None if self.ce_rows[i] == NO_ROW else self.ce_rows[i],
+             None if self.pe_rows[i] == NO_ROW else self.pe_rows[i])
+            for i in range(max(start, 0), min(end, len(self.strikes)))
+        ]
+
+def _today() -> date:
+    return datetime.now(pytz.timezone('Asia/Kolkata')).date()
+
+class ExpiryCalendar:
+    """Sorted expiries of one underlying, exchange and instrument class"""
+
+    __slots__ = ('dates', 'labels', 'monthly')
+
+    def __init__(self, expiries: Iterable[Tuple[date, str]]):
+        expiries = sorted(expiries)
+        self.dates: List[date] = [expiry_date for expiry_date, _ in expiries]
+        # Expiry strings as stored in the master contract (e.g. 28-OCT-25)
+        self.labels: List[str] = [label for _, label in expiries]
+        last_in_month = {}
+        for expiry_date in self.dates:
+            last_in_month[(expiry_date.year, expiry_date.month)] = expiry_date
+        self.monthly: List[bool] = [last_in_month[(d.year, d.month)] == d for d in self.dates]
+
+    @classmethod
+    def from_labels(cls, labels: Iterable[str]) -> 'ExpiryCalendar':
+        """Calendar of expiry strings; unparseable ones are dropped"""
+        return cls((parse_expiry(label), label) for label in set(labels) if parse_expiry(label) is not None)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def upcoming(self, count: Optional[int] = None, expiry_type: str = WEEKLY,
+                 today: Optional[date] = None) -> List[str]:
+        """Next count expiries from today (inclusive); monthly keeps only month-end expiries"""
+        start = bisect_left(self.dates, today or _today())
+        labels = [
+            self.labels[i] for i in range(start, len(self.dates))
+            if expiry_type != MONTHLY or self.monthly[i]
+        ]
+        return labels[:count] if count is not None else labels
+
+    def nearest(self, expiry_type: str = WEEKLY, today: Optional[date] = None) -> Optional[str]:
+        """Nearest upcoming weekly (any) or monthly expiry"""
+        upcoming = self.upcoming(1, expiry_type, today)
+        return upcoming[0] if upcoming else None
+
+class DerivativesIndex:
+    """Options and futures grouped by (underlying, exchange, expiry date)"""
+
+    def __init__(self, table):
+        options: Dict[Tuple[str, str, date], List[Tuple[float, str, int]]] = {}
+        self.series: Dict[Tuple[str, str, date], ExpirySeries] = {}
+        parsed: Dict[str, Optional[date]] = {}
+
+        instrumenttype = table.instrumenttype
+        derivative_codes = {
+            code for code, value in enumerate(instrumenttype.values)
+            if value in FUTURE_TYPES or value in OPTION_TYPES
+        }
+        for row, code in enumerate(instrumenttype.codes):
+            if code not in derivative_codes:
+                continue
+            expiry = table.expiry[row]
+            if expiry not in parsed:
+                parsed[expiry] = parse_expiry(expiry)
+            expiry_date = parsed[expiry]
+            if expiry_date is None:
+                continue
+            underlying = table.name[row] or ''
+            key = (underlying.upper(), table.exchange[row], expiry_date)
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = ExpirySeries(key[0], key[1], expiry, expiry_date)
+
+            value = instrumenttype.values[code]
+            if value in FUTURE_TYPES:
+                series.futures.append(row)
+                continue
+            side = _option_side(table.symbol[row], value)
+            strike = table.get_strike(row)
+            if side and strike is not None:
+                options.setdefault(key, []).append((strike, side, row))
+
+        for key, series_options in options.items():
+            self.series[key]._build(series_options)
+
+        # Expiry dates per (underlying, exchange), ascending
+        expiries: Dict[Tuple[str, str], List[date]] = {}
+        for underlying, exchange, expiry_date in self.series:
+            expiries.setdefault((underlying, exchange), []).append(expiry_date)
+        self.expiries: Dict[Tuple[str, str], List[date]] = {key: sorted(dates) for key, dates in expiries.items()}
+
+        calendar_expiries: Dict[Tuple[str, str, str], List[Tuple[date, str]]] = {}
+        for (underlying, exchange, expiry_date), series in self.series.items():
+            if series.futures:
+                calendar_expiries.setdefault((underlying, exchange, FUTURES), []).append((expiry_date, series.expiry))
+            if series.strikes:
+                calendar_expiries.setdefault((underlying, exchange, OPTIONS), []).append((expiry_date, series.expiry))
+        self.calendars: Dict[Tuple[str, str, str], ExpiryCalendar] = {
+            key: ExpiryCalendar(expiries) for key, expiries in calendar_expiries.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def get_series(self, underlying: str, exchange: str, expiry: ExpiryLike) -> Optional[ExpirySeries]:
+        expiry_date = parse_expiry(expiry)
+        if expiry_date is None:
+            return None
+        return self.series.get((underlying.upper(), exchange.upper(), expiry_date))
+
+    def get_calendar(self, underlying: str, exchange: str, instrument_class: str) -> Optional[ExpiryCalendar]:
+        """Expiry calendar for 'futures' or 'options' of an underlying"""
+        return self.calendars.get((underlying.upper(), exchange.upper(), instrument_class.lower()))
+
+    def get_expiries(self, underlying: str, exchange: str) -> List[ExpirySeries]:
+        """All series of an underlying in expiry order"""
+        key = (underlying.upper(), exchange.upper())
+        return [self.series[key + (expiry_date,)] for expiry_date in self.expiries.get(key, [])]
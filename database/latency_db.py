@@ -1,11 +1,15 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON, Index, LargeBinary
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from sqlalchemy.pool import NullPool
 import os
+import bisect
+import atexit
 import logging
+import threading
 from datetime import datetime
+from utils.quantile_sketch import QuantileSketch
 
 logger = logging.getLogger(__name__)
 
@@ -83,6 +87,17 @@ class OrderLatency(LatencyBase):
                 error=error
             )
             latency_session.add(log)
+
+            # Update the per-minute rollup in the same transaction
+            LatencyRollup.record(
+                bucket_start=LatencyRollup.bucket_for(datetime.utcnow()),
+                broker=broker,
+                order_type=order_type,
+                status=status,
+                rtt_ms=log.rtt_ms or 0,
+                overhead_ms=log.overhead_ms or 0,
+                total_ms=log.total_latency_ms or 0
+            )
             latency_session.commit()
             return True
         except Exception as e:
@@ -100,53 +115,145 @@ class OrderLatency(LatencyBase):
             return []
 
     @staticmethod
-    def get_latency_stats():
-        """Get latency statistics"""
+    def get_latency_stats(since=None):
+        """Get latency statistics (read from the per-minute rollups)"""
+        return LatencyRollup.get_stats(since=since)
+
+# RTT histogram bucket upper edges in ms (the last bucket is open-ended)
+RTT_HISTOGRAM_EDGES_MS = [
+    1, 2, 3, 5, 7, 10, 15, 20, 30, 40, 50, 75, 100, 150, 200,
+    300, 400, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000, 30000
+]
+
+class LatencyRollup(LatencyBase):
+    """Per-minute pre-aggregated order latency, keyed by broker, API type and status"""
+    __tablename__ = 'order_latency_rollup'
+
+    id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime, nullable=False)  # UTC minute
+    broker = Column(String(50))
+    order_type = Column(String(20))
+    status = Column(String(20))
+    order_count = Column(Integer, default=0)
+    sum_rtt_ms = Column(Float, default=0)
+    sum_overhead_ms = Column(Float, default=0)
+    sum_total_ms = Column(Float, default=0)
+    min_rtt_ms = Column(Float)
+    max_rtt_ms = Column(Float)
+    rtt_histogram = Column(JSON)  # Counts per RTT_HISTOGRAM_EDGES_MS bucket
+
+    __table_args__ = (
+        Index('idx_latency_rollup_bucket_key', 'bucket_start', 'broker', 'order_type', 'status'),
+    )
+
+    @staticmethod
+    def bucket_for(timestamp):
+        """Truncate a naive UTC datetime to its minute bucket"""
+        return timestamp.replace(second=0, microsecond=0)
+
+    @staticmethod
+    def new_bucket(bucket_start, broker, order_type, status):
+        """Create an empty rollup row"""
+        return LatencyRollup(
+            bucket_start=bucket_start, broker=broker, order_type=order_type, status=status,
+            order_count=0, sum_rtt_ms=0, sum_overhead_ms=0, sum_total_ms=0,
+            rtt_histogram=[0] * (len(RTT_HISTOGRAM_EDGES_MS) + 1)
+        )
+
+    def add(self, rtt_ms, overhead_ms, total_ms):
+        """Accumulate one order into this rollup row"""
+        histogram = list(self.rtt_histogram or [0] * (len(RTT_HISTOGRAM_EDGES_MS) + 1))
+        histogram[bisect.bisect_left(RTT_HISTOGRAM_EDGES_MS, rtt_ms)] += 1
+
+        self.order_count = (self.order_count or 0) + 1
+        self.sum_rtt_ms = (self.sum_rtt_ms or 0) + rtt_ms
+        self.sum_overhead_ms = (self.sum_overhead_ms or 0) + overhead_ms
+        self.sum_total_ms = (self.sum_total_ms or 0) + total_ms
+        self.min_rtt_ms = rtt_ms if self.min_rtt_ms is None else min(self.min_rtt_ms, rtt_ms)
+        self.max_rtt_ms = rtt_ms if self.max_rtt_ms is None else max(self.max_rtt_ms, rtt_ms)
+        self.rtt_histogram = histogram  # Reassign so the JSON change is persisted
+
+    @staticmethod
+    def record(bucket_start, broker, order_type, status, rtt_ms, overhead_ms, total_ms):
+        """Add one order to its rollup bucket (caller commits)"""
+        rollup = LatencyRollup.query.filter_by(
+            bucket_start=bucket_start, broker=broker, order_type=order_type, status=status
+        ).first()
+        if not rollup:
+            rollup = LatencyRollup.new_bucket(bucket_start, broker, order_type, status)
+            latency_session.add(rollup)
+        rollup.add(rtt_ms, overhead_ms, total_ms)
+
+    @staticmethod
+    def _summarize(rollups):
+        """Merge rollup rows into count/average/percentile figures"""
+        total = sum(r.order_count or 0 for r in rollups)
+        histogram = [0] * (len(RTT_HISTOGRAM_EDGES_MS) + 1)
+        for r in rollups:
+            for index, count in enumerate(r.rtt_histogram or []):
+                histogram[index] += count
+        min_rtt = min((r.min_rtt_ms for r in rollups if r.min_rtt_ms is not None), default=0)
+        max_rtt = max((r.max_rtt_ms for r in rollups if r.max_rtt_ms is not None), default=0)
+        return {
+            'total_orders': total,
+            'failed_orders': sum(r.order_count or 0 for r in rollups if r.status == 'FAILED'),
+            'avg_rtt': float(sum(r.sum_rtt_ms or 0 for r in rollups) / total) if total else 0.0,
+            'avg_overhead': float(sum(r.sum_overhead_ms or 0 for r in rollups) / total) if total else 0.0,
+            'avg_total': float(sum(r.sum_total_ms or 0 for r in rollups) / total) if total else 0.0,
+            'min_rtt': float(min_rtt),
+            'max_rtt': float(max_rtt),
+            'histogram': histogram
+        }
+
+    @staticmethod
+    def get_rollups(broker=None, since=None):
+        """Get rollup rows, optionally filtered by broker and start time"""
+        query = LatencyRollup.query
+        if broker:
+            query = query.filter_by(broker=broker)
+        if since:
+            query = query.filter(LatencyRollup.bucket_start >= since)
+        return query.all()
+
+    @staticmethod
+    def get_stats(since=None):
+        """Get overall and per-broker latency statistics from the rollups"""
         try:
-            from sqlalchemy import func
-            
-            # Overall stats
-            total_orders = OrderLatency.query.count()
-            failed_orders = OrderLatency.query.filter(OrderLatency.status == 'FAILED').count()
-            
-            # Get average latencies
-            avg_rtt = latency_session.query(func.avg(OrderLatency.rtt_ms)).scalar() or 0
-            avg_overhead = latency_session.query(func.avg(OrderLatency.overhead_ms)).scalar() or 0
-            avg_total = latency_session.query(func.avg(OrderLatency.total_latency_ms)).scalar() or 0
-            
-            # Get p50, p90, p99 latencies for RTT
-            rtt_latencies = [l[0] for l in OrderLatency.query.with_entities(OrderLatency.rtt_ms).all()]
-            rtt_latencies.sort()
-            
-            p50_rtt = p90_rtt = p99_rtt = 0
-            if rtt_latencies:
-                p50_rtt = rtt_latencies[int(len(rtt_latencies) * 0.5)]
-                p90_rtt = rtt_latencies[int(len(rtt_latencies) * 0.9)]
-                p99_rtt = rtt_latencies[int(len(rtt_latencies) * 0.99)]
-            
+            rollups = LatencyRollup.get_rollups(since=since)
+            summary = LatencyRollup._summarize(rollups)
+
+            # Percentiles come from the mergeable RTT sketches
+            p50_rtt, p90_rtt, p99_rtt, p999_rtt = LatencySketch.get_sketch('rtt', since=since).quantiles(
+                (0.5, 0.9, 0.99, 0.999)
+            )
+
             # Breakdown by broker
+            by_broker = {}
+            for r in rollups:
+                if r.broker:  # Skip None values
+                    by_broker.setdefault(r.broker, []).append(r)
+
             broker_stats = {}
-            brokers = [b[0] for b in OrderLatency.query.with_entities(OrderLatency.broker).distinct().all()]
-            for broker in brokers:
-                if broker:  # Skip None values
-                    broker_orders = OrderLatency.query.filter_by(broker=broker)
-                    broker_stats[broker] = {
-                        'total_orders': broker_orders.count(),
-                        'failed_orders': broker_orders.filter_by(status='FAILED').count(),
-                        'avg_rtt': float(broker_orders.with_entities(func.avg(OrderLatency.rtt_ms)).scalar() or 0),
-                        'avg_overhead': float(broker_orders.with_entities(func.avg(OrderLatency.overhead_ms)).scalar() or 0),
-                        'avg_total': float(broker_orders.with_entities(func.avg(OrderLatency.total_latency_ms)).scalar() or 0)
-                    }
-            
+            for broker, broker_rollups in by_broker.items():
+                broker_summary = LatencyRollup._summarize(broker_rollups)
+                broker_stats[broker] = {
+                    'total_orders': broker_summary['total_orders'],
+                    'failed_orders': broker_summary['failed_orders'],
+                    'avg_rtt': broker_summary['avg_rtt'],
+                    'avg_overhead': broker_summary['avg_overhead'],
+                    'avg_total': broker_summary['avg_total']
+                }
+
             return {
-                'total_orders': total_orders,
-                'failed_orders': failed_orders,
-                'avg_rtt': float(avg_rtt),
-                'avg_overhead': float(avg_overhead),
-                'avg_total': float(avg_total),
+                'total_orders': summary['total_orders'],
+                'failed_orders': summary['failed_orders'],
+                'avg_rtt': summary['avg_rtt'],
+                'avg_overhead': summary['avg_overhead'],
+                'avg_total': summary['avg_total'],
                 'p50_rtt': float(p50_rtt),
                 'p90_rtt': float(p90_rtt),
                 'p99_rtt': float(p99_rtt),
+                'p999_rtt': float(p999_rtt),
                 'broker_stats': broker_stats
             }
         except Exception as e:
@@ -160,9 +267,285 @@ class OrderLatency(LatencyBase):
                 'p50_rtt': 0,
                 'p90_rtt': 0,
                 'p99_rtt': 0,
+                'p999_rtt': 0,
                 'broker_stats': {}
             }
 
+    @staticmethod
+    def get_histogram(broker=None, since=None):
+        """Get the RTT distribution for the latency dashboard"""
+        summary = LatencyRollup._summarize(LatencyRollup.get_rollups(broker=broker, since=since))
+        if not summary['total_orders']:
+            return {'bins': [], 'counts': [], 'avg_rtt': 0, 'min_rtt': 0, 'max_rtt': 0}
+
+        # Trim empty buckets at both ends
+        histogram = summary['histogram']
+        first = next(i for i, c in enumerate(histogram) if c)
+        last = max(i for i, c in enumerate(histogram) if c)
+        labels = [f"{RTT_HISTOGRAM_EDGES_MS[i - 1] if i > 0 else 0}" for i in range(first, last + 1)]
+        return {
+            'bins': labels,
+            'counts': histogram[first:last + 1],
+            'avg_rtt': summary['avg_rtt'],
+            'min_rtt': summary['min_rtt'],
+            'max_rtt': summary['max_rtt']
+        }
+
+    @staticmethod
+    def get_brokers():
+        """Distinct brokers present in the rollups"""
+        return [b[0] for b in LatencyRollup.query.with_entities(LatencyRollup.broker).distinct().all() if b[0]]
+
+    @staticmethod
+    def backfill():
+        """Build rollups from existing order_latency rows (one-time, when the rollup table is empty)"""
+        try:
+            if LatencyRollup.query.first() is not None or OrderLatency.query.first() is None:
+                return 0
+
+            logger.info("Building latency rollups from existing order latency logs")
+            count = 0
+            buckets = {}
+            rows = OrderLatency.query.with_entities(
+                OrderLatency.timestamp, OrderLatency.broker, OrderLatency.order_type, OrderLatency.status,
+                OrderLatency.rtt_ms, OrderLatency.overhead_ms, OrderLatency.total_latency_ms
+            ).yield_per(5000)
+            for timestamp, broker, order_type, status, rtt, overhead, total in rows:
+                bucket_start = LatencyRollup.bucket_for((timestamp or datetime.utcnow()).replace(tzinfo=None))
+                key = (bucket_start, broker, order_type, status)
+                if key not in buckets:
+                    buckets[key] = LatencyRollup.new_bucket(*key)
+                buckets[key].add(rtt or 0, overhead or 0, total or 0)
+                count += 1
+            latency_session.add_all(buckets.values())
+            latency_session.commit()
+            logger.info(f"Built latency rollups from {count} order latency logs")
+            return count
+        except Exception as e:
+            logger.error(f"Error building latency rollups: {e}")
+            latency_session.rollback()
+            return 0
+
+# Latency stages tracked with sketches (keys of the latencies dict passed to log_latency)
+SKETCH_STAGES = ('validation', 'rtt', 'broker_response', 'overhead', 'total')
+# Broker HTTP phases recorded by utils/httpx_client (broker = host, order_type = 'HTTP')
+HTTP_SKETCH_STAGES = ('http_connect', 'http_tls', 'http_ttfb', 'http_total')
+HTTP_SKETCH_TYPE = 'HTTP'
+
+class LatencySketch(LatencyBase):
+    """Per-minute quantile sketch of one latency stage, keyed by broker and API type"""
+    __tablename__ = 'order_latency_sketch'
+
+    id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime, nullable=False)  # UTC minute
+    broker = Column(String(50))
+    order_type = Column(String(20))
+    stage = Column(String(30), nullable=False)
+    sample_count = Column(Integer, default=0)
+    sketch = Column(LargeBinary, nullable=False)  # QuantileSketch.to_bytes()
+
+    __table_args__ = (
+        Index('idx_latency_sketch_key', 'stage', 'bucket_start', 'broker', 'order_type'),
+    )
+
+    @staticmethod
+    def merge_into_db(sketches):
+        """Merge {(bucket_start, broker, order_type, stage): QuantileSketch} into stored rows"""
+        try:
+            for (bucket_start, broker, order_type, stage), sketch in sketches.items():
+                row = LatencySketch.query.filter_by(
+                    bucket_start=bucket_start, broker=broker, order_type=order_type, stage=stage
+                ).first()
+                if row:
+                    merged = QuantileSketch.from_bytes(row.sketch).merge(sketch)
+                    row.sketch = merged.to_bytes()
+                    row.sample_count = merged.count
+                else:
+                    latency_session.add(LatencySketch(
+                        bucket_start=bucket_start, broker=broker, order_type=order_type, stage=stage,
+                        sample_count=sketch.count, sketch=sketch.to_bytes()
+                    ))
+            latency_session.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error persisting latency sketches: {e}")
+            latency_session.rollback()
+            return False
+
+    @staticmethod
+    def get_sketch(stage, broker=None, order_type=None, since=None, until=None):
+        """Merge the stored sketches of a stage, plus those not yet flushed, over an arbitrary time window"""
+        def read():
+            sketch = latency_sketches.pending_sketch(stage, broker, order_type, since, until)
+            try:
+                query = LatencySketch.query.filter_by(stage=stage)
+                if broker:
+                    query = query.filter_by(broker=broker)
+                if order_type:
+                    query = query.filter_by(order_type=order_type)
+                if since:
+                    query = query.filter(LatencySketch.bucket_start >= since)
+                if until:
+                    query = query.filter(LatencySketch.bucket_start < until)
+                for (blob,) in query.with_entities(LatencySketch.sketch).all():
+                    sketch.merge(QuantileSketch.from_bytes(blob))
+            except Exception as e:
+                logger.error(f"Error loading latency sketches: {e}")
+            return sketch
+        return latency_sketches.read_consistent(read)
+
+    @staticmethod
+    def get_stage_percentiles(broker=None, order_type=None, since=None, until=None, stages=SKETCH_STAGES):
+        """Get count, mean and p50/p90/p99/p99.9 for every stage over a time window"""
+        result = {}
+        for stage in stages:
+            sketch = LatencySketch.get_sketch(stage, broker, order_type, since, until)
+            p50, p90, p99, p999 = sketch.quantiles((0.5, 0.9, 0.99, 0.999))
+            result[stage] = {
+                'count': sketch.count,
+                'mean': sketch.mean,
+                'max': sketch.max if sketch.count else 0.0,
+                'p50': p50,
+                'p90': p90,
+                'p99': p99,
+                'p999': p999
+            }
+        return result
+
+    @staticmethod
+    def backfill():
+        """Build sketches from existing order_latency rows (one-time, when the sketch table is empty)"""
+        try:
+            if LatencySketch.query.first() is not None or OrderLatency.query.first() is None:
+                return 0
+
+            logger.info("Building latency sketches from existing order latency logs")
+            sketches = {}
+            count = 0
+            rows = OrderLatency.query.with_entities(
+                OrderLatency.timestamp, OrderLatency.broker, OrderLatency.order_type,
+                OrderLatency.validation_latency_ms, OrderLatency.rtt_ms, OrderLatency.response_latency_ms,
+                OrderLatency.overhead_ms, OrderLatency.total_latency_ms
+            ).yield_per(5000)
+            for timestamp, broker, order_type, *values in rows:
+                bucket_start = (timestamp or datetime.utcnow()).replace(tzinfo=None, second=0, microsecond=0)
+                for stage, value in zip(SKETCH_STAGES, values):
+                    key = (bucket_start, broker, order_type, stage)
+                    if key not in sketches:
+                        sketches[key] = QuantileSketch()
+                    sketches[key].add(value or 0)
+                count += 1
+            LatencySketch.merge_into_db(sketches)
+            logger.info(f"Built latency sketches from {count} order latency logs")
+            return count
+        except Exception as e:
+            logger.error(f"Error building latency sketches: {e}")
+            latency_session.rollback()
+            return 0
+
+class LatencySketchStore:
+    """
+    In-memory per-minute sketches updated on the order path.
+    Flushed to the order_latency_sketch table by a background thread so that
+    recording a latency never costs a database round-trip.
+    """
+
+    def __init__(self, flush_interval=30.0):
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def add(self, broker, order_type, latencies):
+        """Record the stage latencies (ms) of one request"""
+        bucket_start = datetime.utcnow().replace(second=0, microsecond=0)
+        with self._lock:
+            for stage, value in latencies.items():
+                if stage not in SKETCH_STAGES and stage not in HTTP_SKETCH_STAGES:
+                    continue
+                key = (bucket_start, broker, order_type, stage)
+                sketch = self._pending.get(key)
+                if sketch is None:
+                    sketch = self._pending[key] = QuantileSketch()
+                sketch.add(value)
+        self._ensure_thread()
+
+    def pending_sketch(self, stage, broker=None, order_type=None, since=None, until=None):
+        """Merge of the not yet persisted sketches matching a query (read-only)"""
+        sketch = QuantileSketch()
+        with self._lock:
+            for (bucket_start, key_broker, key_type, key_stage), pending in self._pending.items():
+                if key_stage != stage or (broker and key_broker != broker) or (order_type and key_type != order_type):
+                    continue
+                if (since and bucket_start < since) or (until and bucket_start >= until):
+                    continue
+                sketch.merge(pending)
+        return sketch
+
+    def read_consistent(self, read):
+        """
+        Run read() while no flush is in progress: sketches being written are neither in
+        memory nor committed yet, so a concurrent read would miss or double count them.
+        """
+        with self._flush_lock:
+            return read()
+
+    def flush(self):
+        """Persist pending sketches; if the write fails they are kept for the next flush"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            try:
+                persisted = LatencySketch.merge_into_db(pending)
+            except Exception as e:
+                logger.error(f"Error flushing latency sketches: {e}")
+                persisted = False
+            if not persisted:
+                self._restore(pending)
+                return 0
+            return len(pending)
+
+    def _restore(self, pending):
+        """Merge sketches that failed to persist back into the pending ones"""
+        with self._lock:
+            for key, sketch in pending.items():
+                current = self._pending.get(key)
+                if current is not None:
+                    sketch.merge(current)
+                self._pending[key] = sketch
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='LatencySketchFlush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            finally:
+                latency_session.remove()
+
+    def shutdown(self):
+        """Stop the flusher and persist what is pending"""
+        self._stop_event.set()
+        try:
+            self.flush()
+        finally:
+            latency_session.remove()
+
+# Global sketch store
+latency_sketches = LatencySketchStore(flush_interval=float(os.getenv('LATENCY_SKETCH_FLUSH_INTERVAL', '30')))
+atexit.register(latency_sketches.shutdown)
+
 def init_latency_db():
     """Initialize the latency database"""
     # Extract directory from database URL and create if it doesn't exist
@@ -173,3 +556,8 @@ def init_latency_db():
     
     logger.info(f"Initializing Latency DB at: {LATENCY_DATABASE_URL}")
     LatencyBase.metadata.create_all(bind=latency_engine)
+
+    # Populate rollups and sketches for databases created before they existed
+    LatencyRollup.backfill()
+    LatencySketch.backfill()
+    latency_session.remove()
@@ -25,10 +25,26 @@ def load_symbols_to_cache(broker: str) -> bool:
         start_time = time.time()
         
         # Import the enhanced token_db module
-        from database.token_db_enhanced import load_cache_for_broker, get_cache_stats
+        from database.token_db_enhanced import load_cache_for_broker, get_cache_stats, get_cache
         
-        # Load all symbols into cache
-        success = load_cache_for_broker(broker)
+        # An incremental master contract refresh already patched the cache in place
+        if get_cache().take_contract_patch(broker):
+            logger.info(f"Symbol cache for {broker} was patched by the incremental master contract refresh")
+            success = True
+        else:
+            # Load all symbols into cache
+            success = load_cache_for_broker(broker)
+        
+        # Publish a memory-mapped snapshot so other processes map the cache instead of rebuilding it
+        if success:
+            get_cache().publish_snapshot()
+        
+        # Refresh the FTS5 search index used when the cache is not loaded (SQLite only);
+        # an unchanged master contract left the table and its index as they were
+        from database.master_contract_source_db import take_unchanged_contract
+        if not take_unchanged_contract(broker):
+            from database.symbol import rebuild_symbol_fts
+            rebuild_symbol_fts()
         
         if success:
             load_time = time.time() - start_time
@@ -114,8 +130,10 @@ def clear_cache_on_logout():
         stats = get_cache_stats()
         symbols_cleared = stats.get('total_symbols', 0)
         
-        # Clear the cache
+        # Clear the cache and unpublish the shared snapshot
         clear_cache()
+        from database.symbol_snapshot import remove_snapshot
+        remove_snapshot()
         
         logger.info(f"Cache cleared. Removed {symbols_cleared} symbols from memory")
         
@@ -0,0 +1,147 @@
+"""
+Vectorized master contract normalization shared by the broker modules.
+
+Every broker's master_contract_db used to repeat the same row-wise and per
+instrument type work: expiry strings converted with a Python function per row,
+and one df.loc string concatenation per (instrument type, exchange) pair to
+build OpenAlgo symbols. normalize_contract does it once per frame in columnar
+form; a broker only describes its file with a ContractMapping:
+
+    ANGEL_MAPPING = ContractMapping(
+        columns={'exch_seg': 'exchange'},
+        expiry_format='%d%b%Y',
+        strike_divisor=100,
+        futures={'MCX': ('FUTCOM',), 'CDS': ('FUTCUR', 'FUTIRC')},
+        options={'MCX': ('OPTFUT',), 'CDS': ('OPTCUR', 'OPTIRC')},
+    )
+    df = normalize_contract(raw_df, ANGEL_MAPPING)
+
+OpenAlgo symbol formats: futures NAME + DDMMMYY + FUT (NIFTY28OCT25FUT), options
+NAME + DDMMMYY + STRIKE + CE/PE (NIFTY28OCT2525000CE, USDINR28OCT2588.25CE).
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import pandas as pd
+
+# Broker index names -> OpenAlgo index symbols
+INDEX_SYMBOLS = {
+    'Nifty 50': 'NIFTY',
+    'Nifty Next 50': 'NIFTYNXT50',
+    'Nifty Fin Service': 'FINNIFTY',
+    'Nifty Bank': 'BANKNIFTY',
+    'NIFTY MID SELECT': 'MIDCPNIFTY',
+    'India VIX': 'INDIAVIX',
+    'SNSX50': 'SENSEX50',
+}
+
+# OpenAlgo expiry format (28-OCT-25)
+EXPIRY_FORMAT = '%d-%b-%y'
+
+@dataclass
+class ContractMapping:
+    """How one broker's raw master contract maps onto the symtoken columns"""
+    # Raw column -> symtoken column (columns already named like symtoken need no entry)
+    columns: Dict[str, str] = field(default_factory=dict)
+    # strptime format of the raw expiry; None when it is already DD-MMM-YY
+    expiry_format: Optional[str] = None
+    # Raw prices in paise etc.: strike and tick size are divided by these
+    strike_divisor: float = 1
+    tick_size_divisor: float = 1
+    # Further strike divisors for (instrumenttype, exchange), applied after strike_divisor
+    extra_strike_divisors: Dict[Tuple[str, str], float] = field(default_factory=dict)
+    # (instrumenttype, exchange) -> OpenAlgo exchange (e.g. index rows to NSE_INDEX)
+    exchange_overrides: Dict[Tuple[str, str], str] = field(default_factory=dict)
+    # Regex removed from the broker symbol (e.g. series suffixes like -EQ)
+    symbol_suffixes: Optional[str] = None
+    # exchange -> instrument types whose OpenAlgo symbol is built (futures / options)
+    futures: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    options: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    # Raw column holding CE/PE; default: the last two characters of the broker symbol
+    option_type_column: Optional[str] = None
+    # Strip every '.0' from the strike text like the broker's original code (20.05 -> 205),
+    # so symbols users already saved keep resolving
+    legacy_strike_text: bool = False
+    index_symbols: Dict[str, str] = field(default_factory=lambda: dict(INDEX_SYMBOLS))
+
+def format_expiry(expiry: pd.Series, input_format: Optional[str] = None) -> pd.Series:
+    """
+    Expiries as upper-case DD-MMM-YY. Each distinct value is parsed once; values that
+    do not match input_format are kept as they are (upper-cased), missing ones stay missing.
+    """
+    if input_format is None:
+        return expiry.str.upper()
+    converted = {}
+    for value in expiry.dropna().unique():
+        try:
+            converted[value] = datetime.strptime(value, input_format).strftime(EXPIRY_FORMAT).upper()
+        except (TypeError, ValueError):
+            converted[value] = str(value).upper()
+    return expiry.map(converted)
+
+def expiry_code(expiry: pd.Series) -> pd.Series:
+    """DD-MMM-YY -> DDMMMYY as used inside OpenAlgo symbols"""
+    return expiry.str.replace('-', '', regex=False)
+
+def format_strike(strike: pd.Series, legacy: bool = False) -> pd.Series:
+    """
+    Strikes as symbol text: 25000.0 -> 25000, 88.25 -> 88.25. With legacy, every '.0'
+    is removed as Angel's original code did, so 20.05 -> 205 (kept for symbol compatibility).
+    """
+    pattern = r'\.0' if legacy else r'\.0$'
+    return strike.astype(float).astype(str).str.replace(pattern, '', regex=True)
+
+def future_symbols(name: pd.Series, expiry: pd.Series) -> pd.Series:
+    return name + expiry_code(expiry) + 'FUT'
+
+def option_symbols(name: pd.Series, expiry: pd.Series, strike: pd.Series, option_type: pd.Series,
+                   legacy_strike_text: bool = False) -> pd.Series:
+    return name + expiry_code(expiry) + format_strike(strike, legacy_strike_text) + option_type
+
+def _instrument_mask(df: pd.DataFrame, by_exchange: Dict[str, Tuple[str, ...]]) -> pd.Series:
+    mask = pd.Series(False, index=df.index)
+    for exchange, instrument_types in by_exchange.items():
+        mask |= (df['exchange'] == exchange) & df['instrumenttype'].isin(instrument_types)
+    return mask
+
+def normalize_contract(df: pd.DataFrame, mapping: ContractMapping) -> pd.DataFrame:
+    """Normalize a raw broker master contract frame to the symtoken columns and OpenAlgo symbols"""
+    df = df.rename(columns=mapping.columns)
+
+    # The broker's own symbol and exchange, before any OpenAlgo rewriting
+    if 'brsymbol' not in df:
+        df['brsymbol'] = df['symbol']
+    if 'brexchange' not in df:
+        df['brexchange'] = df['exchange']
+    option_type = df[mapping.option_type_column] if mapping.option_type_column else df['brsymbol'].str[-2:]
+
+    for (instrument_type, exchange), target in mapping.exchange_overrides.items():
+        df.loc[(df['instrumenttype'] == instrument_type) & (df['exchange'] == exchange), 'exchange'] = target
+
+    if mapping.symbol_suffixes:
+        df['symbol'] = df['symbol'].str.replace(mapping.symbol_suffixes, '', regex=True)
+
+    df['expiry'] = format_expiry(df['expiry'], mapping.expiry_format)
+
+    df['strike'] = df['strike'].astype(float) / mapping.strike_divisor
+    for (instrument_type, exchange), divisor in mapping.extra_strike_divisors.items():
+        mask = (df['instrumenttype'] == instrument_type) & (df['exchange'] == exchange)
+        df.loc[mask, 'strike'] = df.loc[mask, 'strike'] / divisor
+    df['lotsize'] = df['lotsize'].astype(int)
+    df['tick_size'] = df['tick_size'].astype(float) / mapping.tick_size_divisor
+
+    # OpenAlgo symbols, one vectorized assignment per instrument class
+    futures = _instrument_mask(df, mapping.futures)
+    if futures.any():
+        df.loc[futures, 'symbol'] = future_symbols(df.loc[futures, 'name'], df.loc[futures, 'expiry'])
+    options = _instrument_mask(df, mapping.options) & option_type.isin(['CE', 'PE'])
+    if options.any():
+        df.loc[options, 'symbol'] = option_symbols(
+            df.loc[options, 'name'], df.loc[options, 'expiry'], df.loc[options, 'strike'], option_type[options],
+            mapping.legacy_strike_text
+        )
+
+    if mapping.index_symbols:
+        df['symbol'] = df['symbol'].replace(mapping.index_symbols)
+    return df
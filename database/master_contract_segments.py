@@ -0,0 +1,144 @@
+"""
+Parallel per-segment master contract downloads.
+
+Brokers that publish one instrument file per exchange segment (NSE, NFO, BFO,
+MCX, CDS, ...) used to download and process them one after another. Here every
+segment is downloaded and parsed in its own worker thread (the downloads are
+network bound and the pandas parsers release the GIL for most of their work),
+then the segments are merged and loaded in one transaction. Post-login
+readiness is bounded by the slowest segment instead of the sum of all of them.
+
+    segments = [Segment('NSE_CM', nse_url, parse_nse), Segment('NSE_FO', nfo_url, parse_nfo)]
+    load_segments(download_segments(segments), 'fyers')
+
+refresh_segments does the same with conditional requests: when every segment is
+unchanged since the last load nothing is parsed or loaded.
+"""
+
+import io
+import os
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+import pandas as pd
+from utils.logging import get_logger
+from database.master_contract_source_db import (
+    SourceFingerprint, conditional_headers, response_fingerprint,
+    get_fingerprints, save_fingerprints, clear_fingerprints, reuse_loaded_contract
+)
+
+logger = get_logger(__name__)
+
+# Segments downloaded and parsed at the same time
+DOWNLOAD_WORKERS = int(os.getenv('MASTER_CONTRACT_DOWNLOAD_WORKERS', '6'))
+SEGMENT_TIMEOUT = float(os.getenv('MASTER_CONTRACT_SEGMENT_TIMEOUT', '60'))
+
+@dataclass
+class Segment:
+    """One instrument file: parse receives the downloaded body as a binary file object"""
+    name: str
+    url: str
+    parse: Callable[[io.BytesIO], pd.DataFrame]
+    headers: Optional[Dict[str, str]] = None
+
+def _download_segment(segment: Segment, previous: Optional[SourceFingerprint] = None) -> Tuple[SourceFingerprint, Optional[bytes]]:
+    """Conditional download: (fingerprint, body), body None when the server answered 304"""
+    from utils.httpx_client import get_httpx_client
+    response = get_httpx_client().get(
+        segment.url, headers=conditional_headers(segment.headers, previous), timeout=SEGMENT_TIMEOUT,
+        extensions={'traffic_class': 'data'}
+    )
+    if response.status_code == 304 and previous is not None:
+        return response_fingerprint(response, None, previous), None
+    response.raise_for_status()
+    return response_fingerprint(response, hashlib.sha256(response.content).hexdigest()), response.content
+
+def _fetch_segment(segment: Segment, content: Optional[bytes] = None) -> pd.DataFrame:
+    """Parse the segment, downloading it first unless its body is given"""
+    start_time = time.time()
+    if content is None:
+        _, content = _download_segment(segment)
+    downloaded = time.time()
+    df = segment.parse(io.BytesIO(content))
+    logger.info(
+        f"Segment {segment.name}: {len(content) / (1024 * 1024):.1f} MB downloaded in "
+        f"{downloaded - start_time:.2f}s, {len(df)} instruments parsed in {time.time() - downloaded:.2f}s"
+    )
+    return df
+
+def _run_segments(segments: List[Segment], task: Callable, max_workers: int, *args_by_segment) -> Dict:
+    """Run task(segment, ...) for every segment in worker threads; raises if any fails"""
+    results = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(segments))),
+                            thread_name_prefix='MasterContract') as executor:
+        futures = [
+            (segment, executor.submit(task, segment, *(args[segment.name] for args in args_by_segment)))
+            for segment in segments
+        ]
+        for segment, future in futures:
+            try:
+                results[segment.name] = future.result()
+            except Exception as e:
+                logger.error(f"Error downloading master contract segment {segment.name} from {segment.url}: {e}")
+                errors.append(f"{segment.name}: {e}")
+    if errors:
+        raise RuntimeError(f"Master contract download failed for {len(errors)} segment(s): {'; '.join(errors)}")
+    return results
+
+def download_segments(segments: List[Segment], max_workers: int = DOWNLOAD_WORKERS,
+                      contents: Optional[Dict[str, bytes]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Download and parse all segments concurrently (segments whose body is in contents
+    are only parsed). Returns segment name -> DataFrame in the order given. Raises if
+    any segment fails: loading a partial contract would remove the missing segment's
+    instruments.
+    """
+    start_time = time.time()
+    if contents:
+        bodies = {segment.name: contents.get(segment.name) for segment in segments}
+        frames = _run_segments(segments, _fetch_segment, max_workers, bodies)
+    else:
+        frames = _run_segments(segments, _fetch_segment, max_workers)
+    logger.info(f"Downloaded {len(segments)} master contract segments in {time.time() - start_time:.2f} seconds")
+    return frames
+
+def load_segments(frames: Dict[str, pd.DataFrame], broker: str):
+    """Merge parsed segments and load them into the symtoken table in one transaction"""
+    from database.master_contract_sync import INCREMENTAL_ENABLED, apply_master_contract, replace_contract
+    token_df = pd.concat([df for df in frames.values() if len(df)], ignore_index=True)
+    if INCREMENTAL_ENABLED:
+        apply_master_contract(token_df, broker)
+    else:
+        replace_contract(token_df)
+
+def refresh_segments(segments: List[Segment], broker: str, max_workers: int = DOWNLOAD_WORKERS) -> bool:
+    """
+    Conditionally download all segments and load them unless every one is unchanged
+    since the last load, in which case the loaded table and cache are reused.
+    Returns True when the contract was loaded, False when it was reused.
+    """
+    start_time = time.time()
+    previous = get_fingerprints(broker)
+    results = _run_segments(
+        segments, _download_segment, max_workers, {segment.name: previous.get(segment.name) for segment in segments}
+    )
+    fingerprints = {name: fingerprint for name, (fingerprint, _) in results.items()}
+    unchanged = [
+        segment.name for segment in segments
+        if results[segment.name][1] is None or fingerprints[segment.name].same_content(previous.get(segment.name))
+    ]
+    if len(unchanged) == len(segments) and set(previous) == set(fingerprints):
+        logger.info(f"All {len(segments)} master contract segments unchanged, checked in {time.time() - start_time:.2f} seconds")
+        save_fingerprints(broker, fingerprints)
+        reuse_loaded_contract(broker)
+        return False
+
+    # Some segment changed: the whole contract is loaded again (304 segments are downloaded in full)
+    clear_fingerprints()
+    frames = download_segments(segments, max_workers, {name: body for name, (_, body) in results.items()})
+    load_segments(frames, broker)
+    save_fingerprints(broker, fingerprints)
+    return True
@@ -0,0 +1,168 @@
+"""
+Fingerprints of the downloaded master contract files, per broker and segment.
+
+Every login used to download, parse and reload the full master contract even
+when the broker had not published a new file since the previous session. The
+ETag, Last-Modified and SHA-256 of each file loaded into symtoken are stored
+here; the next download is sent as a conditional request, and when the server
+answers 304 Not Modified (or the body hashes the same) parsing and loading are
+skipped and the existing symtoken table and symbol cache are reused.
+
+Fingerprints are only trusted while symtoken still holds the rows they were
+recorded with: every master contract download clears the other brokers'
+fingerprints before it starts, and the row count must still match.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import Column, DateTime, Integer, String, func
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+from utils.logging import get_logger
+from database.symbol import SymToken, engine
+
+logger = get_logger(__name__)
+
+# Set MASTER_CONTRACT_CONDITIONAL=FALSE to always download and reload the full contract
+CONDITIONAL_ENABLED = os.getenv('MASTER_CONTRACT_CONDITIONAL', 'TRUE').upper() == 'TRUE'
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base = declarative_base()
+
+class MasterContractSource(Base):
+    __tablename__ = 'master_contract_source'
+
+    broker = Column(String, primary_key=True)
+    segment = Column(String, primary_key=True)
+    etag = Column(String)
+    last_modified = Column(String)
+    content_hash = Column(String)
+    total_symbols = Column(Integer)
+    last_updated = Column(DateTime, default=datetime.now)
+
+# Create table if it doesn't exist
+Base.metadata.create_all(bind=engine)
+
+@dataclass
+class SourceFingerprint:
+    """Validators and body hash of one downloaded file"""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+
+    def same_content(self, other: Optional['SourceFingerprint']) -> bool:
+        return other is not None and self.content_hash is not None and self.content_hash == other.content_hash
+
+def conditional_headers(headers: Optional[Dict[str, str]], previous: Optional[SourceFingerprint]) -> Dict[str, str]:
+    """Request headers plus If-None-Match / If-Modified-Since from the previous download"""
+    headers = dict(headers or {})
+    if previous is not None:
+        if previous.etag:
+            headers['If-None-Match'] = previous.etag
+        if previous.last_modified:
+            headers['If-Modified-Since'] = previous.last_modified
+    return headers
+
+def response_fingerprint(response, content_hash: Optional[str], previous: Optional[SourceFingerprint] = None) -> SourceFingerprint:
+    """Fingerprint of a 200 response, or of the previous download refreshed by a 304's validators"""
+    if response.status_code == 304:
+        return SourceFingerprint(
+            etag=response.headers.get('ETag') or previous.etag,
+            last_modified=response.headers.get('Last-Modified') or previous.last_modified,
+            content_hash=previous.content_hash,
+        )
+    return SourceFingerprint(
+        etag=response.headers.get('ETag'),
+        last_modified=response.headers.get('Last-Modified'),
+        content_hash=content_hash,
+    )
+
+def _symbol_count(session) -> int:
+    return session.query(func.count(SymToken.id)).scalar() or 0
+
+def get_fingerprints(broker: str) -> Dict[str, SourceFingerprint]:
+    """
+    Segment -> fingerprint of the files currently loaded for broker. Empty when
+    conditional downloads are disabled or symtoken no longer matches them.
+    """
+    if not CONDITIONAL_ENABLED:
+        return {}
+    session = SessionLocal()
+    try:
+        sources = session.query(MasterContractSource).filter_by(broker=broker).all()
+        if not sources:
+            return {}
+        total_symbols = _symbol_count(session)
+        if not total_symbols or any(source.total_symbols != total_symbols for source in sources):
+            logger.info(f"Stored master contract fingerprints for {broker} do not match the symtoken table")
+            return {}
+        return {
+            source.segment: SourceFingerprint(source.etag, source.last_modified, source.content_hash)
+            for source in sources
+        }
+    except Exception as e:
+        logger.error(f"Error reading master contract fingerprints for {broker}: {e}")
+        return {}
+    finally:
+        session.close()
+
+def save_fingerprints(broker: str, fingerprints: Dict[str, SourceFingerprint]):
+    """Record the files just loaded into symtoken (replacing every broker's fingerprints)"""
+    session = SessionLocal()
+    try:
+        session.query(MasterContractSource).delete()
+        total_symbols = _symbol_count(session)
+        for segment, fingerprint in fingerprints.items():
+            session.add(MasterContractSource(
+                broker=broker,
+                segment=segment,
+                etag=fingerprint.etag,
+                last_modified=fingerprint.last_modified,
+                content_hash=fingerprint.content_hash,
+                total_symbols=total_symbols,
+                last_updated=datetime.now(),
+            ))
+        session.commit()
+    except Exception as e:
+        logger.error(f"Error saving master contract fingerprints for {broker}: {e}")
+        session.rollback()
+    finally:
+        session.close()
+
+def clear_fingerprints(keep_broker: Optional[str] = None):
+    """Forget all fingerprints (but keep_broker's, if given); called before symtoken is reloaded"""
+    session = SessionLocal()
+    try:
+        query = session.query(MasterContractSource)
+        if keep_broker:
+            query = query.filter(MasterContractSource.broker != keep_broker)
+        query.delete(synchronize_session=False)
+        session.commit()
+    except Exception as e:
+        logger.error(f"Error clearing master contract fingerprints: {e}")
+        session.rollback()
+    finally:
+        session.close()
+
+_unchanged_brokers = set()
+_unchanged_lock = threading.Lock()
+
+def reuse_loaded_contract(broker: str):
+    """The broker's files are unchanged: keep the symtoken table and the loaded symbol cache"""
+    from database.token_db_enhanced import get_cache
+    with _unchanged_lock:
+        _unchanged_brokers.add(broker)
+    # An empty diff lets the cache hook skip the reload when this broker's symbols are in memory
+    get_cache().apply_contract_diff(broker, set(), {})
+    logger.info(f"Master contract for {broker} is unchanged, reusing the loaded symbols")
+
+def take_unchanged_contract(broker: str) -> bool:
+    """True once after reuse_loaded_contract(broker)"""
+    with _unchanged_lock:
+        if broker in _unchanged_brokers:
+            _unchanged_brokers.discard(broker)
+            return True
+        return False
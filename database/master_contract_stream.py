@@ -0,0 +1,199 @@
+"""
+Streaming master contract pipeline shared by the broker master_contract_db modules.
+
+The scrip master is downloaded in chunks (no temp file), parsed incrementally
+(JSON arrays, CSV, optionally gzip compressed), normalized in column batches by
+the broker's vectorized DataFrame function, and handed to the loader as a row
+iterator. Only one chunk of the file and one batch of records are in memory at
+a time, however large the master contract is.
+
+    records = iter_json_array(stream_download(url))
+    rows = iter_normalized_rows(records, normalize_angel_frame)
+    apply_master_contract(rows, 'angel')   # or replace_contract(rows) for a full reload
+
+download_if_changed spools the body to a temporary file while hashing it, so an
+unchanged contract (304, or same SHA-256) is detected before any parsing.
+"""
+
+import os
+import csv
+import json
+import codecs
+import hashlib
+import tempfile
+import zlib
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import pandas as pd
+from utils.logging import get_logger
+from database.token_db_enhanced import SYMTOKEN_COLUMNS
+from database.master_contract_source_db import SourceFingerprint, conditional_headers, response_fingerprint
+
+logger = get_logger(__name__)
+
+# Bytes read from the response per chunk
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('MASTER_CONTRACT_CHUNK_SIZE', str(1024 * 1024)))
+# Records normalized (one DataFrame) and written per batch
+BATCH_SIZE = int(os.getenv('MASTER_CONTRACT_BATCH_SIZE', '20000'))
+DOWNLOAD_TIMEOUT = float(os.getenv('MASTER_CONTRACT_DOWNLOAD_TIMEOUT', '60'))
+# Downloads larger than this are spooled to disk by download_if_changed
+SPOOL_SIZE = int(os.getenv('MASTER_CONTRACT_SPOOL_SIZE', str(8 * 1024 * 1024)))
+
+_WHITESPACE = ' \t\r\n'
+
+def stream_download(url: str, headers: Dict[str, str] = None, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the response body in chunks using the shared HTTP client"""
+    from utils.httpx_client import get_httpx_client
+    client = get_httpx_client()
+    received = 0
+    with client.stream('GET', url, headers=headers, timeout=DOWNLOAD_TIMEOUT,
+                       extensions={'traffic_class': 'data'}) as response:
+        response.raise_for_status()
+        for chunk in response.iter_bytes(chunk_size):
+            received += len(chunk)
+            yield chunk
+    logger.info(f"Downloaded {received / (1024 * 1024):.1f} MB from {url}")
+
+def download_if_changed(url: str, previous: Optional[SourceFingerprint] = None, headers: Dict[str, str] = None,
+                        chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Tuple[SourceFingerprint, Optional[IO[bytes]]]:
+    """
+    Conditional download against the previous fingerprint. Returns
+    (fingerprint, None) when the server answers 304 or the body hashes the same as
+    before, otherwise (fingerprint, file with the body positioned at the start).
+    The caller closes the file.
+    """
+    from utils.httpx_client import get_httpx_client
+    client = get_httpx_client()
+    digest = hashlib.sha256()
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    try:
+        with client.stream('GET', url, headers=conditional_headers(headers, previous), timeout=DOWNLOAD_TIMEOUT,
+                           extensions={'traffic_class': 'data'}) as response:
+            if response.status_code == 304 and previous is not None:
+                body.close()
+                logger.info(f"Master contract at {url} not modified")
+                return response_fingerprint(response, None, previous), None
+            response.raise_for_status()
+            for chunk in response.iter_bytes(chunk_size):
+                digest.update(chunk)
+                body.write(chunk)
+        fingerprint = response_fingerprint(response, digest.hexdigest())
+        logger.info(f"Downloaded {body.tell() / (1024 * 1024):.1f} MB from {url}")
+    except Exception:
+        body.close()
+        raise
+    if fingerprint.same_content(previous):
+        body.close()
+        logger.info(f"Master contract at {url} has the same content as the loaded one")
+        return fingerprint, None
+    body.seek(0)
+    return fingerprint, body
+
+def iter_file(file: IO[bytes], chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a binary file in chunks"""
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+def iter_gunzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Decompress a gzip stream chunk by chunk"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    data = decompressor.flush()
+    if data:
+        yield data
+
+def _iter_text(chunks: Iterable[bytes], encoding: str) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+def iter_json_array(chunks: Iterable[bytes], encoding: str = 'utf-8') -> Iterator:
+    """Yield the elements of a top-level JSON array as they arrive"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    text_chunks = _iter_text(chunks, encoding)
+    while True:
+        text = next(text_chunks, None)
+        final = text is None
+        buffer = buffer[position:] + (text or '')
+        position = 0
+        while True:
+            while position < len(buffer) and (buffer[position] in _WHITESPACE or (started and buffer[position] == ',')):
+                position += 1
+            if position >= len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError("Master contract is not a JSON array")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break  # element continues in the next chunk
+            # Only accept an element once its delimiter has arrived: "4." may still become "4.5"
+            delimiter = end
+            while delimiter < len(buffer) and buffer[delimiter] in _WHITESPACE:
+                delimiter += 1
+            if delimiter == len(buffer) or buffer[delimiter] not in ',]':
+                if final:
+                    raise ValueError("Master contract JSON array is malformed")
+                break
+            yield value
+            position = end
+        if final:
+            raise ValueError("Master contract JSON array is incomplete")
+
+def iter_csv_records(chunks: Iterable[bytes], encoding: str = 'utf-8', **reader_options) -> Iterator[dict]:
+    """Yield the rows of a CSV file with a header line as dicts"""
+    def lines():
+        pending = ''
+        for text in _iter_text(chunks, encoding):
+            pending += text
+            parts = pending.splitlines(keepends=True)
+            # The last part may be a partial line
+            pending = parts.pop() if parts and not parts[-1].endswith(('\n', '\r')) else ''
+            yield from parts
+        if pending:
+            yield pending
+    yield from csv.DictReader(lines(), **reader_options)
+
+def iter_batches(items: Iterable, size: int = BATCH_SIZE) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_normalized_rows(records: Iterable[dict], normalize: Callable[[pd.DataFrame], pd.DataFrame],
+                         batch_size: int = BATCH_SIZE) -> Iterator[tuple]:
+    """
+    Normalize raw broker records in DataFrame batches and yield symtoken rows
+    (tuples in SYMTOKEN_COLUMNS order)
+    """
+    total = 0
+    for batch in iter_batches(records, batch_size):
+        df = normalize(pd.DataFrame.from_records(batch))
+        total += len(df)
+        yield from df[list(SYMTOKEN_COLUMNS)].itertuples(index=False, name=None)
+    logger.info(f"Normalized {total} master contract records")
@@ -0,0 +1,203 @@
+"""
+Incremental master contract refresh.
+
+Broker master_contract_download functions used to delete the symtoken table
+and bulk insert every instrument again, leaving a window with an empty table
+and forcing a full reload of the symbol cache. apply_master_contract instead
+diffs the downloaded contract against the current table by (token, broker
+exchange), applies only the inserted, removed and changed rows in one
+transaction, and patches the loaded symbol cache from the same diff.
+
+A first download (empty table) is bulk loaded without a diff.
+
+Memory: the diff keeps one entry per stored instrument (its key, row id and a
+16-byte digest of the row, not the row itself) plus the full rows of whatever
+was inserted or changed, so it uses O(table) memory, while the streaming full
+reload (replace_contract) holds only one batch at a time. The trade buys fewer
+writes and an in-place cache patch. On memory-constrained hosts (small VPS,
+more than a few million instruments) set MASTER_CONTRACT_INCREMENTAL=FALSE to
+always use the full reload.
+"""
+
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Tuple
+from utils.logging import get_logger
+from database.symbol import SymToken, db_session, mark_symbol_fts_stale
+from database.token_db_enhanced import SYMTOKEN_COLUMNS, get_cache
+
+logger = get_logger(__name__)
+
+INCREMENTAL_ENABLED = os.getenv('MASTER_CONTRACT_INCREMENTAL', 'TRUE').upper() == 'TRUE'
+# Rows per DELETE ... WHERE id IN (...) statement (SQLite caps bound parameters)
+DELETE_BATCH_SIZE = 500
+
+TOKEN = SYMTOKEN_COLUMNS.index('token')
+BREXCHANGE = SYMTOKEN_COLUMNS.index('brexchange')
+
+ContractKey = Tuple[str, str]
+
+@dataclass
+class ContractDiff:
+    """Changes between the symtoken table and a downloaded master contract"""
+    inserted: List[tuple] = field(default_factory=list)
+    changed: List[Tuple[int, tuple]] = field(default_factory=list)  # (symtoken id, new values)
+    removed: List[Tuple[int, ContractKey]] = field(default_factory=list)  # (symtoken id, key)
+    unchanged: int = 0
+    duplicates: int = 0
+    bulk_inserted: int = 0  # rows bulk loaded into an empty table (not kept in inserted)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.inserted or self.changed or self.removed)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.inserted) + self.bulk_inserted} inserted, {len(self.changed)} changed, "
+            f"{len(self.removed)} removed, {self.unchanged} unchanged"
+        )
+
+def _clean(value):
+    """Plain Python value as stored in the database (NaN and numpy scalars normalized)"""
+    if value is None:
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+def normalize_row(values) -> tuple:
+    """Master contract row in SYMTOKEN_COLUMNS order, comparable with a stored row"""
+    row = [_clean(value) for value in values]
+    if row[TOKEN] is not None:
+        row[TOKEN] = str(row[TOKEN])
+    return tuple(row)
+
+def row_key(values: tuple) -> ContractKey:
+    # Tokens are only unique within a broker exchange segment
+    return values[TOKEN], values[BREXCHANGE]
+
+def iter_contract_rows(contract) -> Iterable[tuple]:
+    """Rows of a processed master contract DataFrame, or any iterable of rows, in SYMTOKEN_COLUMNS order"""
+    if hasattr(contract, 'itertuples'):
+        return contract[list(SYMTOKEN_COLUMNS)].itertuples(index=False, name=None)
+    return contract
+
+def row_digest(values: tuple) -> bytes:
+    """Compact fingerprint of a normalized row; whole floats hash like ints so 75 and 75.0 match"""
+    canonical = tuple(
+        int(value) if isinstance(value, float) and value.is_integer() else value for value in values
+    )
+    return hashlib.blake2b(repr(canonical).encode('utf-8'), digest_size=16).digest()
+
+def load_current_rows() -> Dict[ContractKey, Tuple[int, bytes]]:
+    """Key -> (symtoken id, row digest) for every stored instrument"""
+    current = {}
+    rows = db_session.query(
+        SymToken.id, *(getattr(SymToken, column) for column in SYMTOKEN_COLUMNS)
+    ).yield_per(10000)
+    for row in rows:
+        values = normalize_row(row[1:])
+        current[row_key(values)] = (row[0], row_digest(values))
+    return current
+
+def unique_rows(rows: Iterable, diff: ContractDiff, seen: set) -> Iterator[tuple]:
+    """Normalized rows where the first row of a duplicated key wins; the rest are counted in diff"""
+    for values in rows:
+        values = normalize_row(values)
+        key = row_key(values)
+        if key in seen:
+            diff.duplicates += 1
+            continue
+        seen.add(key)
+        yield values
+
+def diff_contract(current: Dict[ContractKey, Tuple[int, bytes]], rows: Iterable) -> ContractDiff:
+    """
+    Compare downloaded rows with the stored ones (the first row of a duplicated key wins).
+    Consumes current: keys already seen are marked in place instead of kept in a second set.
+    """
+    diff = ContractDiff()
+    for values in rows:
+        values = normalize_row(values)
+        key = row_key(values)
+        stored = current.get(key, False)
+        if stored is None:
+            diff.duplicates += 1
+            continue
+        current[key] = None
+        if stored is False:
+            diff.inserted.append(values)
+        elif stored[1] != row_digest(values):
+            diff.changed.append((stored[0], values))
+        else:
+            diff.unchanged += 1
+    diff.removed = [(stored[0], key) for key, stored in current.items() if stored is not None]
+    return diff
+
+def apply_diff(diff: ContractDiff):
+    """Apply a diff to the symtoken table in one transaction"""
+    try:
+        removed_ids = [row_id for row_id, _ in diff.removed]
+        for start in range(0, len(removed_ids), DELETE_BATCH_SIZE):
+            db_session.query(SymToken).filter(
+                SymToken.id.in_(removed_ids[start:start + DELETE_BATCH_SIZE])
+            ).delete(synchronize_session=False)
+        if diff.changed:
+            db_session.bulk_update_mappings(SymToken, [
+                dict(zip(SYMTOKEN_COLUMNS, values), id=row_id) for row_id, values in diff.changed
+            ])
+        if diff.inserted:
+            db_session.bulk_insert_mappings(SymToken, [
+                dict(zip(SYMTOKEN_COLUMNS, values)) for values in diff.inserted
+            ])
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+    mark_symbol_fts_stale()
+
+def replace_contract(contract) -> int:
+    """
+    Replace every symtoken row with a processed master contract in one transaction (no diff).
+    Duplicated keys are dropped the way diff_contract drops them, so a later
+    incremental refresh and the symbol cache see the same rows as the table.
+    """
+    from database.symtoken_loader import bulk_load_symtokens
+    diff = ContractDiff()
+    loaded = bulk_load_symtokens(unique_rows(iter_contract_rows(contract), diff, set()))
+    if diff.duplicates:
+        logger.warning(f"Skipped {diff.duplicates} master contract rows with a duplicate token")
+    return loaded
+
+def apply_master_contract(contract, broker: str) -> ContractDiff:
+    """
+    Refresh the symtoken table from a processed master contract (DataFrame with the
+    symtoken columns, or an iterable of rows in SYMTOKEN_COLUMNS order) by applying
+    only the differences, then patch the symbol cache in place.
+    Raises if the database update fails (the table is left unchanged).
+    """
+    start_time = time.time()
+    current = load_current_rows()
+    if not current:
+        # First download: nothing to compare, bulk load batch by batch without holding the rows
+        diff = ContractDiff(bulk_inserted=replace_contract(contract))
+        logger.info(f"Master contract for {broker} loaded into an empty table in {time.time() - start_time:.2f} seconds: {diff.summary()}")
+        return diff
+    
+    diff = diff_contract(current, iter_contract_rows(contract))
+    del current
+    if diff.duplicates:
+        logger.warning(f"Skipped {diff.duplicates} master contract rows with a duplicate token")
+    if not diff.empty:
+        apply_diff(diff)
+    logger.info(f"Master contract for {broker} applied incrementally in {time.time() - start_time:.2f} seconds: {diff.summary()}")
+
+    # The cache holds exactly what the table held before the diff, so patch it from the same changes
+    upserts = {row_key(values): values for values in diff.inserted}
+    upserts.update((row_key(values), values) for _, values in diff.changed)
+    get_cache().apply_contract_diff(broker, {key for _, key in diff.removed}, upserts)
+    return diff
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, Sequence, Index, or_, and_
+from sqlalchemy import create_engine, Column, Integer, String, Float, Sequence, Index, or_, and_, text
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.pool import NullPool
@@ -51,18 +51,119 @@ class SymToken(Base):
         Index('idx_brsymbol_exchange', 'brsymbol', 'exchange'),
     )
 
-def enhanced_search_symbols(query: str, exchange: str = None) -> List[SymToken]:
+# Upper bound on the rows returned by one enhanced_search_symbols call
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', '1000'))
+
+# SQLite FTS5 index over symtoken, used for search when the symbol cache is not loaded
+FTS_TABLE = 'symtoken_fts'
+FTS_COLUMNS = ('symbol', 'brsymbol', 'name', 'token', 'expiry', 'instrumenttype', 'strike')
+# None: not checked since startup or the last symtoken load, True: current, False: FTS5 unavailable
+_fts_available = None
+
+def _is_sqlite() -> bool:
+    return engine.dialect.name == 'sqlite'
+
+def rebuild_symbol_fts() -> bool:
+    """
+    (Re)build the FTS5 search index from the symtoken table. Called after the
+    master contract is loaded; search also builds it on first use.
+    """
+    global _fts_available
+    if not _is_sqlite() or _fts_available is False:
+        return False
+    try:
+        with engine.begin() as conn:
+            # tokenchars keep symbols like SBIN-EQ, M&M or 28-OCT-25 as one token
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"{', '.join(FTS_COLUMNS)}, content='symtoken', content_rowid='id', "
+                "tokenize=\"unicode61 tokenchars '-_.&'\", prefix='2 3')"
+            ))
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')"))
+        _fts_available = True
+        return True
+    except Exception as e:
+        # SQLite builds without FTS5 fall back to the plain LIKE search
+        logger.warning(f"Symbol FTS5 index unavailable, using LIKE search: {e}")
+        _fts_available = False
+        return False
+
+def mark_symbol_fts_stale():
+    """Called after symtoken is reloaded; the next search checks the FTS5 index again"""
+    global _fts_available
+    if _fts_available:
+        _fts_available = None
+
+def _ensure_symbol_fts() -> bool:
+    """
+    Make sure the FTS5 index exists and covers the current symtoken rows. The
+    row counts are only compared once after startup or a symtoken load.
+    """
+    global _fts_available
+    if not _is_sqlite() or _fts_available is False:
+        return False
+    if _fts_available:
+        return True
+    try:
+        with engine.connect() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+            ).first()
+            if exists:
+                indexed = conn.execute(text(f"SELECT count(*) FROM {FTS_TABLE}_docsize")).scalar()
+                if indexed == conn.execute(text("SELECT count(*) FROM symtoken")).scalar():
+                    _fts_available = True
+                    return True
+    except Exception as e:
+        logger.debug(f"Error checking symbol FTS5 index: {e}")
+    return rebuild_symbol_fts()
+
+def _fts_term(term: str, number) -> str:
+    """FTS5 prefix query for one term; a superset of the SQL conditions checked afterwards"""
+    variants = {term}
+    if number is not None:
+        # Strikes are indexed as SQLite renders REAL values, e.g. 25000.0
+        variants.add(repr(number))
+    return '(' + ' OR '.join('"' + v.replace('"', '""') + '" *' for v in sorted(variants)) + ')'
+
+def _search_from_cache(query: str, exchange: str, limit: int, offset: int):
+    """Serve the search from the in-memory symbol index; None when the cache is not usable"""
+    try:
+        from database.token_db_enhanced import get_cache
+        cache = get_cache()
+        if cache.is_ready():
+            return cache.search_terms(query, exchange=exchange, limit=limit, offset=offset)
+    except Exception as e:
+        logger.error(f"Error searching symbol cache: {e}")
+    return None
+
+def enhanced_search_symbols(query: str, exchange: str = None, limit: int = None, offset: int = 0) -> List[SymToken]:
     """
     Enhanced search function that searches across multiple fields
     and supports partial matching with multiple terms
     
+    Served from the in-memory symbol index when the cache is loaded, otherwise
+    from the database (narrowed with the FTS5 index on SQLite).
+    
     Args:
         query (str): Search query string
         exchange (str, optional): Exchange to filter by
+        limit (int, optional): Page size, capped at SEARCH_MAX_RESULTS. Without
+            a limit every match is returned in symtoken order.
+        offset (int, optional): Number of matches to skip
         
     Returns:
-        List[SymToken]: List of matching SymToken objects
+        List[SymToken]: Matching SymToken objects (SymbolData objects with the
+        same attributes when served from the cache)
     """
+    if limit is not None:
+        limit = min(limit or SEARCH_MAX_RESULTS, SEARCH_MAX_RESULTS)
+    offset = max(offset or 0, 0)
+
+    results = _search_from_cache(query, exchange, limit, offset)
+    if results is not None:
+        return results
+
     try:
         # Split the query into terms and clean them
         terms = [term.strip().upper() for term in query.split() if term.strip()]
@@ -76,6 +177,7 @@ def enhanced_search_symbols(query: str, exchange: str = None) -> List[SymToken]:
         
         # Create conditions for each term
         all_conditions = []
+        fts_terms = []
         for term in terms:
             # Number detection for more accurate strike price and token searches
             try:
@@ -88,6 +190,7 @@ def enhanced_search_symbols(query: str, exchange: str = None) -> List[SymToken]:
                     SymToken.strike == num_term
                 )
             except ValueError:
+                num_term = None
                 term_conditions = or_(
                     SymToken.symbol.ilike(f'{term}%'),
                     SymToken.brsymbol.ilike(f'{term}%'),
@@ -97,16 +200,24 @@ def enhanced_search_symbols(query: str, exchange: str = None) -> List[SymToken]:
                     SymToken.instrumenttype == term
                 )
             all_conditions.append(term_conditions)
+            fts_terms.append(_fts_term(term, num_term))
         
         # Combine all conditions with AND
         if all_conditions:
             final_query = base_query.filter(and_(*all_conditions))
+            if _ensure_symbol_fts():
+                # Let the FTS5 index pick the candidate rows instead of scanning symtoken
+                candidates = text(
+                    f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+                ).bindparams(match=' AND '.join(fts_terms)).columns(rowid=Integer)
+                final_query = final_query.filter(SymToken.id.in_(candidates))
         else:
             final_query = base_query
 
-        # Execute query - no limit to show all matching results
-        results = final_query.all()
-        return results
+        final_query = final_query.order_by(SymToken.id).offset(offset)
+        if limit is not None:
+            final_query = final_query.limit(limit)
+        return final_query.all()
         
     except Exception as e:
         logger.error(f"Error in enhanced search: {str(e)}")
@@ -0,0 +1,243 @@
+"""
+Prefix and n-gram search index over the broker symbol cache.
+
+Built once per SymbolTable in BrokerSymbolCache.load_all_symbols. Every
+distinct upper-cased symbol, broker symbol and name becomes a key in a sorted
+array (prefix lookups by bisection); keys are also posted under each of their
+bigrams and trigrams (substring lookups scan the keys of the rarest n-gram).
+Keys map to row ids of the table in a flat CSR layout, so the index holds no
+per-row objects.
+
+Results are ranked exact, then prefix, then substring. Within a tier keys are
+visited in sorted order and rows in table order, so the same query over the
+same master contract always gives the same result.
+
+match_terms serves the multi-term search of database.symbol.enhanced_search_symbols:
+every term must prefix-match symbol, brsymbol, name or token, or equal the
+strike (numeric terms), expiry or instrument type.
+"""
+
+from array import array
+import sys
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Ranking tiers
+TIER_EXACT = 0
+TIER_PREFIX = 1
+TIER_SUBSTRING = 2
+
+def _parse_number(term: str) -> Optional[float]:
+    try:
+        return float(term)
+    except ValueError:
+        return None
+
+def _rows_by_code(column) -> List[array]:
+    """Row ids per code of a CategoryColumn"""
+    rows = [array('I') for _ in column.values]
+    for row, code in enumerate(column.codes):
+        rows[code].append(row)
+    return rows
+
+def _ngrams(text: str, n: int) -> Iterable[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+class SymbolSearchIndex:
+    """Immutable search index over the symbol, brsymbol and name columns of a SymbolTable"""
+
+    def __init__(self, table):
+        self.table = table
+        key_rows: Dict[str, List[int]] = {}
+        for column in (table.symbol, table.brsymbol):
+            for row, value in enumerate(column):
+                if value:
+                    key_rows.setdefault(sys.intern(value.upper()), []).append(row)
+        name = table.name
+        for row, code in enumerate(name.codes):
+            value = name.values[code]
+            if value:
+                key_rows.setdefault(sys.intern(value.upper()), []).append(row)
+
+        # Sorted distinct keys; rows of key i are rows[offsets[i]:offsets[i + 1]]
+        self.keys: List[str] = sorted(key_rows)
+        self.offsets = array('I', [0])
+        self.rows = array('I')
+        for key in self.keys:
+            # A row can reach the same key through several columns (e.g. symbol == brsymbol)
+            self.rows.extend(sorted(set(key_rows[key])))
+            self.offsets.append(len(self.rows))
+        del key_rows
+
+        postings: Dict[str, List[int]] = {}
+        for key_id, key in enumerate(self.keys):
+            for gram in _ngrams(key, 2) | _ngrams(key, 3):
+                postings.setdefault(gram, []).append(key_id)
+        self.ngrams: Dict[str, array] = {gram: array('I', ids) for gram, ids in postings.items()}
+
+        # Secondary lookups for match_terms: token prefix, strike and category equality
+        token_order = sorted(range(len(table.token)), key=table.token.__getitem__)
+        self.tokens: List[str] = [sys.intern(table.token[row].upper()) for row in token_order]
+        self.token_rows = array('I', token_order)
+        strike_rows: Dict[float, List[int]] = {}
+        for row, strike in enumerate(table.strike):
+            if strike == strike:  # skip NaN (no strike)
+                strike_rows.setdefault(strike, []).append(row)
+        self.strike_rows: Dict[float, array] = {strike: array('I', rows) for strike, rows in strike_rows.items()}
+        self.expiry_rows = _rows_by_code(table.expiry)
+        self.instrumenttype_rows = _rows_by_code(table.instrumenttype)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _key_rows(self, key_id: int) -> array:
+        return self.rows[self.offsets[key_id]:self.offsets[key_id + 1]]
+
+    def _prefix_range(self, query: str):
+        lo = bisect_left(self.keys, query)
+        # Every key starting with query sorts before query + U+FFFF
+        hi = bisect_left(self.keys, query + '\uffff', lo)
+        return lo, hi
+
+    def _substring_key_ids(self, query: str) -> Iterator[int]:
+        """Key ids containing query (in key order), excluding keys that start with it"""
+        if len(query) >= 2:
+            # Scan the rarest n-gram's posting list; the substring check below verifies the rest
+            postings = [self.ngrams.get(gram) for gram in _ngrams(query, min(len(query), 3))]
+            if not all(postings):
+                return
+            candidate_ids = min(postings, key=len)
+        else:
+            candidate_ids = range(len(self.keys))
+
+        keys = self.keys
+        for key_id in candidate_ids:
+            key = keys[key_id]
+            if query in key and not key.startswith(query):
+                yield key_id
+
+    def iter_matches(self, query: str) -> Iterator[tuple]:
+        """Yield (tier, row) for every row matching query, best tier first, each row once"""
+        query = query.upper()
+        seen = set()
+        lo, hi = self._prefix_range(query)
+
+        # Exact keys sort first within the prefix range, so the tiers come out in order
+        for key_id in range(lo, hi):
+            tier = TIER_EXACT if self.keys[key_id] == query else TIER_PREFIX
+            for row in self._key_rows(key_id):
+                if row not in seen:
+                    seen.add(row)
+                    yield tier, row
+
+        for key_id in self._substring_key_ids(query):
+            for row in self._key_rows(key_id):
+                if row not in seen:
+                    seen.add(row)
+                    yield TIER_SUBSTRING, row
+
+    def _term_sources(self, term: str, number: Optional[float]) -> List[tuple]:
+        """(row count, row iterable) pairs covering every row a term can match"""
+        sources = []
+        lo, hi = self._prefix_range(term)
+        if hi > lo:
+            start, end = self.offsets[lo], self.offsets[hi]
+            sources.append((end - start, self.rows[start:end]))
+        lo = bisect_left(self.tokens, term)
+        hi = bisect_left(self.tokens, term + '\uffff', lo)
+        if hi > lo:
+            sources.append((hi - lo, self.token_rows[lo:hi]))
+        if number is not None:
+            rows = self.strike_rows.get(number)
+            if rows:
+                sources.append((len(rows), rows))
+        else:
+            for column, rows_by_code in ((self.table.expiry, self.expiry_rows),
+                                         (self.table.instrumenttype, self.instrumenttype_rows)):
+                code = column.code_of(term)
+                if code is not None:
+                    sources.append((len(rows_by_code[code]), rows_by_code[code]))
+        return sources
+
+    def _row_matches(self, row: int, term: str, number: Optional[float]) -> bool:
+        table = self.table
+        name = table.name[row]
+        if (table.symbol[row].upper().startswith(term) or
+                table.brsymbol[row].upper().startswith(term) or
+                (name and name.upper().startswith(term)) or
+                table.token[row].upper().startswith(term)):
+            return True
+        if number is not None:
+            return table.strike[row] == number
+        return table.expiry[row] == term or table.instrumenttype[row] == term
+
+    def match_terms(self, query: str) -> Iterator[int]:
+        """
+        Yield rows matching every whitespace-separated term of query. Rows come
+        from the most selective term (exact and prefix key matches first) and
+        are checked against the others.
+        """
+        terms = [(term, _parse_number(term)) for term in query.upper().split()]
+        if not terms:
+            yield from range(len(self.table))
+            return
+
+        sources = [self._term_sources(term, number) for term, number in terms]
+        driver = min(range(len(terms)), key=lambda i: sum(count for count, _ in sources[i]))
+        others = terms[:driver] + terms[driver + 1:]
+
+        seen = set()
+        for _, rows in sources[driver]:
+            for row in rows:
+                if row in seen:
+                    continue
+                seen.add(row)
+                if all(self._row_matches(row, term, number) for term, number in others):
+                    yield row
+
+    def _collect(self, candidates: Iterable[int], exchange: Optional[str], instrumenttype: Optional[str],
+                 limit: Optional[int], offset: int) -> List[int]:
+        """Apply the exchange/instrument type filters and the offset/limit window"""
+        table = self.table
+        exchange_code = instrumenttype_code = None
+        if exchange:
+            exchange_code = table.exchange.code_of(exchange)
+            if exchange_code is None:
+                return []
+        if instrumenttype:
+            instrumenttype_code = table.instrumenttype.code_of(instrumenttype)
+            if instrumenttype_code is None:
+                return []
+
+        results = []
+        for row in candidates:
+            if exchange_code is not None and table.exchange.codes[row] != exchange_code:
+                continue
+            if instrumenttype_code is not None and table.instrumenttype.codes[row] != instrumenttype_code:
+                continue
+            if offset:
+                offset -= 1
+                continue
+            results.append(row)
+            if limit and len(results) >= limit:
+                break
+        return results
+
+    def search(self, query: str, exchange: Optional[str] = None, instrumenttype: Optional[str] = None,
+               limit: Optional[int] = 50, offset: int = 0) -> List[int]:
+        """Row ids matching query, ranked exact, prefix, substring, with optional filters"""
+        if query:
+            candidates = (row for _, row in self.iter_matches(query))
+        else:
+            candidates = range(len(self.table))
+        return self._collect(candidates, exchange, instrumenttype, limit, offset)
+
+    def search_terms(self, query: str, exchange: Optional[str] = None, limit: Optional[int] = None,
+                     offset: int = 0) -> List[int]:
+        """
+        Row ids matching every term of query (see match_terms), with exchange filter
+        and paging. Without a limit every match is returned in table order.
+        """
+        if limit is None:
+            return sorted(self._collect(self.match_terms(query), exchange, None, None, 0))[offset:]
+        return self._collect(self.match_terms(query), exchange, None, limit, offset)
@@ -0,0 +1,341 @@
+"""
+Memory-mapped symbol cache snapshot shared across processes.
+
+The process that loads the master contract into the symbol cache writes the
+columnar SymbolTable to a versioned binary file (string heaps with offset
+arrays, dictionary codes, typed numeric arrays and open-addressing hash
+indexes of row ids). Other processes - additional workers, the WebSocket
+proxy, strategy processes - map the file read-only instead of querying the
+database: opening takes milliseconds, nothing is copied per row, and the
+pages are shared through the OS page cache.
+
+A small pointer file names the current snapshot. Readers check it every few
+seconds and remap when a new version is published, or drop the cache when
+the pointer is removed (logout).
+"""
+
+import os
+import mmap
+import glob
+import struct
+import threading
+import time
+import zlib
+from array import array
+from typing import Dict, Optional, Tuple
+from utils.logging import get_logger
+from database.token_db_enhanced import SymbolTable, CategoryColumn, STRING_COLUMNS, CATEGORY_COLUMNS
+from database.symbol_search_index import SymbolSearchIndex
+from database.derivatives_index import DerivativesIndex
+
+logger = get_logger(__name__)
+
+SNAPSHOT_ENABLED = os.getenv('SYMBOL_SNAPSHOT_ENABLED', 'TRUE').upper() == 'TRUE'
+SNAPSHOT_DIR = os.getenv('SYMBOL_SNAPSHOT_DIR', os.path.join('db', 'symbol_cache'))
+# How often readers look for a newer snapshot, in seconds
+SNAPSHOT_CHECK_SECONDS = float(os.getenv('SYMBOL_SNAPSHOT_CHECK_SECONDS', '2'))
+
+POINTER_FILE = 'symbols.current'
+MAGIC = b'OASYMSNP'
+FORMAT_VERSION = 1
+
+# magic, format version, section count, snapshot version, created (epoch seconds), rows, broker
+_HEADER = struct.Struct('<8sIIQdI32s')
+# name, typecode, offset, length in bytes
+_SECTION = struct.Struct('<32sc7xQQ')
+
+EMPTY_SLOT = 0xFFFFFFFF
+
+# Hash indexes: name -> (key column, keyed by exchange)
+INDEXES = {
+    'symbol': ('symbol', True),
+    'brsymbol': ('brsymbol', True),
+    'token': ('token', True),
+    'token_any': ('token', False),
+}
+
+def _hash_key(key: bytes, exchange: Optional[bytes]) -> int:
+    # crc32 is stable across processes (str hashes are randomized per process)
+    return zlib.crc32(key + b'\x00' + exchange) if exchange is not None else zlib.crc32(key)
+
+def _encode_strings(values) -> Tuple[array, bytes]:
+    """Offsets (n + 1) and concatenated UTF-8 bytes of a string sequence"""
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = array('I', [0])
+    position = 0
+    for value in encoded:
+        position += len(value)
+        offsets.append(position)
+    return offsets, b''.join(encoded)
+
+def _build_hash_index(entries, size_hint: int) -> array:
+    """Open-addressing table of row ids; entries are (key bytes, exchange bytes or None, row)"""
+    size = 1
+    while size < size_hint * 2:
+        size <<= 1
+    mask = size - 1
+    slots = array('I', [EMPTY_SLOT]) * size
+    for key, exchange, row in entries:
+        slot = _hash_key(key, exchange) & mask
+        while slots[slot] != EMPTY_SLOT:
+            slot = (slot + 1) & mask
+        slots[slot] = row
+    return slots
+
+def _index_entries(table: SymbolTable, name: str):
+    if name == 'token_any':
+        for token, row in table.by_token.items():
+            yield token.encode('utf-8'), None, row
+        return
+    index = {'symbol': table.by_symbol, 'brsymbol': table.by_brsymbol, 'token': table.by_token_exchange}[name]
+    for exchange, by_key in index.items():
+        exchange_bytes = exchange.encode('utf-8')
+        for key, row in by_key.items():
+            yield key.encode('utf-8'), exchange_bytes, row
+
+def _snapshot_sections(table: SymbolTable) -> Dict[str, Tuple[str, bytes]]:
+    """Section name -> (typecode, bytes) for a loaded SymbolTable"""
+    sections = {}
+    for column in STRING_COLUMNS:
+        offsets, heap = _encode_strings(getattr(table, column))
+        sections[f'{column}.offsets'] = ('I', offsets.tobytes())
+        sections[f'{column}.heap'] = ('B', heap)
+    for column in CATEGORY_COLUMNS:
+        category = getattr(table, column)
+        # values[0] is always None; only the real values are stored
+        offsets, heap = _encode_strings(category.values[1:])
+        sections[f'{column}.codes'] = ('I', category.codes.tobytes())
+        sections[f'{column}.value_offsets'] = ('I', offsets.tobytes())
+        sections[f'{column}.value_heap'] = ('B', heap)
+    sections['strike'] = ('d', table.strike.tobytes())
+    sections['lotsize'] = ('q', table.lotsize.tobytes())
+    sections['tick_size'] = ('d', table.tick_size.tobytes())
+    for name in INDEXES:
+        slots = _build_hash_index(_index_entries(table, name), len(table))
+        sections[f'index.{name}'] = ('I', slots.tobytes())
+    return sections
+
+def _snapshot_path(name: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, name)
+
+def snapshot_version(name: str) -> int:
+    """Version encoded in a snapshot file name (symbols-<version>.snap)"""
+    try:
+        return int(name[len('symbols-'):-len('.snap')])
+    except ValueError:
+        return 0
+
+def read_pointer() -> Optional[str]:
+    """File name of the current snapshot, or None when there is none"""
+    try:
+        with open(_snapshot_path(POINTER_FILE), 'r') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def write_snapshot(table: SymbolTable, broker: str) -> Optional[str]:
+    """
+    Write a new snapshot version of a loaded SymbolTable and publish it.
+    Returns the snapshot file name, or None if it could not be written.
+    """
+    if not SNAPSHOT_ENABLED or not len(table):
+        return None
+    try:
+        start_time = time.time()
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        version = time.time_ns()
+        name = f'symbols-{version}.snap'
+        sections = _snapshot_sections(table)
+
+        position = _HEADER.size + _SECTION.size * len(sections)
+        directory = []
+        for section, (typecode, data) in sections.items():
+            position = (position + 7) & ~7
+            directory.append(_SECTION.pack(section.encode(), typecode.encode(), position, len(data)))
+            position += len(data)
+
+        tmp_path = _snapshot_path(name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections), version, time.time(),
+                                 len(table), broker.encode()[:32]))
+            f.write(b''.join(directory))
+            for typecode, data in sections.values():
+                f.write(b'\x00' * (-f.tell() & 7))
+                f.write(data)
+        os.replace(tmp_path, _snapshot_path(name))
+
+        # Publish: readers pick up the new pointer on their next check
+        pointer_tmp = _snapshot_path(POINTER_FILE + '.tmp')
+        with open(pointer_tmp, 'w') as f:
+            f.write(name)
+        os.replace(pointer_tmp, _snapshot_path(POINTER_FILE))
+
+        _remove_old_snapshots(keep=name)
+        logger.info(
+            f"Wrote symbol cache snapshot {name} ({len(table)} symbols, "
+            f"{position / (1024 * 1024):.2f} MB) in {time.time() - start_time:.2f} seconds"
+        )
+        return name
+    except Exception as e:
+        logger.error(f"Error writing symbol cache snapshot: {e}")
+        return None
+
+def _remove_old_snapshots(keep: Optional[str] = None):
+    for path in glob.glob(_snapshot_path('symbols-*.snap*')):
+        if os.path.basename(path) == keep:
+            continue
+        try:
+            # Processes that still map an old file keep their pages until they remap
+            os.remove(path)
+        except OSError:
+            # Windows refuses to delete mapped files; the next write retries
+            pass
+
+def remove_snapshot():
+    """Unpublish the snapshot (on logout); readers drop their mapped cache on the next check"""
+    try:
+        os.remove(_snapshot_path(POINTER_FILE))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Error removing symbol cache snapshot pointer: {e}")
+    _remove_old_snapshots()
+
+class MappedStringColumn:
+    """Read-only string column over an offsets array and a UTF-8 heap in the mapping"""
+
+    __slots__ = ('offsets', 'heap')
+
+    def __init__(self, offsets: memoryview, heap: memoryview):
+        self.offsets = offsets
+        self.heap = heap
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return str(self.heap[self.offsets[row]:self.offsets[row + 1]], 'utf-8')
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def equals(self, row: int, value: bytes) -> bool:
+        """Compare a row with encoded bytes without decoding it"""
+        return self.heap[self.offsets[row]:self.offsets[row + 1]] == value
+
+class MappedSymbolTable(SymbolTable):
+    """SymbolTable backed by a read-only memory-mapped snapshot file"""
+
+    def __init__(self, name: str):
+        path = _snapshot_path(name)
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        magic, format_version, section_count, version, created, rows, broker = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported symbol snapshot format in {name}")
+        self.file_name = name
+        self.version = version
+        self.created = created
+        self.broker = broker.rstrip(b'\x00').decode()
+        self._rows = rows
+
+        sections = {}
+        for i in range(section_count):
+            section, typecode, offset, length = _SECTION.unpack_from(buffer, _HEADER.size + i * _SECTION.size)
+            view = buffer[offset:offset + length]
+            typecode = typecode.decode()
+            sections[section.rstrip(b'\x00').decode()] = view if typecode == 'B' else view.cast(typecode)
+
+        for column in STRING_COLUMNS:
+            setattr(self, column, MappedStringColumn(sections[f'{column}.offsets'], sections[f'{column}.heap']))
+        for column in CATEGORY_COLUMNS:
+            values = MappedStringColumn(sections[f'{column}.value_offsets'], sections[f'{column}.value_heap'])
+            setattr(self, column, CategoryColumn.from_parts([None] + list(values), sections[f'{column}.codes']))
+        self.strike = sections['strike']
+        self.lotsize = sections['lotsize']
+        self.tick_size = sections['tick_size']
+        self._indexes = {name: sections[f'index.{name}'] for name in INDEXES}
+
+        self._search_index: Optional[SymbolSearchIndex] = None
+        self._derivatives_index: Optional[DerivativesIndex] = None
+        self._index_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @property
+    def search_index(self) -> SymbolSearchIndex:
+        """Built on first search; processes that only resolve tokens never pay for it"""
+        if self._search_index is None:
+            with self._index_lock:
+                if self._search_index is None:
+                    self._search_index = SymbolSearchIndex(self)
+        return self._search_index
+
+    @property
+    def derivatives_index(self) -> DerivativesIndex:
+        """Built on first option/futures query"""
+        if self._derivatives_index is None:
+            with self._index_lock:
+                if self._derivatives_index is None:
+                    self._derivatives_index = DerivativesIndex(self)
+        return self._derivatives_index
+
+    def _probe(self, index: str, key: str, exchange: Optional[str]) -> Optional[int]:
+        slots = self._indexes[index]
+        column_name, keyed = INDEXES[index]
+        column = getattr(self, column_name)
+        exchange_code = None
+        exchange_bytes = None
+        if keyed:
+            if exchange is None:
+                return None
+            exchange_code = self.exchange.code_of(exchange)
+            if exchange_code is None:
+                return None
+            exchange_bytes = exchange.encode('utf-8')
+        key_bytes = key.encode('utf-8')
+        mask = len(slots) - 1
+        slot = _hash_key(key_bytes, exchange_bytes) & mask
+        while True:
+            row = slots[slot]
+            if row == EMPTY_SLOT:
+                return None
+            if column.equals(row, key_bytes) and (exchange_code is None or self.exchange.codes[row] == exchange_code):
+                return row
+            slot = (slot + 1) & mask
+
+    def find_symbol(self, symbol: str, exchange: str) -> Optional[int]:
+        return self._probe('symbol', symbol, exchange)
+
+    def find_brsymbol(self, brsymbol: str, exchange: str) -> Optional[int]:
+        return self._probe('brsymbol', brsymbol, exchange)
+
+    def find_token(self, token: str, exchange: str) -> Optional[int]:
+        return self._probe('token', str(token), exchange)
+
+    def find_token_any(self, token: str) -> Optional[int]:
+        return self._probe('token_any', str(token), None)
+
+    def memory_usage_bytes(self) -> int:
+        """Size of the mapping (shared with the other processes that map it)"""
+        return len(self._mmap)
+
+def open_snapshot(name: Optional[str] = None) -> Optional[MappedSymbolTable]:
+    """Map the named (default: current) snapshot; None if there is none or it cannot be read"""
+    if not SNAPSHOT_ENABLED:
+        return None
+    name = name or read_pointer()
+    if not name:
+        return None
+    try:
+        return MappedSymbolTable(name)
+    except FileNotFoundError:
+        # Replaced between reading the pointer and opening the file
+        return None
+    except Exception as e:
+        logger.error(f"Error opening symbol cache snapshot {name}: {e}")
+        return None
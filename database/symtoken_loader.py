@@ -0,0 +1,111 @@
+"""
+Bulk loader for the symtoken table.
+
+Full master contract loads go through the ORM (bulk_insert_mappings), which
+builds a dict per row and maintains every index on every insert. This loader
+writes plain row tuples into an unindexed staging table with the driver's
+executemany (COPY on PostgreSQL with psycopg), then, in the same transaction,
+drops the old table, renames the staging table to symtoken and builds the
+indexes once over the loaded data. Readers see either the old table or the
+complete new one.
+"""
+
+import io
+import csv
+import os
+import time
+from typing import Iterable, Iterator, List
+from sqlalchemy import Column, MetaData, Table, text
+from utils.logging import get_logger
+from database.symbol import SymToken, engine, db_session, mark_symbol_fts_stale
+from database.token_db_enhanced import SYMTOKEN_COLUMNS
+
+logger = get_logger(__name__)
+
+STAGING_TABLE = 'symtoken_staging'
+# Rows per executemany / COPY call
+LOAD_BATCH_SIZE = int(os.getenv('SYMTOKEN_LOAD_BATCH_SIZE', '50000'))
+
+LOAD_COLUMNS = ('id',) + SYMTOKEN_COLUMNS
+
+def _staging_table() -> Table:
+    """Same columns as symtoken, without indexes"""
+    return Table(STAGING_TABLE, MetaData(), *(
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable, autoincrement=False)
+        for column in SymToken.__table__.columns
+    ))
+
+def _numbered_batches(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    """Batches of (id, *row); ids are assigned 1..n since the whole table is replaced"""
+    batch = []
+    for row_id, row in enumerate(rows, start=1):
+        batch.append((row_id,) + tuple(row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _copy_batch(cursor, batch: List[tuple]):
+    """COPY a batch through psycopg2 (copy_expert) or psycopg 3 (copy)"""
+    sql = f"COPY {STAGING_TABLE} ({', '.join(LOAD_COLUMNS)}) FROM STDIN"
+    if hasattr(cursor, 'copy_expert'):
+        buffer = io.StringIO()
+        # \N marks NULL so that empty strings stay empty strings
+        csv.writer(buffer).writerows([['\\N' if value is None else value for value in row] for row in batch])
+        buffer.seek(0)
+        cursor.copy_expert(f"{sql} WITH (FORMAT csv, NULL '\\N')", buffer)
+    else:
+        with cursor.copy(sql) as copy:
+            for row in batch:
+                copy.write_row(row)
+
+def bulk_load_symtokens(rows: Iterable[tuple], batch_size: int = LOAD_BATCH_SIZE) -> int:
+    """
+    Replace the symtoken table with rows (tuples in SYMTOKEN_COLUMNS order, already
+    normalized) in one transaction. Returns the number of rows loaded; raises on
+    failure, leaving the existing table untouched.
+    """
+    start_time = time.time()
+    # End this thread's read transaction so SQLite can take the write lock
+    db_session.remove()
+
+    is_postgres = engine.dialect.name == 'postgresql'
+    insert_sql = f"INSERT INTO {STAGING_TABLE} ({', '.join(LOAD_COLUMNS)}) VALUES ({', '.join('?' * len(LOAD_COLUMNS))})"
+    if engine.dialect.paramstyle in ('format', 'pyformat'):
+        insert_sql = insert_sql.replace('?', '%s')
+
+    loaded = 0
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        _staging_table().create(conn)
+
+        cursor = conn.connection.dbapi_connection.cursor()
+        use_copy = is_postgres and (hasattr(cursor, 'copy_expert') or hasattr(cursor, 'copy'))
+        for batch in _numbered_batches(rows, batch_size):
+            if use_copy:
+                _copy_batch(cursor, batch)
+            else:
+                cursor.executemany(insert_sql, batch)
+            loaded += len(batch)
+        cursor.close()
+        load_time = time.time() - start_time
+        if not loaded:
+            raise ValueError("Refusing to replace the symtoken table with an empty master contract")
+
+        # Swap: the old table (and its indexes) go away, the staging table takes its name.
+        # pysqlite opens the transaction at the first INSERT, so the swap commits together with the rows.
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {SymToken.__tablename__}")
+        conn.exec_driver_sql(f"ALTER TABLE {STAGING_TABLE} RENAME TO {SymToken.__tablename__}")
+        for index in SymToken.__table__.indexes:
+            index.create(conn)
+        if is_postgres and conn.execute(text("SELECT to_regclass('symtoken_id_seq')")).scalar():
+            # Keep ORM inserts (incremental refresh) from reusing ids
+            conn.execute(text("SELECT setval('symtoken_id_seq', :value)"), {'value': max(loaded, 1)})
+    mark_symbol_fts_stale()
+
+    logger.info(
+        f"Bulk loaded {loaded} instruments into symtoken in {time.time() - start_time:.2f} seconds "
+        f"(rows {load_time:.2f}s, indexes and swap {time.time() - start_time - load_time:.2f}s)"
+    )
+    return loaded
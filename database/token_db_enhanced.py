@@ -5,14 +5,21 @@ Optimized for zero-config deployment with configurable session reset time (SESSI
 
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
+from array import array
+import math
+import sys
 import time
 from dataclasses import dataclass, field
 from collections import defaultdict
 import pytz
 from utils.logging import get_logger
+from database.symbol_search_index import SymbolSearchIndex
+from database.derivatives_index import DerivativesIndex, ExpiryCalendar, ExpiryLike
 
 logger = get_logger(__name__)
 
+NAN = float('nan')
+
 @dataclass
 class CacheStats:
     """Statistics for cache performance monitoring"""
@@ -46,7 +53,7 @@ class CacheStats:
 
 @dataclass
 class SymbolData:
-    """Lightweight symbol data structure for in-memory storage"""
+    """Lightweight symbol data structure returned by cache lookups"""
     symbol: str
     brsymbol: str
     name: str
@@ -59,6 +66,244 @@ class SymbolData:
     instrumenttype: Optional[str] = None
     tick_size: Optional[float] = None
 
+# Column layout of a SymbolTable
+STRING_COLUMNS = ('symbol', 'brsymbol', 'token')
+CATEGORY_COLUMNS = ('name', 'exchange', 'brexchange', 'expiry', 'instrumenttype')
+SYMTOKEN_COLUMNS = (
+    'symbol', 'brsymbol', 'name', 'exchange', 'brexchange', 'token',
+    'expiry', 'strike', 'lotsize', 'instrumenttype', 'tick_size'
+)
+
+# Stored in the lotsize column when the lot size is unknown
+LOTSIZE_NONE = -1
+
+class CategoryColumn:
+    """Dictionary-encoded string column: each distinct value is stored once, rows hold a code"""
+
+    __slots__ = ('values', 'codes', '_lookup')
+
+    def __init__(self):
+        self.values: List[Optional[str]] = [None]
+        self.codes = array('I')
+        self._lookup: Dict[Optional[str], int] = {None: 0}
+
+    @classmethod
+    def from_parts(cls, values: List[Optional[str]], codes) -> 'CategoryColumn':
+        """Read-only column over existing values and a codes buffer (e.g. a mapped snapshot)"""
+        column = cls.__new__(cls)
+        column.values = [sys.intern(value) if value is not None else None for value in values]
+        column.codes = codes
+        column._lookup = {value: code for code, value in enumerate(column.values)}
+        return column
+
+    def append(self, value: Optional[str]):
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        self.codes.append(code)
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        return self.values[self.codes[row]]
+
+    def code_of(self, value: Optional[str]) -> Optional[int]:
+        return self._lookup.get(value)
+
+class SymbolTable:
+    """
+    Columnar, immutable-after-build storage of one broker's symbols.
+    Unique strings (symbol, brsymbol, token) are interned and shared with the
+    index keys, repeating strings are dictionary encoded, numbers live in typed
+    arrays, and the indexes map keys to integer row ids.
+    """
+
+    def __init__(self):
+        self.symbol: List[str] = []
+        self.brsymbol: List[str] = []
+        self.token: List[str] = []
+        self.name = CategoryColumn()
+        self.exchange = CategoryColumn()
+        self.brexchange = CategoryColumn()
+        self.expiry = CategoryColumn()
+        self.instrumenttype = CategoryColumn()
+        self.strike = array('d')
+        self.lotsize = array('q')
+        self.tick_size = array('d')
+
+        # exchange -> key -> row id (nested per exchange, no tuple keys)
+        self.by_symbol: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.by_brsymbol: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.by_token_exchange: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.by_token: Dict[str, int] = {}
+
+        # Prefix/n-gram index for search_symbols and options/futures index, built by finalize()
+        self.search_index: Optional[SymbolSearchIndex] = None
+        self.derivatives_index: Optional[DerivativesIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.symbol)
+
+    def append(self, symbol, brsymbol, name, exchange, brexchange, token,
+               expiry=None, strike=None, lotsize=None, instrumenttype=None, tick_size=None):
+        """Add one instrument and index it"""
+        row = len(self.symbol)
+        symbol = sys.intern(symbol or '')
+        brsymbol = sys.intern(brsymbol or '')
+        token = sys.intern(str(token) if token is not None else '')
+        exchange = exchange or ''
+
+        self.symbol.append(symbol)
+        self.brsymbol.append(brsymbol)
+        self.token.append(token)
+        self.name.append(name)
+        self.exchange.append(exchange)
+        self.brexchange.append(brexchange)
+        self.expiry.append(expiry)
+        self.instrumenttype.append(instrumenttype)
+        self.strike.append(NAN if strike is None else strike)
+        self.lotsize.append(LOTSIZE_NONE if lotsize is None else int(lotsize))
+        self.tick_size.append(NAN if tick_size is None else tick_size)
+
+        self.by_symbol[exchange][symbol] = row
+        self.by_brsymbol[exchange][brsymbol] = row
+        self.by_token_exchange[exchange][token] = row
+        self.by_token[token] = row
+        return row
+
+    def finalize(self):
+        """Freeze the nested indexes into plain dicts and build the secondary indexes once loading is complete"""
+        self.by_symbol = dict(self.by_symbol)
+        self.by_brsymbol = dict(self.by_brsymbol)
+        self.by_token_exchange = dict(self.by_token_exchange)
+        self.search_index = SymbolSearchIndex(self)
+        self.derivatives_index = DerivativesIndex(self)
+
+    @staticmethod
+    def _lookup(index: Dict[str, Dict[str, int]], key: str, exchange: str) -> Optional[int]:
+        by_key = index.get(exchange)
+        return by_key.get(key) if by_key is not None else None
+
+    def find_symbol(self, symbol: str, exchange: str) -> Optional[int]:
+        return self._lookup(self.by_symbol, symbol, exchange)
+
+    def find_brsymbol(self, brsymbol: str, exchange: str) -> Optional[int]:
+        return self._lookup(self.by_brsymbol, brsymbol, exchange)
+
+    def find_token(self, token: str, exchange: str) -> Optional[int]:
+        return self._lookup(self.by_token_exchange, token, exchange)
+
+    def find_token_any(self, token: str) -> Optional[int]:
+        return self.by_token.get(token)
+
+    def get_strike(self, row: int) -> Optional[float]:
+        value = self.strike[row]
+        return None if math.isnan(value) else value
+
+    def get_lotsize(self, row: int) -> Optional[int]:
+        value = self.lotsize[row]
+        return None if value == LOTSIZE_NONE else value
+
+    def get_tick_size(self, row: int) -> Optional[float]:
+        value = self.tick_size[row]
+        return None if math.isnan(value) else value
+
+    def row_values(self, row: int) -> tuple:
+        """One row as a tuple in SYMTOKEN_COLUMNS order"""
+        return (
+            self.symbol[row], self.brsymbol[row], self.name[row], self.exchange[row], self.brexchange[row],
+            self.token[row], self.expiry[row], self.get_strike(row), self.get_lotsize(row),
+            self.instrumenttype[row], self.get_tick_size(row)
+        )
+
+    def patched(self, removed: set, upserts: Dict[Tuple[str, str], tuple]) -> 'SymbolTable':
+        """
+        New finalized table with a master contract diff applied, keyed by (token, brexchange):
+        removed rows are dropped, changed rows are replaced where they are, new rows are appended
+        (the row order of the symtoken table after the same diff).
+        """
+        upserts = dict(upserts)
+        table = SymbolTable()
+        for row in range(len(self)):
+            key = (self.token[row], self.brexchange[row])
+            if key in removed:
+                continue
+            values = upserts.pop(key, None)
+            table.append(*(values if values is not None else self.row_values(row)))
+        for values in upserts.values():
+            table.append(*values)
+        table.finalize()
+        return table
+
+    def row_data(self, row: int) -> SymbolData:
+        """Materialize one row as a SymbolData"""
+        return SymbolData(
+            symbol=self.symbol[row],
+            brsymbol=self.brsymbol[row],
+            name=self.name[row],
+            exchange=self.exchange[row],
+            brexchange=self.brexchange[row],
+            token=self.token[row],
+            expiry=self.expiry[row],
+            strike=self.get_strike(row),
+            lotsize=self.get_lotsize(row),
+            instrumenttype=self.instrumenttype[row],
+            tick_size=self.get_tick_size(row)
+        )
+
+    def memory_usage_bytes(self) -> int:
+        """Measured size of the columns and indexes (each shared object counted once)"""
+        seen = set()
+
+        def size_of(obj) -> int:
+            if id(obj) in seen:
+                return 0
+            seen.add(id(obj))
+            return sys.getsizeof(obj)
+
+        total = 0
+        for column in (self.symbol, self.brsymbol, self.token):
+            total += size_of(column)
+            total += sum(size_of(value) for value in column)
+
+        for column in (self.name, self.exchange, self.brexchange, self.expiry, self.instrumenttype):
+            total += size_of(column.values) + size_of(column._lookup) + size_of(column.codes)
+            total += sum(size_of(value) for value in column.values if value is not None)
+
+        for column in (self.strike, self.lotsize, self.tick_size):
+            total += size_of(column)
+
+        for index in (self.by_symbol, self.by_brsymbol, self.by_token_exchange):
+            total += size_of(index)
+            for by_key in index.values():
+                total += size_of(by_key)
+                # Keys are the interned column strings (already counted); row ids may be shared ints
+                total += sum(size_of(row) for row in by_key.values())
+        total += size_of(self.by_token)
+
+        index = self.search_index
+        if index is not None:
+            total += size_of(index.keys) + sum(size_of(key) for key in index.keys)
+            total += size_of(index.offsets) + size_of(index.rows)
+            total += size_of(index.ngrams)
+            total += sum(size_of(gram) + size_of(ids) for gram, ids in index.ngrams.items())
+            total += size_of(index.tokens) + sum(size_of(token) for token in index.tokens)
+            total += size_of(index.token_rows) + size_of(index.strike_rows)
+            total += sum(size_of(strike) + size_of(rows) for strike, rows in index.strike_rows.items())
+            for rows_by_code in (index.expiry_rows, index.instrumenttype_rows):
+                total += size_of(rows_by_code) + sum(size_of(rows) for rows in rows_by_code)
+
+        derivatives = self.derivatives_index
+        if derivatives is not None:
+            total += size_of(derivatives.series) + size_of(derivatives.expiries)
+            for key, series in derivatives.series.items():
+                total += size_of(key) + size_of(series)
+                total += sum(size_of(column) for column in (series.strikes, series.ce_rows, series.pe_rows, series.futures))
+            total += sum(size_of(dates) for dates in derivatives.expiries.values())
+            total += size_of(derivatives.calendars)
+            for calendar in derivatives.calendars.values():
+                total += size_of(calendar) + size_of(calendar.dates) + size_of(calendar.labels) + size_of(calendar.monthly)
+        return total
+
 class BrokerSymbolCache:
     """
     High-performance in-memory cache for broker symbols
@@ -70,14 +315,8 @@ class BrokerSymbolCache:
         self.active_broker: Optional[str] = None
         self.cache_loaded: bool = False
         
-        # Primary storage - all symbols in memory
-        self.symbols: Dict[str, SymbolData] = {}
-        
-        # Multi-index maps for O(1) lookups
-        self.by_symbol_exchange: Dict[Tuple[str, str], SymbolData] = {}
-        self.by_token_exchange: Dict[Tuple[str, str], SymbolData] = {}
-        self.by_brsymbol_exchange: Dict[Tuple[str, str], SymbolData] = {}
-        self.by_token: Dict[str, SymbolData] = {}
+        # Columnar symbol storage with row-id indexes (swapped atomically on reload)
+        self.table: SymbolTable = SymbolTable()
         
         # Cache statistics
         self.stats = CacheStats()
@@ -86,6 +325,15 @@ class BrokerSymbolCache:
         self.session_start: Optional[datetime] = None
         self.next_reset_time: Optional[datetime] = None
         
+        # Memory-mapped snapshot shared with other processes (see database/symbol_snapshot.py):
+        # the snapshot this process published or mapped, and when to next look for a newer one
+        self.snapshot_name: Optional[str] = None
+        self.loaded_version: int = 0
+        self._snapshot_check_at: float = 0.0
+        
+        # Set when an incremental master contract refresh patched the table in place
+        self.contract_patched: bool = False
+        
         logger.info("BrokerSymbolCache initialized")
     
     def load_all_symbols(self, broker: str) -> bool:
@@ -99,53 +347,22 @@ class BrokerSymbolCache:
             start_time = time.time()
             logger.info(f"Loading all symbols for broker: {broker}")
             
-            # Clear existing cache
-            self.clear_cache()
+            # Stream plain column tuples from the database (no ORM objects)
+            table = SymbolTable()
+            rows = SymToken.query.with_entities(
+                *(getattr(SymToken, column) for column in SYMTOKEN_COLUMNS)
+            ).yield_per(10000)
+            for row in rows:
+                table.append(*row)
+            table.finalize()
             
-            # Query all symbols from database
-            symbols = SymToken.query.all()
-            
-            if not symbols:
+            if not len(table):
                 logger.warning(f"No symbols found in database for broker: {broker}")
+                self.clear_cache()
                 return False
             
-            # Build in-memory structures
-            for sym in symbols:
-                # Create lightweight data object
-                symbol_data = SymbolData(
-                    symbol=sym.symbol,
-                    brsymbol=sym.brsymbol,
-                    name=sym.name,
-                    exchange=sym.exchange,
-                    brexchange=sym.brexchange,
-                    token=sym.token,
-                    expiry=sym.expiry,
-                    strike=sym.strike,
-                    lotsize=sym.lotsize,
-                    instrumenttype=sym.instrumenttype,
-                    tick_size=sym.tick_size
-                )
-                
-                # Store in primary dict
-                self.symbols[sym.token] = symbol_data
-                
-                # Build indexes
-                self.by_symbol_exchange[(sym.symbol, sym.exchange)] = symbol_data
-                self.by_token_exchange[(sym.token, sym.exchange)] = symbol_data
-                self.by_brsymbol_exchange[(sym.brsymbol, sym.exchange)] = symbol_data
-                self.by_token[sym.token] = symbol_data
-            
-            # Update cache metadata
-            self.active_broker = broker
-            self.cache_loaded = True
-            self.stats.total_symbols = len(symbols)
+            self._install_table(table, broker)
             self.stats.cache_loads += 1
-            self.stats.last_loaded = datetime.now(pytz.timezone('Asia/Kolkata'))
-            
-            # Calculate memory usage (rough estimate)
-            self.stats.memory_usage_mb = (
-                len(self.symbols) * 500  # ~500 bytes per symbol
-            ) / (1024 * 1024)
             
             load_time = time.time() - start_time
             logger.info(
@@ -153,20 +370,124 @@ class BrokerSymbolCache:
                 f"in {load_time:.2f} seconds. "
                 f"Memory usage: {self.stats.memory_usage_mb:.2f} MB"
             )
-            
-            # Set session timing
-            self._set_session_timing()
-            
             return True
             
         except Exception as e:
             logger.error(f"Error loading symbols into cache: {e}")
             return False
     
-    def _set_session_timing(self):
+    def _install_table(self, table: SymbolTable, broker: str):
+        """Swap in a new table; readers never see a half-built cache"""
+        self.table = table
+        self.snapshot_name = None
+        self.loaded_version = time.time_ns()
+        
+        # Update cache metadata
+        self.active_broker = broker
+        self.cache_loaded = True
+        self.stats.total_symbols = len(table)
+        self.stats.last_loaded = datetime.now(pytz.timezone('Asia/Kolkata'))
+        self.stats.memory_usage_mb = table.memory_usage_bytes() / (1024 * 1024)
+        
+        # Set session timing
+        self._set_session_timing()
+    
+    def apply_contract_diff(self, broker: str, removed: set, upserts: Dict[Tuple[str, str], tuple]) -> bool:
+        """
+        Patch the loaded table with an incremental master contract refresh
+        (see database/master_contract_sync.py) instead of reloading it from the database.
+        Only applies when this broker's symbols are already loaded.
+        """
+        if not self.cache_loaded or self.active_broker != broker:
+            return False
+        if not removed and not upserts:
+            self.contract_patched = True
+            return True
+        try:
+            start_time = time.time()
+            self._install_table(self.table.patched(removed, upserts), broker)
+            self.contract_patched = True
+            logger.info(
+                f"Patched symbol cache with {len(removed)} removed and {len(upserts)} new or changed symbols "
+                f"in {time.time() - start_time:.2f} seconds"
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error patching symbol cache: {e}")
+            return False
+    
+    def take_contract_patch(self, broker: str) -> bool:
+        """True once after apply_contract_diff patched this broker's cache (the reload can be skipped)"""
+        patched = self.contract_patched and self.cache_loaded and self.active_broker == broker
+        self.contract_patched = False
+        return patched
+    
+    def publish_snapshot(self) -> Optional[str]:
+        """Write the loaded table as a memory-mapped snapshot for other processes"""
+        if not self.cache_loaded or self.snapshot_name is not None:
+            return self.snapshot_name
+        from database.symbol_snapshot import write_snapshot
+        self.snapshot_name = write_snapshot(self.table, self.active_broker)
+        return self.snapshot_name
+    
+    def attach_snapshot(self, name: Optional[str] = None) -> bool:
+        """Serve lookups from a memory-mapped snapshot written by another process"""
+        from database.symbol_snapshot import open_snapshot
+        start_time = time.time()
+        table = open_snapshot(name)
+        if table is None:
+            return False
+        
+        self.table = table
+        self.snapshot_name = table.file_name
+        self.loaded_version = table.version
+        self.active_broker = table.broker
+        self.cache_loaded = True
+        self.stats.total_symbols = len(table)
+        self.stats.cache_loads += 1
+        self.stats.last_loaded = datetime.now(pytz.timezone('Asia/Kolkata'))
+        self.stats.memory_usage_mb = table.memory_usage_bytes() / (1024 * 1024)
+        # Valid until the session reset that follows the snapshot's creation
+        self._set_session_timing(datetime.fromtimestamp(table.created, pytz.timezone('Asia/Kolkata')))
+        
+        logger.info(
+            f"Mapped symbol cache snapshot {table.file_name} ({len(table)} symbols) "
+            f"in {(time.time() - start_time) * 1000:.1f} ms"
+        )
+        return True
+    
+    def refresh_from_snapshot(self):
+        """Map a newer published snapshot, or drop the cache when the snapshot has been unpublished"""
+        from database.symbol_snapshot import read_pointer, snapshot_version
+        name = read_pointer()
+        if name == self.snapshot_name:
+            return
+        if name is None:
+            # Unpublished on logout by another process
+            if self.snapshot_name is not None:
+                self.clear_cache()
+            return
+        # Never replace a fresher table this process loaded itself (e.g. not yet published)
+        if snapshot_version(name) > self.loaded_version:
+            self.attach_snapshot(name)
+    
+    def is_ready(self) -> bool:
+        """True when lookups can be served from memory (checks for newer snapshots periodically)"""
+        now = time.monotonic()
+        if now >= self._snapshot_check_at:
+            from database.symbol_snapshot import SNAPSHOT_ENABLED, SNAPSHOT_CHECK_SECONDS
+            self._snapshot_check_at = now + SNAPSHOT_CHECK_SECONDS
+            if SNAPSHOT_ENABLED:
+                try:
+                    self.refresh_from_snapshot()
+                except Exception as e:
+                    logger.error(f"Error refreshing symbol cache from snapshot: {e}")
+        return self.cache_loaded and self.is_cache_valid()
+    
+    def _set_session_timing(self, start: Optional[datetime] = None):
         """Set session start and next reset time from SESSION_EXPIRY_TIME env variable"""
         import os
-        now_ist = datetime.now(pytz.timezone('Asia/Kolkata'))
+        now_ist = start or datetime.now(pytz.timezone('Asia/Kolkata'))
         self.session_start = now_ist
         
         # Get session expiry time from environment (default to 3:00 if not set)
@@ -193,70 +514,48 @@ class BrokerSymbolCache:
         now_ist = datetime.now(pytz.timezone('Asia/Kolkata'))
         return now_ist < self.next_reset_time
     
+    def _hit(self, row: Optional[int]) -> bool:
+        if row is None:
+            self.stats.misses += 1
+            return False
+        self.stats.hits += 1
+        return True
+    
     def get_token(self, symbol: str, exchange: str) -> Optional[str]:
         """Get token for symbol and exchange - O(1) lookup"""
-        self.stats.hits += 1
-        key = (symbol, exchange)
-        if key in self.by_symbol_exchange:
-            return self.by_symbol_exchange[key].token
-        
-        self.stats.hits -= 1
-        self.stats.misses += 1
-        return None
+        table = self.table
+        row = table.find_symbol(symbol, exchange)
+        return table.token[row] if self._hit(row) else None
     
     def get_symbol(self, token: str, exchange: str) -> Optional[str]:
         """Get symbol for token and exchange - O(1) lookup"""
-        self.stats.hits += 1
-        key = (token, exchange)
-        if key in self.by_token_exchange:
-            return self.by_token_exchange[key].symbol
-        
-        self.stats.hits -= 1
-        self.stats.misses += 1
-        return None
+        table = self.table
+        row = table.find_token(token, exchange)
+        return table.symbol[row] if self._hit(row) else None
     
     def get_br_symbol(self, symbol: str, exchange: str) -> Optional[str]:
         """Get broker symbol for symbol and exchange - O(1) lookup"""
-        self.stats.hits += 1
-        key = (symbol, exchange)
-        if key in self.by_symbol_exchange:
-            return self.by_symbol_exchange[key].brsymbol
-        
-        self.stats.hits -= 1
-        self.stats.misses += 1
-        return None
+        table = self.table
+        row = table.find_symbol(symbol, exchange)
+        return table.brsymbol[row] if self._hit(row) else None
     
     def get_oa_symbol(self, brsymbol: str, exchange: str) -> Optional[str]:
         """Get OpenAlgo symbol for broker symbol and exchange - O(1) lookup"""
-        self.stats.hits += 1
-        key = (brsymbol, exchange)
-        if key in self.by_brsymbol_exchange:
-            return self.by_brsymbol_exchange[key].symbol
-        
-        self.stats.hits -= 1
-        self.stats.misses += 1
-        return None
+        table = self.table
+        row = table.find_brsymbol(brsymbol, exchange)
+        return table.symbol[row] if self._hit(row) else None
     
     def get_brexchange(self, symbol: str, exchange: str) -> Optional[str]:
         """Get broker exchange for symbol and exchange - O(1) lookup"""
-        self.stats.hits += 1
-        key = (symbol, exchange)
-        if key in self.by_symbol_exchange:
-            return self.by_symbol_exchange[key].brexchange
-        
-        self.stats.hits -= 1
-        self.stats.misses += 1
-        return None
+        table = self.table
+        row = table.find_symbol(symbol, exchange)
+        return table.brexchange[row] if self._hit(row) else None
     
     def get_symbol_data(self, token: str) -> Optional[SymbolData]:
         """Get complete symbol data by token - O(1) lookup"""
-        self.stats.hits += 1
-        if token in self.by_token:
-            return self.by_token[token]
-        
-        self.stats.hits -= 1
-        self.stats.misses += 1
-        return None
+        table = self.table
+        row = table.find_token_any(token)
+        return table.row_data(row) if self._hit(row) else None
     
     def get_tokens_bulk(self, symbol_exchange_pairs: List[Tuple[str, str]]) -> List[Optional[str]]:
         """
@@ -264,16 +563,12 @@ class BrokerSymbolCache:
         Optimized for performance with single pass
         """
         self.stats.bulk_queries += 1
+        table = self.table
         results = []
         
         for symbol, exchange in symbol_exchange_pairs:
-            key = (symbol, exchange)
-            if key in self.by_symbol_exchange:
-                results.append(self.by_symbol_exchange[key].token)
-                self.stats.hits += 1
-            else:
-                results.append(None)
-                self.stats.misses += 1
+            row = table.find_symbol(symbol, exchange)
+            results.append(table.token[row] if self._hit(row) else None)
         
         return results
     
@@ -282,52 +577,124 @@ class BrokerSymbolCache:
         Bulk retrieve symbols for multiple token-exchange pairs
         """
         self.stats.bulk_queries += 1
+        table = self.table
         results = []
         
         for token, exchange in token_exchange_pairs:
-            key = (token, exchange)
-            if key in self.by_token_exchange:
-                results.append(self.by_token_exchange[key].symbol)
-                self.stats.hits += 1
-            else:
-                results.append(None)
-                self.stats.misses += 1
+            row = table.find_token(token, exchange)
+            results.append(table.symbol[row] if self._hit(row) else None)
         
         return results
     
-    def search_symbols(self, query: str, exchange: Optional[str] = None, limit: int = 50) -> List[SymbolData]:
+    def _get_series(self, underlying: str, exchange: str, expiry: ExpiryLike):
+        index = self.table.derivatives_index
+        return index.get_series(underlying, exchange, expiry) if index is not None else None
+    
+    def get_option(self, underlying: str, exchange: str, expiry: ExpiryLike, strike: float,
+                   option_type: str) -> Optional[SymbolData]:
+        """Resolve an option contract by underlying, expiry, strike and CE/PE - O(log n)"""
+        table = self.table
+        series = self._get_series(underlying, exchange, expiry)
+        row = series.find_option(float(strike), option_type) if series is not None else None
+        return table.row_data(row) if self._hit(row) else None
+    
+    def get_futures(self, underlying: str, exchange: str, expiry: Optional[ExpiryLike] = None) -> List[SymbolData]:
+        """Futures contracts of an underlying, for one expiry or all expiries in date order"""
+        table = self.table
+        index = table.derivatives_index
+        if index is None:
+            return []
+        if expiry is not None:
+            series = index.get_series(underlying, exchange, expiry)
+            all_series = [series] if series is not None else []
+        else:
+            all_series = index.get_expiries(underlying, exchange)
+        return [table.row_data(row) for series in all_series for row in series.futures]
+    
+    def get_expiry_calendar(self, underlying: str, exchange: str, instrument_class: str) -> Optional[ExpiryCalendar]:
+        """Precomputed expiry calendar for 'futures' or 'options' of an underlying"""
+        index = self.table.derivatives_index
+        return index.get_calendar(underlying, exchange, instrument_class) if index is not None else None
+    
+    def get_strikes(self, underlying: str, exchange: str, expiry: ExpiryLike) -> List[float]:
+        """Sorted strikes listed for an expiry (CE or PE)"""
+        series = self._get_series(underlying, exchange, expiry)
+        return list(series.strikes) if series is not None else []
+    
+    def get_nearest_strike(self, underlying: str, exchange: str, expiry: ExpiryLike, price: float,
+                           option_type: Optional[str] = None) -> Optional[float]:
+        """Listed strike closest to price, optionally only strikes with a CE or PE contract"""
+        series = self._get_series(underlying, exchange, expiry)
+        i = series.nearest_index(price, option_type) if series is not None else None
+        return series.strikes[i] if i is not None else None
+    
+    def get_atm_strikes(self, underlying: str, exchange: str, expiry: ExpiryLike, price: float,
+                        count: int = 0) -> List[float]:
+        """ATM strike with count strikes on each side (ATM +/- count)"""
+        series = self._get_series(underlying, exchange, expiry)
+        i = series.nearest_index(price) if series is not None else None
+        if i is None:
+            return []
+        return list(series.strikes[max(i - count, 0):i + count + 1])
+    
+    def get_option_chain(self, underlying: str, exchange: str, expiry: ExpiryLike, price: Optional[float] = None,
+                         count: Optional[int] = None) -> List[dict]:
+        """
+        Option chain rows {'strike', 'ce', 'pe'} (SymbolData or None) in strike order.
+        With price and count, only ATM +/- count strikes are returned.
+        """
+        table = self.table
+        series = self._get_series(underlying, exchange, expiry)
+        if series is None:
+            return []
+        start, end = 0, None
+        if price is not None and count is not None:
+            i = series.nearest_index(price)
+            if i is None:
+                return []
+            start, end = i - count, i + count + 1
+        return [
+            {
+                'strike': strike,
+                'ce': table.row_data(ce_row) if ce_row is not None else None,
+                'pe': table.row_data(pe_row) if pe_row is not None else None
+            }
+            for strike, ce_row, pe_row in series.chain(start, end)
+        ]
+    
+    def search_symbols(self, query: str, exchange: Optional[str] = None, limit: int = 50,
+                       instrumenttype: Optional[str] = None) -> List[SymbolData]:
         """
-        Search symbols by partial match
-        Returns list of matching SymbolData objects
+        Search symbols, broker symbols and names by partial match
+        Returns SymbolData objects ranked exact, then prefix, then substring match
         """
-        query = query.upper()
-        matches = []
-        
-        for symbol_data in self.symbols.values():
-            # Skip if exchange filter doesn't match
-            if exchange and symbol_data.exchange != exchange:
-                continue
-            
-            # Check for match in symbol, brsymbol, or name
-            if (query in symbol_data.symbol.upper() or 
-                query in symbol_data.brsymbol.upper() or 
-                (symbol_data.name and query in symbol_data.name.upper())):
-                matches.append(symbol_data)
-                
-                if len(matches) >= limit:
-                    break
-        
-        return matches
+        table = self.table
+        if table.search_index is None:
+            return []
+        rows = table.search_index.search(query, exchange=exchange, instrumenttype=instrumenttype, limit=limit)
+        return [table.row_data(row) for row in rows]
+    
+    def search_terms(self, query: str, exchange: Optional[str] = None, limit: Optional[int] = None,
+                     offset: int = 0) -> List[SymbolData]:
+        """
+        Multi-term search where every term must match (enhanced_search_symbols semantics)
+        Returns a page of SymbolData objects
+        """
+        table = self.table
+        if table.search_index is None:
+            return []
+        rows = table.search_index.search_terms(query, exchange=exchange, limit=limit, offset=offset)
+        return [table.row_data(row) for row in rows]
     
     def clear_cache(self):
         """Clear all cached data"""
-        self.symbols.clear()
-        self.by_symbol_exchange.clear()
-        self.by_token_exchange.clear()
-        self.by_brsymbol_exchange.clear()
-        self.by_token.clear()
+        self.table = SymbolTable()
         self.cache_loaded = False
         self.active_broker = None
+        self.snapshot_name = None
+        self.contract_patched = False
+        self.stats.total_symbols = 0
+        self.stats.memory_usage_mb = 0.0
         logger.info("Cache cleared")
     
     def get_cache_info(self) -> dict:
@@ -339,6 +706,7 @@ class BrokerSymbolCache:
             'cache_valid': self.is_cache_valid(),
             'session_start': self.session_start.isoformat() if self.session_start else None,
             'next_reset': self.next_reset_time.isoformat() if self.next_reset_time else None,
+            'snapshot': self.snapshot_name,
             'stats': self.stats.to_dict()
         }
 
@@ -361,7 +729,7 @@ def get_token(symbol: str, exchange: str) -> Optional[str]:
     cache = get_cache()
     
     # Check if cache is loaded and valid
-    if cache.cache_loaded and cache.is_cache_valid():
+    if cache.is_ready():
         result = cache.get_token(symbol, exchange)
         if result is not None:
             return result
@@ -376,7 +744,7 @@ def get_symbol(token: str, exchange: str) -> Optional[str]:
     """
     cache = get_cache()
     
-    if cache.cache_loaded and cache.is_cache_valid():
+    if cache.is_ready():
         result = cache.get_symbol(token, exchange)
         if result is not None:
             return result
@@ -390,7 +758,7 @@ def get_br_symbol(symbol: str, exchange: str) -> Optional[str]:
     """
     cache = get_cache()
     
-    if cache.cache_loaded and cache.is_cache_valid():
+    if cache.is_ready():
         result = cache.get_br_symbol(symbol, exchange)
         if result is not None:
             return result
@@ -404,7 +772,7 @@ def get_oa_symbol(brsymbol: str, exchange: str) -> Optional[str]:
     """
     cache = get_cache()
     
-    if cache.cache_loaded and cache.is_cache_valid():
+    if cache.is_ready():
         result = cache.get_oa_symbol(brsymbol, exchange)
         if result is not None:
             return result
@@ -418,7 +786,7 @@ def get_brexchange(symbol: str, exchange: str) -> Optional[str]:
     """
     cache = get_cache()
     
-    if cache.cache_loaded and cache.is_cache_valid():
+    if cache.is_ready():
         result = cache.get_brexchange(symbol, exchange)
         if result is not None:
             return result
@@ -526,7 +894,7 @@ def get_tokens_bulk(symbol_exchange_pairs: List[Tuple[str, str]]) -> List[Option
     """Bulk retrieve tokens - optimized for performance"""
     cache = get_cache()
     
-    if cache.cache_loaded and cache.is_cache_valid():
+    if cache.is_ready():
         return cache.get_tokens_bulk(symbol_exchange_pairs)
     
     # Fallback to individual queries
@@ -540,7 +908,7 @@ def get_symbols_bulk(token_exchange_pairs: List[Tuple[str, str]]) -> List[Option
     """Bulk retrieve symbols - optimized for performance"""
     cache = get_cache()
     
-    if cache.cache_loaded and cache.is_cache_valid():
+    if cache.is_ready():
         return cache.get_symbols_bulk(token_exchange_pairs)
     
     # Fallback to individual queries
@@ -551,15 +919,16 @@ def get_symbols_bulk(token_exchange_pairs: List[Tuple[str, str]]) -> List[Option
     return results
 
 # Search functionality
-def search_symbols(query: str, exchange: Optional[str] = None, limit: int = 50) -> List[dict]:
+def search_symbols(query: str, exchange: Optional[str] = None, limit: int = 50,
+                   instrumenttype: Optional[str] = None) -> List[dict]:
     """
     Search symbols with cache support
-    Returns list of symbol dictionaries
+    Returns list of symbol dictionaries (ranked exact, prefix, substring when cached)
     """
     cache = get_cache()
     
-    if cache.cache_loaded and cache.is_cache_valid():
-        results = cache.search_symbols(query, exchange, limit)
+    if cache.is_ready():
+        results = cache.search_symbols(query, exchange, limit, instrumenttype)
         return [
             {
                 'symbol': s.symbol,
@@ -578,6 +947,8 @@ def search_symbols(query: str, exchange: Optional[str] = None, limit: int = 50)
         query_obj = SymToken.query.filter(SymToken.symbol.like(f'%{query}%'))
         if exchange:
             query_obj = query_obj.filter_by(exchange=exchange)
+        if instrumenttype:
+            query_obj = query_obj.filter_by(instrumenttype=instrumenttype)
         
         results = query_obj.limit(limit).all()
         return [
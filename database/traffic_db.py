@@ -1,12 +1,15 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, Index
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from sqlalchemy.pool import NullPool
 import os
+import time
+import threading
 import logging
 from datetime import datetime, timedelta
 import json
+from flask import current_app, has_app_context
 from database.settings_db import get_security_settings
 
 logger = logging.getLogger(__name__)
@@ -31,7 +34,8 @@ else:
         pool_timeout=10
     )
 
-logs_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=logs_engine))
+LogsSession = sessionmaker(autocommit=False, autoflush=False, bind=logs_engine)
+logs_session = scoped_session(LogsSession)
 LogBase = declarative_base()
 LogBase.query = logs_session.query_property()
 
@@ -51,7 +55,8 @@ class TrafficLog(LogBase):
     user_id = Column(Integer)  # No foreign key since it's a separate database
 
     @staticmethod
-    def log_request(client_ip, method, path, status_code, duration_ms, host=None, error=None, user_id=None):
+    def log_request(client_ip, method, path, status_code, duration_ms, host=None, error=None, user_id=None,
+                    route=None, broker=None):
         """Log a request to the database"""
         try:
             log = TrafficLog(
@@ -65,6 +70,10 @@ class TrafficLog(LogBase):
                 user_id=user_id
             )
             logs_session.add(log)
+            TrafficRollup.record_rows([{
+                'path': path, 'route': route, 'broker': broker,
+                'status_code': status_code, 'duration_ms': duration_ms
+            }])
             logs_session.commit()
             return True
         except Exception as e:
@@ -72,6 +81,26 @@ class TrafficLog(LogBase):
             logs_session.rollback()
             return False
 
+    @staticmethod
+    def log_requests_bulk(rows):
+        """
+        Insert a batch of request logs (list of column dicts, plus the 'route' and
+        'broker' rollup keys) in one transaction
+        """
+        if not rows:
+            return True
+        try:
+            logs_session.bulk_insert_mappings(TrafficLog, [
+                {key: value for key, value in row.items() if key not in ('route', 'broker')} for row in rows
+            ])
+            TrafficRollup.record_rows(rows)
+            logs_session.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error bulk logging traffic: {str(e)}")
+            logs_session.rollback()
+            return False
+
     @staticmethod
     def get_recent_logs(limit=100):
         """Get recent traffic logs ordered by timestamp"""
@@ -82,18 +111,107 @@ class TrafficLog(LogBase):
             return []
 
     @staticmethod
-    def get_stats():
-        """Get basic traffic statistics"""
+    def get_stats(since=None):
+        """Get basic traffic statistics (read from the per-minute rollups)"""
+        return TrafficRollup.get_stats(since=since)
+
+# Rollup route for requests that matched no URL rule (404s, scanners), so they share one row per minute
+UNMATCHED_ROUTE = '<unmatched>'
+
+def match_route(adapter, path, method):
+    """URL rule a logged request path matches (werkzeug MapAdapter), or UNMATCHED_ROUTE"""
+    try:
+        rule, _ = adapter.match(path, method=method, return_rule=True)
+        return rule.rule
+    except Exception:
+        # NotFound, MethodNotAllowed, or a routing redirect the app never served
+        return UNMATCHED_ROUTE
+
+class TrafficRollup(LogBase):
+    """Per-minute pre-aggregated traffic, keyed by matched route, broker and status code"""
+    __tablename__ = 'traffic_rollup'
+
+    id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime, nullable=False)  # UTC minute
+    route = Column(String(200), nullable=False)  # URL rule (e.g. /api/v1/placeorder), not the raw path
+    broker = Column(String(50))
+    status_code = Column(Integer, nullable=False)
+    request_count = Column(Integer, default=0)
+    sum_duration_ms = Column(Float, default=0)
+    max_duration_ms = Column(Float, default=0)
+
+    __table_args__ = (
+        Index('idx_traffic_rollup_bucket_key', 'bucket_start', 'route', 'broker', 'status_code'),
+        Index('idx_traffic_rollup_route', 'route'),
+    )
+
+    @staticmethod
+    def _aggregate(rows, buckets):
+        """Fold traffic rows into {(bucket, route, broker, status): [count, sum, max]} by each row's UTC minute"""
+        for row in rows:
+            bucket = (row.get('timestamp') or datetime.utcnow()).replace(tzinfo=None, second=0, microsecond=0)
+            key = (bucket, row.get('route') or UNMATCHED_ROUTE, row.get('broker'), row['status_code'])
+            duration = row.get('duration_ms') or 0
+            entry = buckets.get(key)
+            if entry is None:
+                buckets[key] = [1, duration, duration]
+            else:
+                entry[0] += 1
+                entry[1] += duration
+                entry[2] = max(entry[2], duration)
+        return buckets
+
+    @staticmethod
+    def record_rows(rows):
+        """
+        Add a batch of logged requests to their minute buckets (caller commits). Rows are
+        bucketed by their own 'timestamp' (UTC), so a batch written after a minute boundary
+        or behind a backlog still counts each request in the minute it was served.
+        """
+        buckets = TrafficRollup._aggregate(rows, {})
+        for (bucket, route, broker, status_code), (count, total, maximum) in buckets.items():
+            rollup = TrafficRollup.query.filter_by(
+                bucket_start=bucket, route=route, broker=broker, status_code=status_code
+            ).first()
+            if rollup:
+                rollup.request_count += count
+                rollup.sum_duration_ms += total
+                rollup.max_duration_ms = max(rollup.max_duration_ms or 0, maximum)
+            else:
+                logs_session.add(TrafficRollup(
+                    bucket_start=bucket, route=route, broker=broker, status_code=status_code,
+                    request_count=count, sum_duration_ms=total, max_duration_ms=maximum
+                ))
+
+    @staticmethod
+    def get_stats(path_prefix=None, since=None, broker=None):
+        """Get total/error counts and average duration, optionally for a route prefix, broker and time window"""
         try:
-            from sqlalchemy import func
-            
-            total_requests = TrafficLog.query.count()
-            error_requests = TrafficLog.query.filter(TrafficLog.status_code >= 400).count()
-            avg_duration = logs_session.query(func.avg(TrafficLog.duration_ms)).scalar() or 0
-            
+            query = logs_session.query(
+                func.coalesce(func.sum(TrafficRollup.request_count), 0),
+                func.coalesce(func.sum(TrafficRollup.sum_duration_ms), 0)
+            )
+            error_query = logs_session.query(
+                func.coalesce(func.sum(TrafficRollup.request_count), 0)
+            ).filter(TrafficRollup.status_code >= 400)
+
+            if path_prefix:
+                query = query.filter(TrafficRollup.route.like(f'{path_prefix}%'))
+                error_query = error_query.filter(TrafficRollup.route.like(f'{path_prefix}%'))
+            if broker:
+                query = query.filter(TrafficRollup.broker == broker)
+                error_query = error_query.filter(TrafficRollup.broker == broker)
+            if since:
+                query = query.filter(TrafficRollup.bucket_start >= since)
+                error_query = error_query.filter(TrafficRollup.bucket_start >= since)
+
+            total_requests, total_duration = query.one()
+            error_requests = error_query.scalar()
+            avg_duration = total_duration / total_requests if total_requests else 0
+
             return {
-                'total_requests': total_requests,
-                'error_requests': error_requests,
+                'total_requests': int(total_requests),
+                'error_requests': int(error_requests or 0),
                 'avg_duration': round(float(avg_duration), 2)
             }
         except Exception as e:
@@ -104,6 +222,48 @@ class TrafficLog(LogBase):
                 'avg_duration': 0
             }
 
+    @staticmethod
+    def backfill(url_map=None):
+        """
+        Build rollups from existing traffic_logs rows (one-time, when the rollup table is empty).
+        Raw logs keep neither the matched rule nor the broker, so each old row is keyed by
+        matching its path against the app's url_map; skipped until the map is passed in.
+        """
+        if url_map is None:
+            return 0
+        adapter = url_map.bind('localhost')
+        try:
+            if TrafficRollup.query.first() is not None or TrafficLog.query.first() is None:
+                return 0
+
+            logger.info("Building traffic rollups from existing traffic logs")
+            buckets = {}
+            count = 0
+            rows = TrafficLog.query.with_entities(
+                TrafficLog.timestamp, TrafficLog.method, TrafficLog.path, TrafficLog.status_code, TrafficLog.duration_ms
+            ).yield_per(5000)
+            for timestamp, method, path, status_code, duration_ms in rows:
+                TrafficRollup._aggregate([{
+                    'timestamp': timestamp, 'route': match_route(adapter, path, method),
+                    'status_code': status_code, 'duration_ms': duration_ms
+                }], buckets)
+                count += 1
+
+            logs_session.add_all([
+                TrafficRollup(
+                    bucket_start=bucket, route=route, broker=broker, status_code=status_code,
+                    request_count=c, sum_duration_ms=total, max_duration_ms=maximum
+                )
+                for (bucket, route, broker, status_code), (c, total, maximum) in buckets.items()
+            ])
+            logs_session.commit()
+            logger.info(f"Built traffic rollups from {count} traffic logs")
+            return count
+        except Exception as e:
+            logger.error(f"Error building traffic rollups: {e}")
+            logs_session.rollback()
+            return 0
+
 class IPBan(LogBase):
     """Model for banned IPs"""
     __tablename__ = 'ip_bans'
@@ -119,31 +279,8 @@ class IPBan(LogBase):
 
     @staticmethod
     def is_ip_banned(ip_address):
-        """Check if an IP is currently banned"""
-        try:
-            ban = IPBan.query.filter_by(ip_address=ip_address).first()
-            if not ban:
-                return False
-
-            # Check permanent ban
-            if ban.is_permanent:
-                return True
-
-            # Check temporary ban expiry
-            if ban.expires_at:
-                if datetime.utcnow() < ban.expires_at.replace(tzinfo=None):
-                    return True
-                else:
-                    # Ban expired, remove it
-                    logs_session.delete(ban)
-                    logs_session.commit()
-                    return False
-
-            return False
-        except Exception as e:
-            logger.error(f"Error checking IP ban status: {e}")
-            logs_session.rollback()
-            return False
+        """Check if an IP is currently banned (served from the in-memory ban table)"""
+        return banned_ip_cache.is_banned(ip_address)
 
     @staticmethod
     def ban_ip(ip_address, reason, duration_hours=24, permanent=False, created_by='system'):
@@ -186,6 +323,7 @@ class IPBan(LogBase):
                 logs_session.add(ban)
 
             logs_session.commit()
+            banned_ip_cache.add(existing_ban or ban)
             logger.info(f"IP {ip_address} banned: {reason}")
             return True
         except Exception as e:
@@ -201,6 +339,7 @@ class IPBan(LogBase):
             if ban:
                 logs_session.delete(ban)
                 logs_session.commit()
+                banned_ip_cache.remove(ip_address)
                 logger.info(f"IP {ip_address} unbanned")
                 return True
             return False
@@ -230,6 +369,81 @@ class IPBan(LogBase):
             logger.error(f"Error getting IP bans: {e}")
             return []
 
+class BannedIPCache:
+    """
+    Memory-resident copy of the ip_bans table so the not-banned case costs no I/O.
+    Updated in place by IPBan.ban_ip/unban_ip and reconciled with the database
+    every reconcile_interval seconds to pick up bans made by other processes.
+    """
+
+    def __init__(self, reconcile_interval=60):
+        self.reconcile_interval = reconcile_interval
+        # ip -> naive UTC expiry datetime (datetime.max for a permanent ban)
+        self._bans = {}
+        self._last_reconcile = 0.0
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load all active bans from the database, replacing the in-memory table"""
+        # Own session: reloads run on request threads, whose scoped logs_session may still be in use
+        session = LogsSession()
+        try:
+            bans = {}
+            now = datetime.utcnow()
+            for ban in session.query(IPBan).all():
+                expires_at = ban.expires_at.replace(tzinfo=None) if ban.expires_at else None
+                if ban.is_permanent:
+                    bans[ban.ip_address] = datetime.max
+                elif expires_at and expires_at > now:
+                    bans[ban.ip_address] = expires_at
+            self._bans = bans
+            logger.debug(f"Loaded {len(bans)} active IP bans into memory")
+            return True
+        except Exception as e:
+            logger.error(f"Error loading IP bans: {e}")
+            session.rollback()
+            return False
+        finally:
+            self._last_reconcile = time.monotonic()
+            session.close()
+
+    def _reconcile_if_due(self):
+        if time.monotonic() - self._last_reconcile < self.reconcile_interval:
+            return
+        # Only one thread reconciles; the others keep using the current table
+        if self._lock.acquire(blocking=False):
+            try:
+                if time.monotonic() - self._last_reconcile >= self.reconcile_interval:
+                    self.load()
+            finally:
+                self._lock.release()
+
+    def is_banned(self, ip_address):
+        """Check if an IP is currently banned"""
+        self._reconcile_if_due()
+        expires_at = self._bans.get(ip_address)
+        if expires_at is None:
+            return False
+        if datetime.utcnow() < expires_at:
+            return True
+        # Ban expired; the database row is cleaned up by get_all_bans
+        self._bans.pop(ip_address, None)
+        return False
+
+    def add(self, ban):
+        """Add or update a ban from an IPBan row"""
+        if ban.is_permanent:
+            self._bans[ban.ip_address] = datetime.max
+        elif ban.expires_at:
+            self._bans[ban.ip_address] = ban.expires_at.replace(tzinfo=None)
+
+    def remove(self, ip_address):
+        """Remove a ban"""
+        self._bans.pop(ip_address, None)
+
+# Global in-memory ban table
+banned_ip_cache = BannedIPCache(reconcile_interval=int(os.getenv('IP_BAN_RECONCILE_INTERVAL', '60')))
+
 class Error404Tracker(LogBase):
     """Track 404 errors per IP for bot detection"""
     __tablename__ = 'error_404_tracker'
@@ -345,15 +559,22 @@ class InvalidAPIKeyTracker(LogBase):
     @staticmethod
     def track_invalid_api_key(ip_address, api_key_hash=None):
         """Track an invalid API key attempt"""
+        attempts = InvalidAPIKeyTracker.track_invalid_api_keys(
+            ip_address, 1, [api_key_hash] if api_key_hash else []
+        )
+        return attempts > 0
+
+    @staticmethod
+    def track_invalid_api_keys(ip_address, attempts, api_key_hashes=None):
+        """
+        Record a batch of invalid API key attempts for an IP in one transaction.
+        Returns the IP's attempt count for the current 24 hour period (0 if not recorded).
+        """
+        api_key_hashes = [h for h in (api_key_hashes or []) if h]
         try:
             # Check if already banned
             if IPBan.is_ip_banned(ip_address):
-                return False
-
-            # Get security settings from database
-            security_settings = get_security_settings()
-            threshold_api = security_settings['api_threshold']
-            ban_duration_api = security_settings['api_ban_duration']
+                return 0
 
             now = datetime.utcnow()
             tracker = InvalidAPIKeyTracker.query.filter_by(ip_address=ip_address).first()
@@ -362,53 +583,49 @@ class InvalidAPIKeyTracker(LogBase):
                 # Check if tracking period expired (24 hours)
                 if (now - tracker.first_attempt_at.replace(tzinfo=None)).days >= 1:
                     # Reset counter for new day
-                    tracker.attempt_count = 1
+                    tracker.attempt_count = attempts
                     tracker.first_attempt_at = now
-                    tracker.api_keys_tried = json.dumps([api_key_hash] if api_key_hash else [])
+                    tracker.api_keys_tried = json.dumps(api_key_hashes[-20:])
                 else:
                     # Increment counter
-                    tracker.attempt_count += 1
+                    tracker.attempt_count += attempts
 
-                    # Add API key hash to tried list
-                    if api_key_hash:
+                    # Add API key hashes to tried list
+                    if api_key_hashes:
                         keys_tried = json.loads(tracker.api_keys_tried or '[]')
-                        if api_key_hash not in keys_tried:
-                            keys_tried.append(api_key_hash)
-                            tracker.api_keys_tried = json.dumps(keys_tried[-20:])  # Keep last 20 keys
+                        for api_key_hash in api_key_hashes:
+                            if api_key_hash not in keys_tried:
+                                keys_tried.append(api_key_hash)
+                        tracker.api_keys_tried = json.dumps(keys_tried[-20:])  # Keep last 20 keys
 
                 tracker.last_attempt_at = now
-
-                # Check if threshold reached (configurable, default 10 invalid API keys per day)
-                # AUTOMATED BAN DISABLED - Manual ban only via /security dashboard
-                # if tracker.attempt_count >= threshold_api:
-                #     # Don't ban localhost IPs but keep tracking
-                #     if ip_address not in ['127.0.0.1', '::1', 'localhost']:
-                #         # Ban the IP
-                #         success = IPBan.ban_ip(
-                #             ip_address=ip_address,
-                #             reason=f"Exceeded invalid API key threshold: {tracker.attempt_count} attempts in 24 hours",
-                #             duration_hours=ban_duration_api,  # Configurable hours for API abuse
-                #             created_by='api_key_detector'
-                #         )
-                #
-                #         # Only delete tracker if ban was successful
-                #         if success:
-                #             logs_session.delete(tracker)
             else:
                 # Create new tracker
                 tracker = InvalidAPIKeyTracker(
                     ip_address=ip_address,
-                    attempt_count=1,
-                    api_keys_tried=json.dumps([api_key_hash] if api_key_hash else [])
+                    attempt_count=attempts,
+                    api_keys_tried=json.dumps(api_key_hashes[-20:])
                 )
                 logs_session.add(tracker)
 
             logs_session.commit()
-            return True
+            return tracker.attempt_count
 
         except Exception as e:
             logger.error(f"Error tracking invalid API key: {e}")
             logs_session.rollback()
+            return 0
+
+    @staticmethod
+    def clear_ip(ip_address):
+        """Remove the tracker entry for an IP (e.g. after it has been banned)"""
+        try:
+            InvalidAPIKeyTracker.query.filter_by(ip_address=ip_address).delete()
+            logs_session.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error clearing invalid API key tracker: {e}")
+            logs_session.rollback()
             return False
 
     @staticmethod
@@ -446,3 +663,12 @@ def init_logs_db():
 
     # Create all tables
     LogBase.metadata.create_all(bind=logs_engine)
+
+    # Populate rollups for databases created before rollups existed. Old rows are matched
+    # against the URL rules, which are all registered only when setup_environment calls
+    # this again inside the app context
+    TrafficRollup.backfill(current_app.url_map if has_app_context() else None)
+    logs_session.remove()
+
+    # Load active bans into memory
+    banned_ip_cache.load()
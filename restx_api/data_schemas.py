@@ -51,9 +51,13 @@ class SearchSchema(Schema):
     apikey = fields.Str(required=True)      # API Key for authentication
     query = fields.Str(required=True)       # Search query/symbol name
     exchange = fields.Str(required=False)   # Optional exchange filter (e.g., NSE, BSE)
+    limit = fields.Int(required=False, validate=validate.Range(min=1, error="Limit must be a positive integer."))   # Page size (capped by SEARCH_MAX_RESULTS)
+    offset = fields.Int(required=False, validate=validate.Range(min=0, error="Offset must be a non-negative integer."))  # Matches to skip
 
 class ExpirySchema(Schema):
     apikey = fields.Str(required=True)      # API Key for authentication
     symbol = fields.Str(required=True)      # Underlying symbol (e.g., NIFTY, BANKNIFTY)
     exchange = fields.Str(required=True, validate=validate.OneOf(["NFO", "BFO", "MCX", "CDS"]))    # Exchange (e.g., NFO, BFO, MCX, CDS)
     instrumenttype = fields.Str(required=True, validate=validate.OneOf(["futures", "options"]))  # futures or options
+    count = fields.Int(required=False, validate=validate.Range(min=1, error="Count must be a positive integer."))  # Next N expiries from today
+    expiry_type = fields.Str(required=False, validate=validate.OneOf(["weekly", "monthly"]))  # weekly (all) or monthly expiries
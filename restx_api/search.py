@@ -35,7 +35,9 @@ class Search(Resource):
             success, response_data, status_code = search_symbols(
                 query=query,
                 exchange=exchange,
-                api_key=api_key
+                api_key=api_key,
+                limit=search_data.get('limit'),
+                offset=search_data.get('offset', 0)
             )
             
             return make_response(jsonify(response_data), status_code)
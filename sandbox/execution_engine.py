@@ -35,18 +35,16 @@ logger = get_logger(__name__)
 
 
 class ExecutionEngine:
-    """Executes pending orders based on market data"""
-
-    def __init__(self):
-        # Read rate limits from .env (same as API protection)
-        self.order_rate_limit = int(os.getenv('ORDER_RATE_LIMIT', '10 per second').split()[0])
-        self.api_rate_limit = int(os.getenv('API_RATE_LIMIT', '50 per second').split()[0])
-        self.batch_delay = 1.0  # 1 second between batches
+    """
+    Executes pending orders based on market data.
+    Quote fetches are paced by the broker rate governor in the quotes service;
+    fills are simulated locally and never call the broker.
+    """
 
     def check_and_execute_pending_orders(self):
         """
         Main execution loop - checks all pending orders and executes if conditions met
-        Respects rate limits through batch processing
+        Quote fetches respect the broker rate governor
         """
         try:
             # Get all pending orders
@@ -66,34 +64,18 @@ class ExecutionEngine:
                     orders_by_symbol[key] = []
                 orders_by_symbol[key].append(order)
 
-            # Fetch quotes in batches (respecting API rate limit of 50/second)
+            # Fetch one quote per symbol (the quotes service waits on the broker rate governor)
             quote_cache = {}
-            symbols_list = list(orders_by_symbol.keys())
-
-            for i in range(0, len(symbols_list), self.api_rate_limit):
-                batch = symbols_list[i:i + self.api_rate_limit]
-
-                for symbol, exchange in batch:
-                    quote_cache[(symbol, exchange)] = self._fetch_quote(symbol, exchange)
+            for symbol, exchange in orders_by_symbol:
+                quote_cache[(symbol, exchange)] = self._fetch_quote(symbol, exchange)
 
-                # Wait 1 second before next batch if more symbols remain
-                if i + self.api_rate_limit < len(symbols_list):
-                    time.sleep(self.batch_delay)
-
-            # Process orders in batches (respecting order rate limit of 10/second)
+            # Fill orders against the fetched quotes (local simulation, no broker calls)
             orders_processed = 0
-            for i in range(0, len(pending_orders), self.order_rate_limit):
-                batch = pending_orders[i:i + self.order_rate_limit]
-
-                for order in batch:
-                    quote = quote_cache.get((order.symbol, order.exchange))
-                    if quote:
-                        self._process_order(order, quote)
-                        orders_processed += 1
-
-                # Wait 1 second before next batch if more orders remain
-                if i + self.order_rate_limit < len(pending_orders):
-                    time.sleep(self.batch_delay)
+            for order in pending_orders:
+                quote = quote_cache.get((order.symbol, order.exchange))
+                if quote:
+                    self._process_order(order, quote)
+                    orders_processed += 1
 
             logger.info(f"Processed {orders_processed} orders")
 
@@ -16,6 +16,7 @@ from utils.constants import (
     REQUIRED_ORDER_FIELDS
 )
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.rate_governor import rate_governor, rate_limited_response, ORDERS
 from utils.logging import get_logger
 from services.telegram_alert_service import telegram_alert_service
 
@@ -132,6 +133,14 @@ def place_single_order(
         Order result dictionary
     """
     try:
+        # Each leg waits for the broker's order rate budget
+        broker = broker_module.__name__.split('.')[1]
+        if not rate_governor.acquire(broker, ORDERS):
+            return {
+                'symbol': order_data['symbol'],
+                **rate_limited_response(ORDERS)
+            }
+
         # Place the order
         res, response_data, order_id = broker_module.place_order_api(order_data, auth_token)
 
@@ -1,12 +1,17 @@
 from database.symbol import SymToken, db_session
 from database.auth_db import verify_api_key
+from database.token_db_enhanced import get_cache
+from database.derivatives_index import ExpiryCalendar, WEEKLY, MONTHLY
 from utils.logging import get_logger
-from typing import Tuple, Dict, Any, List
+from typing import Tuple, Dict, Any, List, Optional
 from sqlalchemy import distinct, func
 
 logger = get_logger(__name__)
 
-def get_expiry_dates(symbol: str, exchange: str, instrumenttype: str, api_key: str = None) -> Tuple[bool, Dict[str, Any], int]:
+EXPIRY_TYPES = [WEEKLY, MONTHLY]
+
+def get_expiry_dates(symbol: str, exchange: str, instrumenttype: str, api_key: str = None,
+                     count: Optional[int] = None, expiry_type: Optional[str] = None) -> Tuple[bool, Dict[str, Any], int]:
     """
     Get expiry dates for F&O symbols (futures or options) for a given underlying symbol.
     
@@ -15,6 +20,9 @@ def get_expiry_dates(symbol: str, exchange: str, instrumenttype: str, api_key: s
         exchange: Exchange (NFO, BFO, MCX, CDS)
         instrumenttype: Type of instrument (futures or options)
         api_key: API key for authentication
+        count: Return only the next N expiries from today
+        expiry_type: weekly (every expiry) or monthly (last expiry of each month);
+            when count or expiry_type is given, only expiries from today onwards are returned
     
     Returns:
         Tuple of (success, response_data, status_code)
@@ -69,45 +77,37 @@ def get_expiry_dates(symbol: str, exchange: str, instrumenttype: str, api_key: s
                 'message': f'Exchange must be one of: {", ".join(supported_exchanges)}'
             }, 400
         
+        if expiry_type and expiry_type.lower() not in EXPIRY_TYPES:
+            logger.warning(f"Invalid expiry_type provided: {expiry_type}")
+            return False, {
+                'status': 'error',
+                'message': 'Expiry type must be either "weekly" or "monthly"'
+            }, 400
+        
+        if count is not None and count < 1:
+            return False, {
+                'status': 'error',
+                'message': 'Count must be a positive number'
+            }, 400
+        
         symbol = symbol.strip().upper()
         exchange = exchange.strip().upper()
         instrumenttype = instrumenttype.strip().lower()
         
         logger.info(f"Getting expiry dates for symbol: {symbol}, exchange: {exchange}, instrumenttype: {instrumenttype}")
         
-        # Build query based on instrument type
-        # For exact matching, we need to ensure the symbol starts with the underlying symbol
-        # followed by a date pattern (for F&O instruments)
-        # Use startswith and filter in Python for exact matching
-        query = db_session.query(SymToken.symbol, SymToken.expiry, SymToken.instrumenttype).filter(
-            SymToken.symbol.like(f'{symbol}%'),
-            SymToken.exchange == exchange,
-            SymToken.expiry.isnot(None),
-            SymToken.expiry != ''
-        )
-        
-        # Filter by instrument type based on exchange
-        if instrumenttype == 'futures':
-            # All exchanges support FUT along with their specific types
-            if exchange in ['NFO', 'BFO']:
-                query = query.filter(SymToken.instrumenttype.in_(['FUTSTK', 'FUTIDX', 'FUT']))
-            elif exchange == 'MCX':
-                query = query.filter(SymToken.instrumenttype.in_(['FUTCOM', 'FUTENR', 'FUT']))
-            elif exchange == 'CDS':
-                query = query.filter(SymToken.instrumenttype.in_(['FUTCUR', 'FUTIRC', 'FUT']))
-        else:  # options
-            # All exchanges support CE/PE along with their specific types
-            if exchange in ['NFO', 'BFO']:
-                query = query.filter(SymToken.instrumenttype.in_(['OPTSTK', 'OPTIDX', 'CE', 'PE']))
-            elif exchange == 'MCX':
-                query = query.filter(SymToken.instrumenttype.in_(['OPTFUT', 'CE', 'PE']))
-            elif exchange == 'CDS':
-                query = query.filter(SymToken.instrumenttype.in_(['OPTCUR', 'OPTIRC', 'CE', 'PE']))
+        calendar = _get_cached_calendar(symbol, exchange, instrumenttype)
+        if calendar is None:
+            expiry_dates = _get_expiry_dates_from_db(symbol, exchange, instrumenttype)
+            if count is not None or expiry_type:
+                calendar = ExpiryCalendar.from_labels(expiry_dates)
         
-        # Execute query and get results
-        results = query.all()
+        if count is not None or expiry_type:
+            expiry_dates = calendar.upcoming(count, (expiry_type or WEEKLY).lower())
+        elif calendar is not None:
+            expiry_dates = list(calendar.labels)
         
-        if not results:
+        if not expiry_dates:
             logger.info(f"No expiry dates found for symbol: {symbol}, exchange: {exchange}, instrumenttype: {instrumenttype}")
             return True, {
                 'status': 'success',
@@ -115,85 +115,6 @@ def get_expiry_dates(symbol: str, exchange: str, instrumenttype: str, api_key: s
                 'data': []
             }, 200
         
-        # Debug: Log some sample symbols to understand the format
-        logger.info(f"Sample symbols found: {[r[0] for r in results[:5]]}")
-        
-        # Filter for exact symbol match and extract expiry dates
-        # Pattern: SYMBOL + DDMMMYY (like BANKNIFTY31JUL25) + optional suffix (like FUT/CE/PE)
-        import re
-        # For futures, we need to handle the FUT suffix
-        if instrumenttype == 'futures':
-            pattern = f'^{symbol}[0-9]{{2}}[A-Z]{{3}}[0-9]{{2}}(FUT)?'
-        else:
-            # For options: SYMBOL + DDMMMYY + strike + CE/PE
-            pattern = f'^{symbol}[0-9]{{2}}[A-Z]{{3}}[0-9]{{2}}'
-        
-        filtered_expiry_dates = set()
-        for result in results:
-            symbol_name, expiry_date, _ = result
-            logger.debug(f"Checking symbol: {symbol_name} against pattern: {pattern}")
-            if re.match(pattern, symbol_name):
-                filtered_expiry_dates.add(expiry_date)
-                logger.debug(f"Pattern matched: {symbol_name} -> {expiry_date}")
-        
-        # If no exact matches found, let's be more lenient and check different patterns
-        if not filtered_expiry_dates:
-            logger.info(f"No exact matches found. Trying alternative patterns.")
-            # Try different patterns that might exist in the database
-            if instrumenttype == 'futures':
-                alternative_patterns = [
-                    f'^{symbol}[0-9]{{2}}[A-Z]{{3}}[0-9]{{2}}FUT',  # RELIANCE31JUL25FUT
-                    f'^{symbol}[0-9]{{2}}[A-Z]{{3}}[0-9]{{2}}',  # RELIANCE31JUL25
-                    f'^{symbol}[0-9]{{2}}[A-Z]{{3}}FUT',  # RELIANCE31JULFUT
-                    f'^{symbol}[0-9]{{4}}[A-Z]{{3}}FUT',  # RELIANCE2025JULFUT
-                    f'^{symbol}[A-Z]{{3}}[0-9]{{2}}FUT',  # RELIANCEJUL25FUT
-                    f'^{symbol}[A-Z]{{3}}[0-9]{{4}}FUT',  # RELIANCEJUL2025FUT
-                ]
-            else:
-                alternative_patterns = [
-                    f'^{symbol}[0-9]{{2}}[A-Z]{{3}}[0-9]{{2}}',  # BANKNIFTY31JUL25
-                    f'^{symbol}[0-9]{{2}}[A-Z]{{3}}',  # BANKNIFTY31JUL
-                    f'^{symbol}[0-9]{{4}}[A-Z]{{3}}',  # BANKNIFTY2025JUL
-                    f'^{symbol}[A-Z]{{3}}[0-9]{{2}}',  # BANKNIFTYJUL25
-                    f'^{symbol}[A-Z]{{3}}[0-9]{{4}}',  # BANKNIFTYJUL2025
-                ]
-            
-            for alt_pattern in alternative_patterns:
-                temp_matches = set()
-                for result in results:
-                    symbol_name, expiry_date, _ = result
-                    if re.match(alt_pattern, symbol_name):
-                        temp_matches.add(expiry_date)
-                        logger.debug(f"Alternative pattern {alt_pattern} matched: {symbol_name}")
-                
-                if temp_matches:
-                    filtered_expiry_dates = temp_matches
-                    logger.info(f"Found matches with alternative pattern: {alt_pattern}")
-                    break
-        
-        # Convert to sorted list (sort by date, not alphabetically)
-        from datetime import datetime
-        
-        def sort_expiry_dates(date_list):
-            """Sort expiry dates chronologically"""
-            def parse_date(date_str):
-                try:
-                    # Parse date format like "31-JUL-25" 
-                    return datetime.strptime(date_str, "%d-%b-%y")
-                except ValueError:
-                    try:
-                        # Try alternative format like "31-JUL-2025"
-                        return datetime.strptime(date_str, "%d-%b-%Y")
-                    except ValueError:
-                        # If parsing fails, return a very distant future date to put unparseable dates at the end
-                        logger.warning(f"Could not parse expiry date: {date_str}, placing at end of list")
-                        return datetime.max
-            
-            # Sort by parsed date
-            return sorted(date_list, key=parse_date)
-        
-        expiry_dates = sort_expiry_dates(list(filtered_expiry_dates))
-        
         logger.info(f"Found {len(expiry_dates)} expiry dates for symbol: {symbol}")
         
         return True, {
@@ -207,4 +128,150 @@ def get_expiry_dates(symbol: str, exchange: str, instrumenttype: str, api_key: s
         return False, {
             'status': 'error',
             'message': 'An error occurred while fetching expiry dates'
-        }, 500
\ No newline at end of file
+        }, 500
+
+def get_nearest_expiry(symbol: str, exchange: str, instrumenttype: str, expiry_type: str = WEEKLY,
+                       api_key: str = None) -> Tuple[bool, Dict[str, Any], int]:
+    """
+    Get the nearest upcoming weekly or monthly expiry for an underlying.
+    
+    Returns:
+        Tuple of (success, response_data, status_code); data is the expiry string or None
+    """
+    success, response_data, status_code = get_expiry_dates(
+        symbol, exchange, instrumenttype, api_key=api_key, count=1, expiry_type=expiry_type
+    )
+    if success:
+        expiries = response_data['data']
+        response_data['data'] = expiries[0] if expiries else None
+        response_data['message'] = (
+            f'Nearest {expiry_type.lower()} expiry for {symbol.strip().upper()} {instrumenttype.strip().lower()} is {expiries[0]}'
+            if expiries else response_data['message']
+        )
+    return success, response_data, status_code
+
+def _get_cached_calendar(symbol: str, exchange: str, instrumenttype: str) -> Optional[ExpiryCalendar]:
+    """Expiry calendar precomputed when the master contract was loaded into the symbol cache"""
+    try:
+        cache = get_cache()
+        if cache.is_ready():
+            return cache.get_expiry_calendar(symbol, exchange, instrumenttype)
+    except Exception as e:
+        logger.error(f"Error reading expiry calendar from cache: {e}")
+    return None
+
+def _get_expiry_dates_from_db(symbol: str, exchange: str, instrumenttype: str) -> List[str]:
+    """Sorted expiry dates from the symtoken table (used when the symbol cache is not loaded)"""
+    # Build query based on instrument type
+    # For exact matching, we need to ensure the symbol starts with the underlying symbol
+    # followed by a date pattern (for F&O instruments)
+    # Use startswith and filter in Python for exact matching
+    query = db_session.query(SymToken.symbol, SymToken.expiry, SymToken.instrumenttype).filter(
+        SymToken.symbol.like(f'{symbol}%'),
+        SymToken.exchange == exchange,
+        SymToken.expiry.isnot(None),
+        SymToken.expiry != ''
+    )
+    
+    # Filter by instrument type based on exchange
+    if instrumenttype == 'futures':
+        # All exchanges support FUT along with their specific types
+        if exchange in ['NFO', 'BFO']:
+            query = query.filter(SymToken.instrumenttype.in_(['FUTSTK', 'FUTIDX', 'FUT']))
+        elif exchange == 'MCX':
+            query = query.filter(SymToken.instrumenttype.in_(['FUTCOM', 'FUTENR', 'FUT']))
+        elif exchange == 'CDS':
+            query = query.filter(SymToken.instrumenttype.in_(['FUTCUR', 'FUTIRC', 'FUT']))
+    else:  # options
+        # All exchanges support CE/PE along with their specific types
+        if exchange in ['NFO', 'BFO']:
+            query = query.filter(SymToken.instrumenttype.in_(['OPTSTK', 'OPTIDX', 'CE', 'PE']))
+        elif exchange == 'MCX':
+            query = query.filter(SymToken.instrumenttype.in_(['OPTFUT', 'CE', 'PE']))
+        elif exchange == 'CDS':
+            query = query.filter(SymToken.instrumenttype.in_(['OPTCUR', 'OPTIRC', 'CE', 'PE']))
+    
+    # Execute query and get results
+    results = query.all()
+    
+    if not results:
+        return []
+    
+    # Debug: Log some sample symbols to understand the format
+    logger.info(f"Sample symbols found: {[r[0] for r in results[:5]]}")
+    
+    # Filter for exact symbol match and extract expiry dates
+    # Pattern: SYMBOL + DDMMMYY (like BANKNIFTY31JUL25) + optional suffix (like FUT/CE/PE)
+    import re
+    # For futures, we need to handle the FUT suffix
+    if instrumenttype == 'futures':
+        pattern = f'^{symbol}[0-9]{{2}}[A-Z]{{3}}[0-9]{{2}}(FUT)?'
+    else:
+        # For options: SYMBOL + DDMMMYY + strike + CE/PE
+        pattern = f'^{symbol}[0-9]{{2}}[A-Z]{{3}}[0-9]{{2}}'
+    
+    filtered_expiry_dates = set()
+    for result in results:
+        symbol_name, expiry_date, _ = result
+        logger.debug(f"Checking symbol: {symbol_name} against pattern: {pattern}")
+        if re.match(pattern, symbol_name):
+            filtered_expiry_dates.add(expiry_date)
+            logger.debug(f"Pattern matched: {symbol_name} -> {expiry_date}")
+    
+    # If no exact matches found, let's be more lenient and check different patterns
+    if not filtered_expiry_dates:
+        logger.info(f"No exact matches found. Trying alternative patterns.")
+        # Try different patterns that might exist in the database
+        if instrumenttype == 'futures':
+            alternative_patterns = [
+                f'^{symbol}[0-9]{{2}}[A-Z]{{3}}[0-9]{{2}}FUT',  # RELIANCE31JUL25FUT
+                f'^{symbol}[0-9]{{2}}[A-Z]{{3}}[0-9]{{2}}',  # RELIANCE31JUL25
+                f'^{symbol}[0-9]{{2}}[A-Z]{{3}}FUT',  # RELIANCE31JULFUT
+                f'^{symbol}[0-9]{{4}}[A-Z]{{3}}FUT',  # RELIANCE2025JULFUT
+                f'^{symbol}[A-Z]{{3}}[0-9]{{2}}FUT',  # RELIANCEJUL25FUT
+                f'^{symbol}[A-Z]{{3}}[0-9]{{4}}FUT',  # RELIANCEJUL2025FUT
+            ]
+        else:
+            alternative_patterns = [
+                f'^{symbol}[0-9]{{2}}[A-Z]{{3}}[0-9]{{2}}',  # BANKNIFTY31JUL25
+                f'^{symbol}[0-9]{{2}}[A-Z]{{3}}',  # BANKNIFTY31JUL
+                f'^{symbol}[0-9]{{4}}[A-Z]{{3}}',  # BANKNIFTY2025JUL
+                f'^{symbol}[A-Z]{{3}}[0-9]{{2}}',  # BANKNIFTYJUL25
+                f'^{symbol}[A-Z]{{3}}[0-9]{{4}}',  # BANKNIFTYJUL2025
+            ]
+        
+        for alt_pattern in alternative_patterns:
+            temp_matches = set()
+            for result in results:
+                symbol_name, expiry_date, _ = result
+                if re.match(alt_pattern, symbol_name):
+                    temp_matches.add(expiry_date)
+                    logger.debug(f"Alternative pattern {alt_pattern} matched: {symbol_name}")
+            
+            if temp_matches:
+                filtered_expiry_dates = temp_matches
+                logger.info(f"Found matches with alternative pattern: {alt_pattern}")
+                break
+    
+    # Convert to sorted list (sort by date, not alphabetically)
+    from datetime import datetime
+    
+    def sort_expiry_dates(date_list):
+        """Sort expiry dates chronologically"""
+        def parse_date(date_str):
+            try:
+                # Parse date format like "31-JUL-25" 
+                return datetime.strptime(date_str, "%d-%b-%y")
+            except ValueError:
+                try:
+                    # Try alternative format like "31-JUL-2025"
+                    return datetime.strptime(date_str, "%d-%b-%Y")
+                except ValueError:
+                    # If parsing fails, return a very distant future date to put unparseable dates at the end
+                    logger.warning(f"Could not parse expiry date: {date_str}, placing at end of list")
+                    return datetime.max
+        
+        # Sort by parsed date
+        return sorted(date_list, key=parse_date)
+    
+    return sort_expiry_dates(list(filtered_expiry_dates))
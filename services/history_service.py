@@ -3,6 +3,7 @@ import traceback
 import pandas as pd
 from typing import Tuple, Dict, Any, Optional, List, Union
 from database.auth_db import get_auth_token_broker
+from utils.rate_governor import rate_governor, rate_limited_response, HISTORY
 from utils.logging import get_logger
 
 # Initialize logger
@@ -63,6 +64,10 @@ def get_history_with_auth(
             'message': 'Broker-specific module not found'
         }, 404
 
+    # Wait for the broker's history rate budget
+    if not rate_governor.acquire(broker, HISTORY):
+        return False, rate_limited_response(HISTORY), 429
+
     try:
         # Initialize broker's data handler based on broker's requirements
         if hasattr(broker_module.BrokerData.__init__, '__code__'):
@@ -9,6 +9,7 @@ from database.settings_db import get_analyze_mode
 from database.analyzer_db import async_log_analyzer
 from extensions import socketio
 from utils.api_analyzer import analyze_request
+from utils.rate_governor import rate_governor, rate_limited_response, ORDERS
 from utils.logging import get_logger
 from services.telegram_alert_service import telegram_alert_service
 
@@ -118,6 +119,12 @@ def modify_order_with_auth(
         executor.submit(async_log_order, 'modifyorder', original_data, error_response)
         return False, error_response, 404
 
+    # Wait for the broker's order rate budget
+    if not rate_governor.acquire(broker, ORDERS):
+        error_response = rate_limited_response(ORDERS)
+        executor.submit(async_log_order, 'modifyorder', original_data, error_response)
+        return False, error_response, 429
+
     try:
         # Use the dynamically imported module's function to modify the order
         response_message, status_code = broker_module.modify_order(order_data, auth_token)
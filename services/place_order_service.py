@@ -16,6 +16,7 @@ from utils.constants import (
     REQUIRED_ORDER_FIELDS
 )
 from restx_api.schemas import OrderSchema
+from utils.rate_governor import rate_governor, rate_limited_response, ORDERS
 from utils.logging import get_logger
 from services.telegram_alert_service import telegram_alert_service
 
@@ -172,6 +173,12 @@ def place_order_with_auth(
         executor.submit(async_log_order, 'placeorder', original_data, error_response)
         return False, error_response, 404
 
+    # Wait for the broker's order rate budget
+    if not rate_governor.acquire(broker, ORDERS):
+        error_response = rate_limited_response(ORDERS)
+        executor.submit(async_log_order, 'placeorder', original_data, error_response)
+        return False, error_response, 429
+
     try:
         # Call the broker's place_order_api function
         res, response_data, order_id = broker_module.place_order_api(order_data, auth_token)
@@ -17,6 +17,7 @@ from utils.constants import (
     VALID_PRODUCT_TYPES,
     REQUIRED_SMART_ORDER_FIELDS
 )
+from utils.rate_governor import rate_governor, rate_limited_response, ORDERS
 from utils.logging import get_logger
 from services.telegram_alert_service import telegram_alert_service
 
@@ -193,6 +194,12 @@ def place_smart_order_with_auth(
         executor.submit(async_log_order, 'placesmartorder', original_data, error_response)
         return False, error_response, 404
 
+    # Wait for the broker's order rate budget
+    if not rate_governor.acquire(broker, ORDERS):
+        error_response = rate_limited_response(ORDERS)
+        executor.submit(async_log_order, 'placesmartorder', original_data, error_response)
+        return False, error_response, 429
+
     try:
         res, response_data, order_id = broker_module.place_smartorder_api(order_data, auth_token)
         
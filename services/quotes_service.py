@@ -2,6 +2,7 @@ import importlib
 import traceback
 from typing import Tuple, Dict, Any, Optional, Union
 from database.auth_db import get_auth_token_broker
+from utils.rate_governor import rate_governor, rate_limited_response, QUOTES
 from utils.logging import get_logger
 
 # Initialize logger
@@ -49,6 +50,10 @@ def get_quotes_with_auth(auth_token: str, feed_token: Optional[str], broker: str
             'message': 'Broker-specific module not found'
         }, 404
 
+    # Wait for the broker's quotes rate budget
+    if not rate_governor.acquire(broker, QUOTES):
+        return False, rate_limited_response(QUOTES), 429
+
     try:
         # Initialize broker's data handler based on broker's requirements
         if hasattr(broker_module.BrokerData.__init__, '__code__'):
@@ -1,11 +1,12 @@
-from database.symbol import enhanced_search_symbols
+from database.symbol import enhanced_search_symbols, SEARCH_MAX_RESULTS
 from database.auth_db import verify_api_key
 from utils.logging import get_logger
 from typing import Tuple, Dict, Any, List
 
 logger = get_logger(__name__)
 
-def search_symbols(query: str, exchange: str = None, api_key: str = None) -> Tuple[bool, Dict[str, Any], int]:
+def search_symbols(query: str, exchange: str = None, api_key: str = None,
+                   limit: int = None, offset: int = 0) -> Tuple[bool, Dict[str, Any], int]:
     """
     Search for symbols in the database
     
@@ -13,6 +14,8 @@ def search_symbols(query: str, exchange: str = None, api_key: str = None) -> Tup
         query: Search query/symbol name
         exchange: Optional exchange filter (NSE, BSE, etc.)
         api_key: API key for authentication
+        limit: Optional page size (capped at SEARCH_MAX_RESULTS)
+        offset: Number of matches to skip (for pagination)
     
     Returns:
         Tuple of (success, response_data, status_code)
@@ -39,15 +42,19 @@ def search_symbols(query: str, exchange: str = None, api_key: str = None) -> Tup
         query = query.strip()
         logger.info(f"Searching symbols for query: {query}, exchange: {exchange}")
         
-        # Perform the search
-        results = enhanced_search_symbols(query, exchange)
+        # Perform the search (served from the in-memory symbol index when the cache is loaded)
+        limit = min(limit or SEARCH_MAX_RESULTS, SEARCH_MAX_RESULTS)
+        offset = offset or 0
+        results = enhanced_search_symbols(query, exchange, limit=limit, offset=offset)
         
         if not results:
             logger.info(f"No results found for query: {query}")
             return True, {
                 'status': 'success',
                 'message': 'No matching symbols found',
-                'data': []
+                'data': [],
+                'limit': limit,
+                'offset': offset
             }, 200
         
         # Convert results to dict format
@@ -73,7 +80,9 @@ def search_symbols(query: str, exchange: str = None, api_key: str = None) -> Tup
         return True, {
             'status': 'success',
             'message': f'Found {len(results_data)} matching symbols',
-            'data': results_data
+            'data': results_data,
+            'limit': limit,
+            'offset': offset
         }, 200
         
     except Exception as e:
@@ -17,6 +17,7 @@ from utils.constants import (
     VALID_PRODUCT_TYPES,
     REQUIRED_ORDER_FIELDS
 )
+from utils.rate_governor import rate_governor, rate_limited_response, ORDERS
 from utils.logging import get_logger
 from services.telegram_alert_service import telegram_alert_service
 
@@ -99,6 +100,15 @@ def place_single_order(
         Order result dictionary
     """
     try:
+        # Each leg waits for the broker's order rate budget
+        broker = broker_module.__name__.split('.')[1]
+        if not rate_governor.acquire(broker, ORDERS):
+            return {
+                'order_num': order_num,
+                'quantity': int(order_data['quantity']),
+                **rate_limited_response(ORDERS)
+            }
+
         # Place the order using place_order_api
         res, response_data, order_id = broker_module.place_order_api(order_data, auth_token)
 
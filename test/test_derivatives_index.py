@@ -0,0 +1,81 @@
+"""
+Tests for the options/futures index of the symbol cache (database/derivatives_index.py)
+"""
+
+import sys
+import os
+from datetime import date
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.token_db_enhanced import SymbolTable, BrokerSymbolCache
+from database.derivatives_index import ExpiryCalendar
+
+def _cache():
+    table = SymbolTable()
+    for strike in (24900.0, 25000.0, 25100.0, 25200.0):
+        for side in ('CE', 'PE'):
+            if strike == 25200.0 and side == 'PE':
+                continue
+            symbol = f'NIFTY28OCT25{int(strike)}{side}'
+            table.append(symbol, symbol, 'NIFTY', 'NFO', 'NFO', f'{int(strike)}{side}', '28-OCT-25',
+                         strike, 75, 'OPTIDX', 0.05)
+    table.append('NIFTY04NOV2525000CE', 'NIFTY04NOV2525000CE', 'NIFTY', 'NFO', 'NFO', '9001', '04-NOV-25',
+                 25000.0, 75, 'OPTIDX', 0.05)
+    table.append('NIFTY25NOV25FUT', 'NIFTY25NOV25FUT', 'NIFTY', 'NFO', 'NFO', '9002', '25-NOV-25',
+                 None, 75, 'FUTIDX', 0.05)
+    table.append('NIFTY28OCT25FUT', 'NIFTY28OCT25FUT', 'NIFTY', 'NFO', 'NFO', '9003', '28-OCT-25',
+                 None, 75, 'FUTIDX', 0.05)
+    table.append('SBIN', 'SBIN-EQ', 'SBI', 'NSE', 'NSE', '3045', None, None, 1, 'EQ', 0.05)
+    table.finalize()
+    cache = BrokerSymbolCache()
+    cache.table = table
+    return cache
+
+def test_option_resolution():
+    """Options resolve from any expiry format without building the symbol"""
+    cache = _cache()
+    assert cache.get_option('NIFTY', 'NFO', '28-OCT-25', 25000, 'CE').symbol == 'NIFTY28OCT2525000CE'
+    assert cache.get_option('nifty', 'NFO', '28OCT25', 25000, 'pe').symbol == 'NIFTY28OCT2525000PE'
+    assert cache.get_option('NIFTY', 'NFO', date(2025, 10, 28), 25200, 'PE') is None
+    assert cache.get_option('NIFTY', 'NFO', '28-OCT-25', 25050, 'CE') is None
+
+def test_strike_queries():
+    """Nearest strike, ATM +/- N and the option chain"""
+    cache = _cache()
+    assert cache.get_strikes('NIFTY', 'NFO', '28-OCT-25') == [24900.0, 25000.0, 25100.0, 25200.0]
+    assert cache.get_nearest_strike('NIFTY', 'NFO', '28-OCT-25', 25040) == 25000.0
+    assert cache.get_nearest_strike('NIFTY', 'NFO', '28-OCT-25', 25050) == 25000.0
+    assert cache.get_nearest_strike('NIFTY', 'NFO', '28-OCT-25', 25190, 'PE') == 25100.0
+    assert cache.get_atm_strikes('NIFTY', 'NFO', '28-OCT-25', 25120, 1) == [25000.0, 25100.0, 25200.0]
+    assert cache.get_atm_strikes('NIFTY', 'NFO', '28-OCT-25', 24000, 1) == [24900.0, 25000.0]
+
+    chain = cache.get_option_chain('NIFTY', 'NFO', '28-OCT-25', price=25190, count=1)
+    assert [row['strike'] for row in chain] == [25100.0, 25200.0]
+    assert chain[1]['ce'].symbol == 'NIFTY28OCT2525200CE' and chain[1]['pe'] is None
+
+def test_futures_in_expiry_order():
+    """Futures are listed per expiry and across expiries by date"""
+    cache = _cache()
+    assert [f.symbol for f in cache.get_futures('NIFTY', 'NFO')] == ['NIFTY28OCT25FUT', 'NIFTY25NOV25FUT']
+    assert [f.symbol for f in cache.get_futures('NIFTY', 'NFO', '25-NOV-25')] == ['NIFTY25NOV25FUT']
+    assert cache.get_futures('SBIN', 'NSE') == []
+
+def test_expiry_calendars():
+    """Calendars per instrument class with next N and nearest weekly/monthly"""
+    cache = _cache()
+    options = cache.get_expiry_calendar('NIFTY', 'NFO', 'options')
+    futures = cache.get_expiry_calendar('nifty', 'nfo', 'FUTURES')
+    assert options.labels == ['28-OCT-25', '04-NOV-25']
+    assert futures.labels == ['28-OCT-25', '25-NOV-25']
+    assert options.monthly == [True, True]
+    assert options.upcoming(today=date(2025, 10, 28)) == ['28-OCT-25', '04-NOV-25']
+    assert options.upcoming(1, today=date(2025, 10, 29)) == ['04-NOV-25']
+    assert options.nearest(today=date(2025, 11, 5)) is None
+    assert cache.get_expiry_calendar('SBIN', 'NSE', 'options') is None
+
+    calendar = ExpiryCalendar.from_labels(['04-NOV-25', '25-NOV-25', '11-NOV-25', '30-DEC-25', 'bad', '25-NOV-25'])
+    assert calendar.labels == ['04-NOV-25', '11-NOV-25', '25-NOV-25', '30-DEC-25']
+    assert calendar.nearest('monthly', today=date(2025, 11, 1)) == '25-NOV-25'
+    assert calendar.upcoming(3, 'weekly', today=date(2025, 11, 5)) == ['11-NOV-25', '25-NOV-25', '30-DEC-25']
@@ -0,0 +1,74 @@
+"""
+Tests for running broker coroutines from synchronous code (utils/httpx_client.py run_async)
+"""
+
+import sys
+import os
+import subprocess
+import textwrap
+import time
+import asyncio
+
+import pytest
+
+# Add parent directory to path to import utils modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.httpx_client import run_async, run_concurrently
+
+async def _sleep_and_return(value, delay=0.05):
+    await asyncio.sleep(delay)
+    return value
+
+async def _fail():
+    raise ValueError('broker error')
+
+def test_run_concurrently_keeps_order_and_returns_failures():
+    """Results come back in input order; a failing call is returned, not raised"""
+    start = time.monotonic()
+    results = run_concurrently([_sleep_and_return(1), _fail(), _sleep_and_return(3)])
+    assert results[0] == 1 and results[2] == 3
+    assert isinstance(results[1], ValueError)
+    # The calls overlap instead of running one after another
+    assert time.monotonic() - start < 0.5
+
+def test_run_async_timeout_raises():
+    """A coroutine slower than the timeout raises TimeoutError"""
+    with pytest.raises(TimeoutError):
+        run_async(_sleep_and_return(1, delay=2), timeout=0.1)
+
+def test_run_concurrently_under_eventlet():
+    """
+    Greenthreads of a monkey-patched eventlet worker (the production gunicorn
+    worker) get their results back without waiting for the timeout or hanging
+    """
+    pytest.importorskip('eventlet')
+    script = textwrap.dedent(f"""
+        import eventlet
+        eventlet.monkey_patch()
+        import sys, time, asyncio
+        sys.path.insert(0, {ROOT!r})
+        from utils.httpx_client import run_concurrently
+
+        async def call(i):
+            await asyncio.sleep(0.05)
+            return i
+
+        def worker(n):
+            return run_concurrently([call(n), call(n + 1)], timeout=5)
+
+        start = time.monotonic()
+        pool = eventlet.GreenPool()
+        results = list(pool.imap(worker, range(4)))
+        assert results == [[n, n + 1] for n in range(4)], results
+        # Without a timeout the call must still return
+        assert run_concurrently([call(7)]) == [7]
+        print(f"elapsed={{time.monotonic() - start:.2f}}")
+    """)
+    completed = subprocess.run(
+        [sys.executable, '-c', script], capture_output=True, text=True, timeout=30
+    )
+    assert completed.returncode == 0, completed.stderr
+    elapsed = float(completed.stdout.strip().rsplit('elapsed=', 1)[1])
+    assert elapsed < 2
@@ -0,0 +1,55 @@
+"""
+Tests for the vectorized master contract normalization (database/master_contract_normalize.py)
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from database.master_contract_normalize import ContractMapping, normalize_contract, format_expiry, format_strike
+
+MAPPING = ContractMapping(
+    columns={'exch_seg': 'exchange'},
+    expiry_format='%d%b%Y',
+    strike_divisor=100,
+    tick_size_divisor=100,
+    extra_strike_divisors={('OPTCUR', 'CDS'): 100000},
+    exchange_overrides={('AMXIDX', 'NSE'): 'NSE_INDEX'},
+    symbol_suffixes='-EQ|-BE',
+    futures={'MCX': ('FUTCOM',)},
+    options={'CDS': ('OPTCUR',), 'BFO': ('OPTIDX',)},
+)
+
+def _raw():
+    return pd.DataFrame.from_records([
+        {'token': '3045', 'symbol': 'SBIN-EQ', 'name': 'SBIN', 'expiry': '', 'strike': '-1', 'lotsize': '1',
+         'instrumenttype': '', 'exch_seg': 'NSE', 'tick_size': '5'},
+        {'token': '1', 'symbol': 'Nifty 50', 'name': 'NIFTY', 'expiry': '', 'strike': '0', 'lotsize': '1',
+         'instrumenttype': 'AMXIDX', 'exch_seg': 'NSE', 'tick_size': '5'},
+        {'token': '2', 'symbol': 'GOLD25DECFUT', 'name': 'GOLD', 'expiry': '05DEC2025', 'strike': '-1', 'lotsize': '1',
+         'instrumenttype': 'FUTCOM', 'exch_seg': 'MCX', 'tick_size': '100'},
+        {'token': '3', 'symbol': 'USDINR25OCT8825CE', 'name': 'USDINR', 'expiry': '29OCT2025', 'strike': '882500000',
+         'lotsize': '1', 'instrumenttype': 'OPTCUR', 'exch_seg': 'CDS', 'tick_size': '0.25'},
+        {'token': '4', 'symbol': 'SENSEX25OCT80000PE', 'name': 'SENSEX', 'expiry': '30OCT2025', 'strike': '8000000',
+         'lotsize': '20', 'instrumenttype': 'OPTIDX', 'exch_seg': 'BFO', 'tick_size': '5'},
+    ])
+
+def test_symbols_expiry_and_prices():
+    """OpenAlgo symbols per instrument class; broker symbol and exchange are preserved"""
+    df = normalize_contract(_raw(), MAPPING)
+    assert list(df['symbol']) == ['SBIN', 'NIFTY', 'GOLD05DEC25FUT', 'USDINR29OCT2588.25CE', 'SENSEX30OCT2580000PE']
+    assert list(df['brsymbol'])[:2] == ['SBIN-EQ', 'Nifty 50']
+    assert list(df['exchange'])[:2] == ['NSE', 'NSE_INDEX']
+    assert list(df['brexchange'])[:2] == ['NSE', 'NSE']
+    assert list(df['expiry']) == ['', '', '05-DEC-25', '29-OCT-25', '30-OCT-25']
+    assert list(df['strike'])[3:] == [88.25, 80000.0]
+    assert list(df['tick_size'])[:2] == [0.05, 0.05]
+
+def test_helpers():
+    expiry = format_expiry(pd.Series(['28OCT2025', 'bad', None]), '%d%b%Y')
+    assert list(expiry[:2]) == ['28-OCT-25', 'BAD'] and pd.isna(expiry[2])
+    assert list(format_strike(pd.Series([25000.0, 20.05, 82.5]))) == ['25000', '20.05', '82.5']
+    assert list(format_strike(pd.Series([25000.0, 20.05, 82.5]), legacy=True)) == ['25000', '205', '82.5']
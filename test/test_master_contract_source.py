@@ -0,0 +1,109 @@
+"""
+Tests for conditional master contract downloads (database/master_contract_source_db.py)
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set a dummy env var for db before other imports
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+
+import hashlib
+import httpx
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+import utils.httpx_client
+import database.master_contract_source_db as source_db
+import database.master_contract_segments as master_contract_segments
+from database.master_contract_source_db import SourceFingerprint, take_unchanged_contract
+from database.master_contract_segments import Segment, refresh_segments
+from database.master_contract_stream import download_if_changed
+from database.symbol import SymToken
+
+BODY = b'[{"token": "3045"}]'
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    SymToken.__table__.create(engine)
+    source_db.Base.metadata.create_all(engine)
+    monkeypatch.setattr(source_db, 'SessionLocal', sessionmaker(bind=engine))
+    return engine
+
+def _server(monkeypatch, requests):
+    """Serve BODY with an ETag, answering 304 to a matching If-None-Match"""
+    def handler(request):
+        requests.append(request)
+        if request.headers.get('If-None-Match') == '"v1"':
+            return httpx.Response(304, headers={'ETag': '"v1"'})
+        return httpx.Response(200, content=BODY, headers={'ETag': '"v1"', 'Last-Modified': 'Fri, 16 Oct 2026 03:00:00 GMT'})
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(utils.httpx_client, 'get_httpx_client', lambda: client)
+
+def test_download_if_changed(monkeypatch):
+    """304 and an identical body both skip the download's processing"""
+    requests = []
+    _server(monkeypatch, requests)
+    fingerprint, body = download_if_changed('https://example.com/contract.json')
+    with body:
+        assert body.read() == BODY
+    assert fingerprint == SourceFingerprint('"v1"', 'Fri, 16 Oct 2026 03:00:00 GMT', hashlib.sha256(BODY).hexdigest())
+
+    assert download_if_changed('https://example.com/contract.json', fingerprint) == (fingerprint, None)
+    assert requests[-1].headers['If-Modified-Since'] == fingerprint.last_modified
+    # No ETag match, but the content is the same
+    same = SourceFingerprint(content_hash=fingerprint.content_hash)
+    assert download_if_changed('https://example.com/contract.json', same)[1] is None
+
+def test_refresh_segments_skips_unchanged_contract(engine, monkeypatch):
+    contents = {'NSE': b'nse-1', 'NFO': b'nfo-1'}
+    loads = []
+
+    def download(segment, previous=None):
+        etag = hashlib.sha256(contents[segment.name]).hexdigest()[:8]
+        if previous is not None and previous.etag == etag:
+            return previous, None
+        return SourceFingerprint(etag, None, etag), contents[segment.name]
+
+    def load(frames, broker):
+        loads.append({name: list(df['body']) for name, df in frames.items()})
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM symtoken"))
+            conn.execute(SymToken.__table__.insert(), [{'symbol': name, 'brsymbol': name} for name in frames])
+
+    monkeypatch.setattr(master_contract_segments, '_download_segment', download)
+    monkeypatch.setattr(master_contract_segments, 'load_segments', load)
+    parse = lambda body: pd.DataFrame({'body': [body.read()]})
+    segments = [Segment('NSE', 'url', parse), Segment('NFO', 'url', parse)]
+
+    assert refresh_segments(segments, 'fyers') is True
+    assert refresh_segments(segments, 'fyers') is False
+    assert take_unchanged_contract('fyers') and not take_unchanged_contract('fyers')
+    assert len(loads) == 1
+
+    # One segment changed: the whole contract is loaded, the unchanged segment downloaded again
+    contents['NFO'] = b'nfo-2'
+    assert refresh_segments(segments, 'fyers') is True
+    assert loads[-1] == {'NSE': [b'nse-1'], 'NFO': [b'nfo-2']}
+
+    # Fingerprints are not trusted once symtoken no longer holds the rows they describe
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM symtoken"))
+    assert source_db.get_fingerprints('fyers') == {}
+    assert refresh_segments(segments, 'fyers') is True
+
+def test_other_broker_download_clears_fingerprints(engine):
+    """angel -> zerodha -> angel must not reuse zerodha's symtoken with angel's fingerprints"""
+    with engine.begin() as conn:
+        conn.execute(SymToken.__table__.insert(), [{'symbol': 'SBIN', 'brsymbol': 'SBIN-EQ'}])
+    source_db.save_fingerprints('angel', {'ALL': SourceFingerprint('"v1"', None, 'abc')})
+    source_db.clear_fingerprints(keep_broker='angel')
+    assert source_db.get_fingerprints('angel') == {'ALL': SourceFingerprint('"v1"', None, 'abc')}
+    # zerodha's download starts; its load keeps the same row count
+    source_db.clear_fingerprints(keep_broker='zerodha')
+    assert source_db.get_fingerprints('angel') == {}
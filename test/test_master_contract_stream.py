@@ -0,0 +1,43 @@
+"""
+Tests for the streaming master contract parsers (database/master_contract_stream.py)
+"""
+
+import sys
+import os
+import gzip
+import json
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set a dummy env var for db before other imports
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+
+import pytest
+from database.master_contract_stream import iter_json_array, iter_csv_records, iter_gunzip, iter_batches
+
+def _chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def test_json_array_across_chunk_boundaries():
+    """Elements, numbers and multi-byte characters split over chunks parse as a whole"""
+    records = [{'token': str(i), 'symbol': f'SBIN{i}', 'name': 'Société'} for i in range(50)] + [123, 4.5]
+    data = json.dumps(records).encode('utf-8')
+    for size in (1, 7, 64, len(data)):
+        assert list(iter_json_array(_chunks(data, size))) == records
+    assert list(iter_json_array(iter_gunzip(_chunks(gzip.compress(data), 5)))) == records
+    assert list(iter_json_array([b' [ ] '])) == []
+
+def test_json_array_errors():
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'{"a": 1}']))
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'[{"a": 1}, {"b"']))
+
+def test_csv_records_and_batches():
+    """CSV lines (including quoted newlines) split over chunks"""
+    data = b'token,symbol\r\n1,"SBIN\nEQ"\r\n2,INFY\r\n3,TCS'
+    assert list(iter_csv_records(_chunks(data, 3))) == [
+        {'token': '1', 'symbol': 'SBIN\nEQ'}, {'token': '2', 'symbol': 'INFY'}, {'token': '3', 'symbol': 'TCS'}
+    ]
+    assert list(iter_batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
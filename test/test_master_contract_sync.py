@@ -0,0 +1,55 @@
+"""
+Tests for the incremental master contract refresh (database/master_contract_sync.py)
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set a dummy env var for db before other imports
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+
+from database.master_contract_sync import diff_contract, normalize_row, row_digest, row_key
+from database.token_db_enhanced import SymbolTable
+
+ROWS = [
+    ('SBIN', 'SBIN-EQ', 'SBI', 'NSE', 'NSE', '3045', '', None, 1, 'EQ', 0.05),
+    ('SBIN', 'SBIN', 'SBI', 'BSE', 'BSE', '500112', '', None, 1, 'EQ', 0.05),
+    ('NIFTY28OCT2525000CE', 'NIFTY28OCT2525000CE', 'NIFTY', 'NFO', 'NFO', '43210', '28-OCT-25', 25000.0, 75, 'OPTIDX', 0.05),
+]
+
+def _current():
+    return {row_key(values): (row_id, row_digest(values)) for row_id, values in enumerate(ROWS, start=1)}
+
+def test_diff_by_token_and_exchange():
+    """Inserted, changed, removed and unchanged rows; tokens are normalized to strings"""
+    incoming = [
+        ('SBIN', 'SBIN-EQ', 'SBI', 'NSE', 'NSE', 3045, '', float('nan'), 1, 'EQ', 0.05),
+        ('NIFTY28OCT2525000CE', 'NIFTY28OCT2525000CE', 'NIFTY', 'NFO', 'NFO', '43210', '28-OCT-25', 25000, 65.0, 'OPTIDX', 0.05),
+        ('NIFTY04NOV2525000CE', 'NIFTY04NOV2525000CE', 'NIFTY', 'NFO', 'NFO', '43300', '04-NOV-25', 25000.0, 65, 'OPTIDX', 0.05),
+        ('SBIN', 'SBIN-EQ', 'SBI', 'NSE', 'NSE', '3045', '', None, 1, 'EQ', 0.05),
+    ]
+    diff = diff_contract(_current(), incoming)
+    assert diff.unchanged == 1 and diff.duplicates == 1
+    assert diff.changed == [(3, normalize_row(incoming[1]))]
+    assert diff.inserted == [normalize_row(incoming[2])]
+    assert diff.removed == [(2, ('500112', 'BSE'))]
+    assert diff_contract(_current(), ROWS).empty
+
+def test_patched_table_matches_rebuilt_table():
+    """Patching the cache table gives the same rows as rebuilding it after the diff"""
+    table = SymbolTable()
+    for values in ROWS:
+        table.append(*values)
+    table.finalize()
+
+    changed = ROWS[2][:8] + (65,) + ROWS[2][9:]
+    inserted = ('INFY', 'INFY-EQ', 'INFOSYS', 'NSE', 'NSE', '1594', '', None, 1, 'EQ', 0.05)
+    patched = table.patched({('500112', 'BSE')}, {row_key(changed): changed, row_key(inserted): inserted})
+
+    assert [patched.row_values(row) for row in range(len(patched))] == [ROWS[0], changed, inserted]
+    assert patched.find_token('500112', 'BSE') is None
+    assert patched.get_lotsize(patched.find_symbol('NIFTY28OCT2525000CE', 'NFO')) == 65
+    assert patched.derivatives_index.get_calendar('NIFTY', 'NFO', 'options').labels == ['28-OCT-25']
@@ -0,0 +1,73 @@
+"""
+Tests for the mergeable latency quantile sketch (utils/quantile_sketch.py)
+"""
+
+import sys
+import os
+import random
+
+# Add parent directory to path to import utils modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.quantile_sketch import QuantileSketch
+
+def _exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+def test_quantiles_within_relative_error():
+    """Every quantile should be within the configured relative accuracy"""
+    rng = random.Random(42)
+    values = [rng.lognormvariate(4, 0.8) for _ in range(20000)]
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    assert sketch.count == len(values)
+    for q in (0.5, 0.9, 0.99, 0.999):
+        exact = _exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - exact) / exact <= 0.011
+
+def test_merge_matches_single_sketch():
+    """Merging per-window sketches gives the same answer as one sketch over all values"""
+    rng = random.Random(7)
+    values = [rng.uniform(1, 500) for _ in range(5000)]
+    combined = QuantileSketch()
+    parts = [QuantileSketch() for _ in range(5)]
+    for index, value in enumerate(values):
+        combined.add(value)
+        parts[index % 5].add(value)
+
+    merged = QuantileSketch()
+    for part in parts:
+        merged.merge(part)
+
+    assert merged.count == combined.count
+    assert merged.quantiles((0.5, 0.99)) == combined.quantiles((0.5, 0.99))
+    assert merged.min == combined.min and merged.max == combined.max
+
+def test_serialization_roundtrip():
+    """Sketches survive to_bytes/from_bytes unchanged"""
+    sketch = QuantileSketch()
+    for value in (0, 0.5, 3.2, 15, 15, 250.7, 1200):
+        sketch.add(value)
+
+    restored = QuantileSketch.from_bytes(sketch.to_bytes())
+    assert restored.count == sketch.count
+    assert restored.zero_count == sketch.zero_count
+    assert restored.quantiles((0.1, 0.5, 0.9)) == sketch.quantiles((0.1, 0.5, 0.9))
+    assert restored.mean == sketch.mean
+
+def test_empty_sketch():
+    """An empty sketch answers zero and round-trips"""
+    sketch = QuantileSketch.from_bytes(None)
+    assert sketch.count == 0
+    assert sketch.quantile(0.99) == 0.0
+    assert QuantileSketch.from_bytes(sketch.to_bytes()).count == 0
+
+if __name__ == "__main__":
+    test_quantiles_within_relative_error()
+    test_merge_matches_single_sketch()
+    test_serialization_roundtrip()
+    test_empty_sketch()
+    print("All quantile sketch tests passed")
@@ -0,0 +1,60 @@
+"""
+Tests for the broker rate governor (utils/rate_governor.py)
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path to import utils modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.rate_governor import TokenBucket, RateGovernor, parse_rate_limit, rate_limited_squareoff_response
+
+def test_parse_rate_limit():
+    """Limit strings use the Flask limiter format"""
+    assert parse_rate_limit('10 per second') == (10, 1)
+    assert parse_rate_limit('100 per minute') == (100, 60)
+    assert parse_rate_limit('3/second') == (3, 1)
+    assert parse_rate_limit('"5 per seconds"') == (5, 1)
+
+def test_bucket_paces_after_burst():
+    """A full bucket serves a burst, then refills at the configured rate"""
+    bucket = TokenBucket(5, 0.25)  # 20 per second
+    start = time.monotonic()
+    for _ in range(10):
+        assert bucket.acquire() >= 0
+    elapsed = time.monotonic() - start
+    # 5 immediate, 5 more at 50 ms each
+    assert 0.2 <= elapsed < 0.5
+
+def test_timeout_rejects_without_consuming():
+    """A wait longer than the timeout is refused and leaves the bucket untouched"""
+    bucket = TokenBucket(1, 10)
+    assert bucket.acquire() == 0
+    assert bucket.acquire(timeout=0.01) == -1
+    assert bucket._tokens < 0.01
+
+def test_governor_keys_by_broker_and_class(monkeypatch):
+    """Per-broker overrides apply to one broker and endpoint class only"""
+    monkeypatch.setenv('TESTBROKER_HISTORY_RATE_LIMIT', '2 per minute')
+    governor = RateGovernor(max_wait=0.01)
+    assert governor.acquire('testbroker', 'history')
+    assert governor.acquire('testbroker', 'history')
+    assert not governor.acquire('testbroker', 'history')
+    assert governor.acquire('testbroker', 'orders')
+    assert governor.acquire('otherbroker', 'history')
+
+def test_squareoff_response_names_open_positions():
+    """A rate-limited close-all reports every position it left open"""
+    body = rate_limited_squareoff_response(['SBIN', 'INFY'])
+    assert body['status'] == 'error'
+    assert body['failed_positions'] == ['SBIN', 'INFY']
+    assert 'SBIN, INFY' in body['message']
+
+if __name__ == "__main__":
+    test_parse_rate_limit()
+    test_bucket_paces_after_burst()
+    test_timeout_rejects_without_consuming()
+    test_squareoff_response_names_open_positions()
+    print("All rate governor tests passed")
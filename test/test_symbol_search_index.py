@@ -0,0 +1,72 @@
+"""
+Tests for the symbol search index (database/symbol_search_index.py)
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.token_db_enhanced import SymbolTable
+
+def _table():
+    table = SymbolTable()
+    rows = [
+        ('SBINBEES', 'SBINBEES-EQ', 'SBI ETF', 'NSE', 'NSE', '1001', None, None, 1, 'EQ', 0.01),
+        ('SBIN', 'SBIN-EQ', 'STATE BANK OF INDIA', 'NSE', 'NSE', '3045', None, None, 1, 'EQ', 0.05),
+        ('SBIN', 'SBIN', 'STATE BANK OF INDIA', 'BSE', 'BSE', '500112', None, None, 1, 'EQ', 0.05),
+        ('SBICARD', 'SBICARD-EQ', 'SBI CARDS', 'NSE', 'NSE', '17971', None, None, 1, 'EQ', 0.05),
+        ('SBIN28OCT25800CE', 'SBIN25OCT800CE', 'SBIN', 'NFO', 'NFO', '52001', '28-OCT-25', 800.0, 750, 'CE', 0.05),
+        ('NIFTY', 'Nifty 50', 'NIFTY', 'NSE_INDEX', 'NSE_INDEX', '99926000', None, None, 1, 'INDEX', 0.05),
+    ]
+    for row in rows:
+        table.append(*row)
+    table.finalize()
+    return table
+
+def _symbols(table, rows):
+    return [(table.symbol[row], table.exchange[row]) for row in rows]
+
+def test_ranking_exact_prefix_substring():
+    """Exact matches come first, then prefix matches in key order, then substrings"""
+    table = _table()
+    rows = table.search_index.search('sbin', limit=None)
+    assert _symbols(table, rows) == [
+        ('SBIN', 'NSE'), ('SBIN', 'BSE'), ('SBIN28OCT25800CE', 'NFO'), ('SBINBEES', 'NSE')
+    ]
+    # Names and broker symbols are searchable too
+    assert _symbols(table, table.search_index.search('50')) == [('NIFTY', 'NSE_INDEX')]
+    assert _symbols(table, table.search_index.search('CARDS')) == [('SBICARD', 'NSE')]
+
+def test_filters_and_limit():
+    """Exchange and instrument type filters apply before the limit"""
+    table = _table()
+    assert _symbols(table, table.search_index.search('SBI', exchange='BSE')) == [('SBIN', 'BSE')]
+    assert _symbols(table, table.search_index.search('SBI', instrumenttype='CE')) == [('SBIN28OCT25800CE', 'NFO')]
+    assert table.search_index.search('SBI', exchange='MCX') == []
+    assert len(table.search_index.search('SBI', limit=2)) == 2
+
+def test_short_and_missing_queries():
+    """One and two character queries and unknown n-grams"""
+    table = _table()
+    assert ('SBICARD', 'NSE') in _symbols(table, table.search_index.search('RD'))
+    assert ('NIFTY', 'NSE_INDEX') in _symbols(table, table.search_index.search('Y'))
+    assert table.search_index.search('QQQ') == []
+
+def test_match_terms_requires_every_term():
+    """Multi-term search keeps the enhanced_search_symbols semantics"""
+    table = _table()
+    index = table.search_index
+    assert _symbols(table, index.search_terms('sbin 800 ce')) == [('SBIN28OCT25800CE', 'NFO')]
+    assert _symbols(table, index.search_terms('SBIN 28-OCT-25')) == [('SBIN28OCT25800CE', 'NFO')]
+    # Terms match prefixes (not substrings) of symbol, brsymbol, name and token
+    assert _symbols(table, index.search_terms('5001')) == [('SBIN', 'BSE')]
+    assert index.search_terms('BANK') == []
+    assert _symbols(table, index.search_terms('sbi eq', exchange='NSE', offset=1, limit=2)) == [
+        ('SBIN', 'NSE'), ('SBICARD', 'NSE')
+    ]
+    # Without a limit (legacy callers) every match comes back in table order
+    assert _symbols(table, index.search_terms('sbi eq')) == [
+        ('SBINBEES', 'NSE'), ('SBIN', 'NSE'), ('SBIN', 'BSE'), ('SBICARD', 'NSE')
+    ]
@@ -0,0 +1,55 @@
+"""
+Tests for the memory-mapped symbol cache snapshot (database/symbol_snapshot.py)
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database.symbol_snapshot as symbol_snapshot
+from database.token_db_enhanced import SymbolTable
+
+def _table():
+    table = SymbolTable()
+    table.append('SBIN', 'SBIN-EQ', 'SBI', 'NSE', 'NSE', '3045', None, None, None, 'EQ', None)
+    table.append('SBIN', 'SBIN', 'SBI', 'BSE', 'BSE', '500112', None, None, 1, 'EQ', 0.05)
+    table.append('M&M', 'M&M-EQ', 'MAHINDRA & MAHINDRA', 'NSE', 'NSE', '2031', None, None, 1, 'EQ', 0.05)
+    table.append('NIFTY28OCT2525000CE', 'NIFTY25OCT25000CE', 'NIFTY', 'NFO', 'NFO', '43210',
+                 '28-OCT-25', 25000.0, 75, 'CE', 0.05)
+    table.finalize()
+    return table
+
+def test_snapshot_round_trip(tmp_path, monkeypatch):
+    """A mapped snapshot answers the same lookups as the table it was written from"""
+    monkeypatch.setattr(symbol_snapshot, 'SNAPSHOT_DIR', str(tmp_path))
+    table = _table()
+    name = symbol_snapshot.write_snapshot(table, 'angel')
+    assert symbol_snapshot.read_pointer() == name
+
+    mapped = symbol_snapshot.open_snapshot()
+    assert mapped.broker == 'angel' and len(mapped) == len(table)
+    for row in range(len(table)):
+        assert mapped.row_data(row) == table.row_data(row)
+        assert mapped.find_symbol(table.symbol[row], table.exchange[row]) == row
+        assert mapped.find_brsymbol(table.brsymbol[row], table.exchange[row]) == row
+        assert mapped.find_token(table.token[row], table.exchange[row]) == row
+        assert mapped.find_token_any(table.token[row]) == row
+    assert mapped.find_symbol('SBIN', 'NFO') is None
+    assert mapped.find_symbol('SBIN', None) is None
+    assert mapped.find_token_any('999') is None
+    assert mapped.search_index.search('sbin', limit=None) == table.search_index.search('sbin', limit=None)
+
+def test_new_version_replaces_old(tmp_path, monkeypatch):
+    """Publishing a new version moves the pointer and removes the old file"""
+    monkeypatch.setattr(symbol_snapshot, 'SNAPSHOT_DIR', str(tmp_path))
+    first = symbol_snapshot.write_snapshot(_table(), 'angel')
+    second = symbol_snapshot.write_snapshot(_table(), 'angel')
+    assert symbol_snapshot.snapshot_version(second) > symbol_snapshot.snapshot_version(first)
+    assert symbol_snapshot.read_pointer() == second
+    assert not (tmp_path / first).exists()
+
+    symbol_snapshot.remove_snapshot()
+    assert symbol_snapshot.read_pointer() is None
+    assert symbol_snapshot.open_snapshot() is None
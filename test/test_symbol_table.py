@@ -0,0 +1,48 @@
+"""
+Tests for the columnar symbol table behind the broker symbol cache (database/token_db_enhanced.py)
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.token_db_enhanced import SymbolTable, SymbolData
+
+def _table():
+    table = SymbolTable()
+    table.append('SBIN', 'SBIN-EQ', 'SBI', 'NSE', 'NSE', '3045', None, None, None, 'EQ', None)
+    table.append('SBIN', 'SBIN', 'SBI', 'BSE', 'BSE', '500112', None, None, 1, 'EQ', 0.05)
+    table.append('NIFTY28OCT2525000CE', 'NIFTY25OCT25000CE', 'NIFTY', 'NFO', 'NFO', '43210',
+                 '28-OCT-25', 25000.0, 75, 'CE', 0.05)
+    table.finalize()
+    return table
+
+def test_lookups_by_key_and_exchange():
+    """Each index resolves to the same row id"""
+    table = _table()
+    row = table.find_symbol('SBIN', 'BSE')
+    assert row == 1
+    assert table.find_brsymbol('SBIN', 'BSE') == row
+    assert table.find_token('500112', 'BSE') == row
+    assert table.find_token_any('500112') == row
+    assert table.find_symbol('SBIN', 'NFO') is None
+    assert table.find_token('3045', 'BSE') is None
+
+def test_row_data_round_trips_nulls():
+    """None values survive the typed numeric columns"""
+    table = _table()
+    assert table.row_data(0) == SymbolData(
+        symbol='SBIN', brsymbol='SBIN-EQ', name='SBI', exchange='NSE', brexchange='NSE',
+        token='3045', instrumenttype='EQ'
+    )
+    option = table.row_data(2)
+    assert (option.strike, option.lotsize, option.tick_size, option.expiry) == (25000.0, 75, 0.05, '28-OCT-25')
+
+def test_repeated_strings_are_stored_once():
+    """Categorical columns keep one copy per distinct value"""
+    table = _table()
+    assert table.name.values.count('SBI') == 1
+    assert table.name[0] is table.name[1]
+    assert table.memory_usage_bytes() > 0
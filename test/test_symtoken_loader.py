@@ -0,0 +1,57 @@
+"""
+Tests for the staging-table bulk loader of symtoken (database/symtoken_loader.py)
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set a dummy env var for db before other imports
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+
+import pytest
+from sqlalchemy import create_engine, text
+import database.symtoken_loader as symtoken_loader
+from database.master_contract_sync import replace_contract
+from database.symbol import SymToken
+
+ROWS = [
+    ('SBIN', 'SBIN-EQ', 'SBI', 'NSE', 'NSE', '3045', '', None, 1, 'EQ', 0.05),
+    ('NIFTY28OCT2525000CE', 'NIFTY28OCT2525000CE', 'NIFTY', 'NFO', 'NFO', '43210', '28-OCT-25', 25000.0, 75, 'OPTIDX', 0.05),
+]
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'symtoken.db'}")
+    SymToken.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(SymToken.__table__.insert(), [{'symbol': 'OLD', 'brsymbol': 'OLD', 'token': '1'}])
+    monkeypatch.setattr(symtoken_loader, 'engine', engine)
+    return engine
+
+def test_load_replaces_table_and_rebuilds_indexes(engine):
+    assert symtoken_loader.bulk_load_symtokens(iter(ROWS), batch_size=1) == 2
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, symbol, expiry, strike, lotsize FROM symtoken ORDER BY id")).all()
+        indexes = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'symtoken'"))}
+        tables = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+    assert rows == [(1, 'SBIN', '', None, 1), (2, 'NIFTY28OCT2525000CE', '28-OCT-25', 25000.0, 75)]
+    assert {index.name for index in SymToken.__table__.indexes} <= indexes
+    assert symtoken_loader.STAGING_TABLE not in tables
+
+def test_empty_or_failed_load_keeps_old_table(engine):
+    with pytest.raises(ValueError):
+        symtoken_loader.bulk_load_symtokens(iter([]))
+    with pytest.raises(Exception):
+        symtoken_loader.bulk_load_symtokens(iter([ROWS[0], ('bad',)]))
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT symbol FROM symtoken")).scalars().all() == ['OLD']
+
+def test_replace_contract_keeps_first_duplicate(engine):
+    """A full reload drops duplicated (token, brexchange) keys like the incremental diff"""
+    duplicate = ('SBIN-OLD', 'SBIN-BE', 'SBI', 'NSE', 'NSE', 3045, '', None, 1, 'EQ', 0.05)
+    assert replace_contract(iter([ROWS[0], duplicate, ROWS[1]])) == 2
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT symbol FROM symtoken ORDER BY id")).scalars().all() == ['SBIN', 'NIFTY28OCT2525000CE']
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the api_key_fingerprint column to the api_keys table.
+
+The fingerprint is a peppered HMAC-SHA256 of the API key. It is indexed so that
+verify_api_key can find the single candidate row instead of running Argon2
+against every stored hash. Existing rows are backfilled by decrypting the
+stored (Fernet encrypted) API key.
+
+Usage:
+    cd upgrade
+    python migrate_api_key_fingerprint.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text, inspect
+from dotenv import load_dotenv
+
+# Load environment from parent directory
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+# Import logger after environment is loaded
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_NAME = 'ix_api_keys_api_key_fingerprint'
+
+def migrate_api_keys_table():
+    """Add and backfill the api_key_fingerprint column if it doesn't exist"""
+
+    # Get database URL from environment
+    DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///db/openalgo.db')
+
+    # Adjust path for SQLite if relative (since we're in upgrade folder)
+    if DATABASE_URL.startswith('sqlite:///') and not DATABASE_URL.startswith('sqlite:////'):
+        db_path = DATABASE_URL.replace('sqlite:///', '')
+        parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        full_db_path = os.path.join(parent_dir, db_path)
+        DATABASE_URL = f'sqlite:///{full_db_path}'
+        logger.info(f"Using database: {full_db_path}")
+
+    try:
+        engine = create_engine(DATABASE_URL)
+        inspector = inspect(engine)
+
+        if 'api_keys' not in inspector.get_table_names():
+            logger.info("api_keys table doesn't exist. It will be created on first run.")
+            return True
+
+        existing_columns = [col['name'] for col in inspector.get_columns('api_keys')]
+        existing_indexes = [idx['name'] for idx in inspector.get_indexes('api_keys')]
+
+        with engine.connect() as conn:
+            if 'api_key_fingerprint' not in existing_columns:
+                conn.execute(text("ALTER TABLE api_keys ADD COLUMN api_key_fingerprint VARCHAR(64)"))
+                conn.commit()
+                logger.info("✅ Added column: api_key_fingerprint")
+            else:
+                logger.info("✓ Column already exists: api_key_fingerprint")
+
+            if INDEX_NAME not in existing_indexes:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON api_keys (api_key_fingerprint)"))
+                conn.commit()
+                logger.info(f"✅ Created index: {INDEX_NAME}")
+            else:
+                logger.info(f"✓ Index already exists: {INDEX_NAME}")
+
+            # Backfill fingerprints from the encrypted keys (same pepper as the app)
+            from database.auth_db import decrypt_token, _api_key_digest
+
+            rows = conn.execute(text(
+                "SELECT id, api_key_encrypted FROM api_keys WHERE api_key_fingerprint IS NULL"
+            )).fetchall()
+
+            backfilled = 0
+            for row_id, encrypted_key in rows:
+                api_key = decrypt_token(encrypted_key)
+                if not api_key:
+                    logger.warning(f"Could not decrypt API key for row {row_id}; it will be fingerprinted on first use")
+                    continue
+                conn.execute(
+                    text("UPDATE api_keys SET api_key_fingerprint = :fp WHERE id = :id"),
+                    {'fp': _api_key_digest(api_key), 'id': row_id}
+                )
+                backfilled += 1
+            conn.commit()
+
+        logger.info("\n📊 Migration Summary:")
+        logger.info(f"   - Rows without fingerprint: {len(rows)}")
+        logger.info(f"   - Rows backfilled: {backfilled}")
+        logger.info("\n✅ API key fingerprint migration completed successfully!")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Error during migration: {e}")
+        return False
+
+def main():
+    """Main function to run the migration"""
+    logger.info("=" * 60)
+    logger.info("OpenAlgo API Key Fingerprint Migration Script")
+    logger.info("=" * 60)
+
+    success = migrate_api_keys_table()
+
+    logger.info("-" * 60)
+    if success:
+        logger.info("Migration process completed! Restart your OpenAlgo application.")
+        return 0
+    else:
+        logger.error("Migration failed! Please check the error messages above.")
+        logger.error("Verify your DATABASE_URL and API_KEY_PEPPER in the .env file")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
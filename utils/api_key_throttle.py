@@ -0,0 +1,174 @@
+"""
+In-memory throttling for invalid API key attempts.
+
+Invalid keys are counted in a per-IP sliding window in process memory. A
+repeated bad key is answered without Argon2 or a database round-trip; an IP
+over the limit only gets the indexed fingerprint lookup, so valid keys from a
+shared (NAT) address still work. Every invalid attempt is still counted,
+including repeats of a rejected key and attempts from a throttled IP, so a
+brute-forcer keeps moving towards a ban. Aggregated counts are flushed to the
+traffic DB periodically by a background thread, and the flush escalates to
+IPBan.ban_ip when the configured daily threshold (Security settings -> API
+threshold) is crossed.
+"""
+
+import os
+import threading
+import time
+import atexit
+from collections import deque
+from cachetools import TTLCache
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# IPs that are never throttled or banned (same rule as IPBan.ban_ip)
+LOCAL_IPS = {'127.0.0.1', '::1', 'localhost'}
+
+class InvalidAPIKeyThrottle:
+    """Sliding-window counter of invalid API key attempts per IP and key hash"""
+
+    def __init__(self, window_seconds=60, max_attempts=10, flush_interval=10.0, auto_ban=True, max_ips=10000):
+        self.window_seconds = window_seconds
+        self.max_attempts = max_attempts
+        self.flush_interval = flush_interval
+        self.auto_ban = auto_ban
+
+        self._lock = threading.Lock()
+        # ip -> deque of the latest attempt timestamps inside the window (only max_attempts
+        # are needed to decide throttling); entries expire one window after the IP's last
+        # attempt and the number of tracked IPs is capped
+        self._attempts = TTLCache(maxsize=max_ips, ttl=window_seconds)
+        # ip -> [attempt count, set of key hashes] not yet written to the traffic DB
+        self._pending = {}
+        # Recently rejected key hashes, so the same bad key skips Argon2 and the DB
+        self._rejected_keys = TTLCache(maxsize=4096, ttl=window_seconds * 5)
+
+        self._flush_thread = None
+        self._stop_event = threading.Event()
+
+    def _prune(self, timestamps, now):
+        cutoff = now - self.window_seconds
+        while timestamps and timestamps[0] < cutoff:
+            timestamps.popleft()
+
+    def is_rejected_key(self, api_key_hash):
+        """Return True if this key was rejected recently"""
+        with self._lock:
+            return bool(api_key_hash) and api_key_hash in self._rejected_keys
+
+    def is_throttled(self, ip_address):
+        """Return True if this IP has too many recent invalid attempts"""
+        if ip_address in LOCAL_IPS:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            timestamps = self._attempts.get(ip_address)
+            if not timestamps:
+                return False
+            self._prune(timestamps, now)
+            if not timestamps:
+                del self._attempts[ip_address]
+                return False
+            return len(timestamps) >= self.max_attempts
+
+    def record(self, ip_address, api_key_hash=None):
+        """Record an invalid attempt in memory; the traffic DB is updated on the next flush"""
+        if ip_address in LOCAL_IPS:
+            return
+        now = time.monotonic()
+        with self._lock:
+            timestamps = self._attempts.get(ip_address) or deque(maxlen=self.max_attempts)
+            timestamps.append(now)
+            self._prune(timestamps, now)
+            # Re-inserting restarts the entry's TTL
+            self._attempts[ip_address] = timestamps
+
+            pending = self._pending.setdefault(ip_address, [0, set()])
+            pending[0] += 1
+            if api_key_hash:
+                pending[1].add(api_key_hash)
+                self._rejected_keys[api_key_hash] = True
+
+        self._ensure_flush_thread()
+
+    def pending_count(self):
+        """Number of IPs with attempts not yet flushed to the traffic DB"""
+        return len(self._pending)
+
+    def forget_rejected_keys(self):
+        """Drop the rejected key cache (e.g. after an API key has been regenerated)"""
+        with self._lock:
+            self._rejected_keys.clear()
+
+    def flush(self):
+        """Write aggregated attempts to the traffic DB and escalate to IP bans"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        from database.traffic_db import InvalidAPIKeyTracker, IPBan, logs_session
+        from database.settings_db import get_security_settings
+
+        try:
+            security_settings = get_security_settings()
+            threshold_api = security_settings['api_threshold']
+            ban_duration_api = security_settings['api_ban_duration']
+
+            for ip_address, (attempts, key_hashes) in pending.items():
+                total_attempts = InvalidAPIKeyTracker.track_invalid_api_keys(
+                    ip_address, attempts, sorted(key_hashes)
+                )
+
+                if not self.auto_ban or ip_address in LOCAL_IPS:
+                    continue
+
+                if total_attempts >= threshold_api:
+                    banned = IPBan.ban_ip(
+                        ip_address=ip_address,
+                        reason=f"Exceeded invalid API key threshold: {total_attempts} attempts in 24 hours",
+                        duration_hours=ban_duration_api,
+                        created_by='api_key_detector'
+                    )
+                    # Only reset the tracker if the ban was successful
+                    if banned:
+                        InvalidAPIKeyTracker.clear_ip(ip_address)
+        except Exception as e:
+            logger.error(f"Error flushing invalid API key attempts: {e}")
+        finally:
+            logs_session.remove()
+
+        return len(pending)
+
+    def _ensure_flush_thread(self):
+        if self._flush_thread is not None and self._flush_thread.is_alive():
+            return
+        with self._lock:
+            if self._flush_thread is not None and self._flush_thread.is_alive():
+                return
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop, name='InvalidAPIKeyFlush', daemon=True
+            )
+            self._flush_thread.start()
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def shutdown(self):
+        """Stop the background flusher and write any pending attempts"""
+        self._stop_event.set()
+        self.flush()
+
+# Global throttle instance
+invalid_api_key_throttle = InvalidAPIKeyThrottle(
+    window_seconds=int(os.getenv('INVALID_API_KEY_WINDOW', '60')),
+    max_attempts=int(os.getenv('INVALID_API_KEY_LIMIT', '10')),
+    flush_interval=float(os.getenv('INVALID_API_KEY_FLUSH_INTERVAL', '10')),
+    auto_ban=os.getenv('INVALID_API_KEY_AUTO_BAN', 'TRUE').upper() == 'TRUE',
+    max_ips=int(os.getenv('INVALID_API_KEY_MAX_IPS', '10000'))
+)
+
+atexit.register(invalid_api_key_throttle.shutdown)
@@ -4,6 +4,7 @@ from threading import Thread
 from utils.session import get_session_expiry_time, set_session_login_time
 from database.auth_db import upsert_auth, get_feed_token as db_get_feed_token
 from database.master_contract_status_db import init_broker_status, update_status
+from utils.connection_warmup import warmup_broker_connections_async
 import importlib
 from utils.logging import get_logger
 
@@ -46,6 +47,11 @@ def async_master_contract_download(broker):
 
     # Use the dynamically imported module's master_contract_download function
     try:
+        # Every broker reloads symtoken, so another broker's stored download
+        # fingerprints no longer describe the table
+        from database.master_contract_source_db import clear_fingerprints
+        clear_fingerprints(keep_broker=broker)
+
         master_contract_status = master_contract_module.master_contract_download()
         
         # Most brokers return the socketio.emit result, we need to check completion
@@ -112,6 +118,8 @@ def handle_auth_success(auth_token, user_session_key, broker, feed_token=None, u
         init_broker_status(broker)
         thread = Thread(target=async_master_contract_download, args=(broker,))
         thread.start()
+        # Open order connections now so the first order doesn't pay TCP/TLS setup
+        warmup_broker_connections_async(broker)
         return redirect(url_for('dashboard_bp.dashboard'))
     else:
         logger.error(f"Failed to upsert auth token for user {user_session_key}")
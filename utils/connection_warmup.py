@@ -0,0 +1,161 @@
+"""
+Broker connection warmup.
+
+Opens TLS connections to the broker order endpoints through the shared httpx
+client (orders pool) so that the first order after login, and the first order
+of the trading day, does not pay DNS, TCP and TLS setup. Runs once after a
+successful broker login and on a weekday schedule before market open, then
+periodically during market hours to keep the pooled connections alive.
+"""
+
+import os
+import threading
+import importlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+import pytz
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+logging.getLogger('apscheduler.executors.default').setLevel(logging.WARNING)
+
+IST = pytz.timezone('Asia/Kolkata')
+
+WARMUP_ENABLED = os.getenv('BROKER_WARMUP_ENABLED', 'TRUE').upper() == 'TRUE'
+# Parallel connections opened per host (HTTP/2 multiplexes them onto one)
+WARMUP_CONNECTIONS = int(os.getenv('BROKER_WARMUP_CONNECTIONS', '2'))
+# Pre-market warmup times (IST, weekdays)
+WARMUP_TIMES = os.getenv('BROKER_WARMUP_TIMES', '09:00,09:14')
+# Keep-alive refresh interval during market hours in minutes (0 disables)
+KEEPALIVE_MINUTES = int(os.getenv('BROKER_KEEPALIVE_MINUTES', '2'))
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_warmup_urls(broker):
+    """Order endpoint base URLs to warm for a broker (BASE_URL of broker/<name>/api/order_api.py)"""
+    override = os.getenv(f'{broker.upper()}_WARMUP_URL')
+    if override:
+        return [url.strip() for url in override.split(',') if url.strip()]
+
+    try:
+        order_api = importlib.import_module(f'broker.{broker}.api.order_api')
+    except Exception as e:
+        logger.debug(f"Could not import the order API of {broker} for warmup: {e}")
+        return []
+    url = getattr(order_api, 'BASE_URL', None)
+    return [url] if url else []
+
+def _open_connection(client, url):
+    """Issue a lightweight request so the orders pool holds an established connection"""
+    try:
+        response = client.head(url, timeout=10.0, extensions={'traffic_class': 'orders'})
+        return response.http_version
+    except Exception as e:
+        logger.debug(f"Warmup request to {url} failed: {e}")
+        return None
+
+def warmup_broker_connections(broker, connections=None):
+    """Open keep-alive connections to a broker's order endpoints; returns the number established"""
+    if not WARMUP_ENABLED or not broker:
+        return 0
+
+    urls = get_warmup_urls(broker)
+    if not urls:
+        logger.debug(f"No warmup URL known for broker {broker}")
+        return 0
+
+    from utils.httpx_client import get_httpx_client
+    client = get_httpx_client()
+    connections = connections or WARMUP_CONNECTIONS
+
+    jobs = [url for url in urls for _ in range(connections)]
+    with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix='BrokerWarmup') as executor:
+        results = list(executor.map(lambda url: _open_connection(client, url), jobs))
+
+    established = sum(1 for result in results if result)
+    logger.info(f"Warmed {established}/{len(jobs)} connections for {broker} ({', '.join(urls)})")
+    return established
+
+def warmup_broker_connections_async(broker):
+    """Warm connections in a background thread (used right after login)"""
+    if not WARMUP_ENABLED:
+        return
+    threading.Thread(
+        target=warmup_broker_connections, args=(broker,), name='BrokerWarmup', daemon=True
+    ).start()
+
+def _active_brokers():
+    """Brokers with a non-revoked auth token"""
+    from database.auth_db import Auth, db_session
+    try:
+        rows = Auth.query.filter_by(is_revoked=False).with_entities(Auth.broker).distinct().all()
+        return [row[0] for row in rows if row[0]]
+    except Exception as e:
+        logger.error(f"Error loading active brokers for warmup: {e}")
+        return []
+    finally:
+        db_session.remove()
+
+def warmup_active_brokers(connections=None):
+    """Warm connections for every logged-in broker"""
+    return sum(warmup_broker_connections(broker, connections) for broker in _active_brokers())
+
+def start_warmup_scheduler():
+    """Schedule the pre-market warmup and market-hours keep-alive jobs (IST, weekdays)"""
+    global _scheduler
+
+    if not WARMUP_ENABLED:
+        return False, "Broker connection warmup disabled"
+
+    with _scheduler_lock:
+        if _scheduler is not None and _scheduler.running:
+            return True, "Warmup scheduler already running"
+
+        try:
+            scheduler = BackgroundScheduler(timezone=IST)
+
+            for time_str in WARMUP_TIMES.split(','):
+                hour, minute = map(int, time_str.strip().split(':'))
+                scheduler.add_job(
+                    func=warmup_active_brokers,
+                    trigger=CronTrigger(day_of_week='mon-fri', hour=hour, minute=minute, timezone=IST),
+                    id=f'broker_warmup_{hour:02d}{minute:02d}',
+                    name=f'Broker connection warmup {time_str.strip()}',
+                    replace_existing=True,
+                    misfire_grace_time=120
+                )
+
+            if KEEPALIVE_MINUTES > 0:
+                # One request per host keeps the idle pooled connection from expiring
+                scheduler.add_job(
+                    func=warmup_active_brokers,
+                    kwargs={'connections': 1},
+                    trigger=CronTrigger(
+                        day_of_week='mon-fri', hour='9-15', minute=f'*/{KEEPALIVE_MINUTES}', timezone=IST
+                    ),
+                    id='broker_keepalive',
+                    name='Broker connection keep-alive',
+                    replace_existing=True,
+                    coalesce=True,
+                    misfire_grace_time=30
+                )
+
+            scheduler.start()
+            _scheduler = scheduler
+            logger.info(f"Broker connection warmup scheduled at {WARMUP_TIMES} IST")
+            return True, "Warmup scheduler started"
+        except Exception as e:
+            logger.error(f"Failed to start broker warmup scheduler: {e}")
+            return False, str(e)
+
+def stop_warmup_scheduler():
+    """Stop the warmup scheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None and _scheduler.running:
+            _scheduler.shutdown(wait=False)
+        _scheduler = None
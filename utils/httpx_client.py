@@ -1,10 +1,41 @@
 """
 Shared httpx client module with connection pooling support for all broker APIs
 with automatic protocol negotiation (HTTP/2 when available, HTTP/1.1 fallback)
+
+Every request through the shared client is timed per phase (TCP connect, TLS
+handshake, time to first byte, total) using the httpcore trace extension, and
+the result is recorded per broker host in the metrics registry and the latency
+sketches.
+
+Connections are pooled separately per broker host and traffic class ("orders"
+or "data"), so a burst of history or quote downloads cannot take the
+connections order placement needs.
+
+An httpx.AsyncClient counterpart (one per event loop) lets multi-leg work run
+many broker calls concurrently; synchronous code submits coroutines to a
+shared background event loop with run_async().
 """
+import os
+import sys
+import asyncio
+import itertools
+import json
+import threading
+import time
+import weakref
 import httpx
 from typing import Optional
 from utils.logging import get_logger
+from utils.metrics import registry
+
+# The run_async event loop needs a real OS thread; under eventlet's monkey-patching
+# a plain threading.Thread is a greenthread and run_forever() would stall the hub.
+if 'eventlet' in sys.modules:
+    import eventlet
+    original_threading = eventlet.patcher.original('threading')
+else:
+    eventlet = None
+    original_threading = threading
 
 # Set up logging
 logger = get_logger(__name__)
@@ -12,6 +43,218 @@ logger = get_logger(__name__)
 # Global httpx client for connection pooling
 _httpx_client = None
 
+# Log the negotiated protocol for one request in every N (0 disables)
+HTTP_LOG_SAMPLE_EVERY = int(os.getenv('HTTP_LOG_SAMPLE_EVERY', '1000'))
+_request_counter = itertools.count(1)
+
+broker_http_requests_total = registry.counter(
+    'openalgo_broker_http_requests_total', 'Outbound broker HTTP requests',
+    ('host', 'http_version', 'connection')
+)
+broker_http_phase_ms = registry.histogram(
+    'openalgo_broker_http_phase_ms', 'Outbound broker HTTP phase duration in milliseconds',
+    ('host', 'phase')
+)
+
+class _HTTPPhaseTimer:
+    """httpcore trace callback that timestamps the phases of one request"""
+
+    __slots__ = ('host', 'start', 'marks', 'http_version', 'recorded')
+
+    def __init__(self, host):
+        self.host = host
+        self.start = time.perf_counter()
+        self.marks = {}
+        self.http_version = None
+        self.recorded = False
+
+    def __call__(self, event_name, info):
+        # Event names look like "connection.start_tls.complete" or "http11.response_closed.started"
+        _, _, event = event_name.partition('.')
+        if event not in self.marks:
+            self.marks[event] = time.perf_counter()
+        if event == 'response_closed.started':
+            _record_http_phases(self)
+
+    def _between(self, started, complete):
+        if started in self.marks and complete in self.marks:
+            return (self.marks[complete] - self.marks[started]) * 1000
+        return None
+
+    def phases(self):
+        """Phase durations in milliseconds (connect/TLS only for new connections)"""
+        phases = {}
+        connect = self._between('connect_tcp.started', 'connect_tcp.complete')
+        if connect is not None:
+            phases['http_connect'] = connect
+        tls = self._between('start_tls.started', 'start_tls.complete')
+        if tls is not None:
+            phases['http_tls'] = tls
+        if 'receive_response_headers.complete' in self.marks:
+            phases['http_ttfb'] = (self.marks['receive_response_headers.complete'] - self.start) * 1000
+        end = self.marks.get('response_closed.started', time.perf_counter())
+        phases['http_total'] = (end - self.start) * 1000
+        return phases
+
+class _AsyncHTTPPhaseTimer(_HTTPPhaseTimer):
+    """Async variant of the trace callback (httpcore awaits it on async connections)"""
+
+    __slots__ = ()
+
+    async def __call__(self, event_name, info):
+        _HTTPPhaseTimer.__call__(self, event_name, info)
+
+def _record_http_phases(timer):
+    """Feed one request's phase timings into the metrics registry and latency sketches"""
+    if timer.recorded:
+        return
+    timer.recorded = True
+    try:
+        phases = timer.phases()
+        connection = 'new' if 'connect_tcp.started' in timer.marks else 'reused'
+        http_version = timer.http_version or 'unknown'
+        broker_http_requests_total.inc(host=timer.host, http_version=http_version, connection=connection)
+        for phase, value in phases.items():
+            broker_http_phase_ms.observe(value, host=timer.host, phase=phase[5:])
+
+        from database.latency_db import latency_sketches, HTTP_SKETCH_TYPE
+        latency_sketches.add(timer.host, HTTP_SKETCH_TYPE, phases)
+
+        if HTTP_LOG_SAMPLE_EVERY and next(_request_counter) % HTTP_LOG_SAMPLE_EVERY == 0:
+            logger.info(
+                f"Broker HTTP sample: {timer.host} {http_version} ({connection} connection) "
+                f"total={phases['http_total']:.1f}ms ttfb={phases.get('http_ttfb', 0):.1f}ms"
+            )
+    except Exception as e:
+        logger.debug(f"Error recording broker HTTP timings: {e}")
+
+# Traffic classes with their own connection pool per host
+TRAFFIC_ORDERS = 'orders'
+TRAFFIC_DATA = 'data'
+
+def _pool_limits(traffic_class: str) -> httpx.Limits:
+    """Connection limits of one per-host pool, configurable per traffic class"""
+    prefix = f'HTTP_{traffic_class.upper()}_POOL'
+    defaults = {TRAFFIC_ORDERS: (10, 20, 300.0), TRAFFIC_DATA: (10, 30, 120.0)}[traffic_class]
+    return httpx.Limits(
+        max_keepalive_connections=int(os.getenv(f'{prefix}_KEEPALIVE', str(defaults[0]))),
+        max_connections=int(os.getenv(f'{prefix}_MAX_CONNECTIONS', str(defaults[1]))),
+        keepalive_expiry=float(os.getenv(f'{prefix}_KEEPALIVE_EXPIRY', str(defaults[2])))
+    )
+
+def classify_traffic(request: httpx.Request) -> str:
+    """
+    Return the traffic class of a request: 'data' when tagged with
+    extensions={'traffic_class': 'data'} (broker data modules, master contract
+    downloads), otherwise 'orders'
+    """
+    traffic_class = request.extensions.get('traffic_class')
+    return TRAFFIC_DATA if traffic_class == TRAFFIC_DATA else TRAFFIC_ORDERS
+
+class _BrokerPools:
+    """Separate connection pool per (broker host, traffic class)"""
+
+    transport_class = httpx.HTTPTransport
+
+    def __init__(self, http2: bool = True, verify=True, proxy: Optional[str] = None):
+        self.http2 = http2
+        self.verify = verify
+        self.proxy = proxy
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def get_pool(self, host: str, traffic_class: str) -> httpx.HTTPTransport:
+        key = (host, traffic_class)
+        pool = self._pools.get(key)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    pool = self._pools[key] = self.transport_class(
+                        http2=self.http2, http1=True, verify=self.verify, limits=_pool_limits(traffic_class),
+                        proxy=self.proxy
+                    )
+                    logger.debug(f"Created {traffic_class} connection pool for {host}")
+        return pool
+
+    def _take_pools(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        return pools
+
+    def get_stats(self):
+        """Open connections per pool"""
+        with self._lock:
+            pools = list(self._pools.items())
+        stats = []
+        for (host, traffic_class), pool in pools:
+            connections = getattr(getattr(pool, '_pool', None), 'connections', [])
+            stats.append({
+                'host': host,
+                'traffic_class': traffic_class,
+                'connections': len(connections),
+                'idle': sum(1 for c in connections if c.is_idle())
+            })
+        return stats
+
+class BrokerPoolTransport(_BrokerPools, httpx.BaseTransport):
+    """
+    Transport that keeps a separate connection pool per (broker host, traffic class).
+    Callers can force a class with extensions={'traffic_class': 'data'}.
+    """
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self.get_pool(request.url.host, classify_traffic(request)).handle_request(request)
+
+    def close(self):
+        for pool in self._take_pools():
+            pool.close()
+
+class AsyncBrokerPoolTransport(_BrokerPools, httpx.AsyncBaseTransport):
+    """Async counterpart of BrokerPoolTransport"""
+
+    transport_class = httpx.AsyncHTTPTransport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.get_pool(request.url.host, classify_traffic(request)).handle_async_request(request)
+
+    async def aclose(self):
+        for pool in self._take_pools():
+            await pool.aclose()
+
+def _proxy_mounts(transport_class, http2: bool, verify=True) -> dict:
+    """
+    Mounts for the HTTP(S)_PROXY / ALL_PROXY / NO_PROXY environment settings.
+    httpx ignores them once a custom transport is given, so proxied URL patterns
+    get their own pooled transport (NO_PROXY patterns map to None: the default transport).
+    """
+    from httpx._utils import get_environment_proxies
+    return {
+        pattern: None if proxy is None else transport_class(http2=http2, verify=verify, proxy=proxy)
+        for pattern, proxy in get_environment_proxies().items()
+    }
+
+def _on_request(request: httpx.Request):
+    """Event hook: attach a phase timer to the outgoing request"""
+    request.extensions['trace'] = _HTTPPhaseTimer(request.url.host)
+
+def _on_response(response: httpx.Response):
+    """Event hook: note the negotiated protocol for the phase timer"""
+    timer = response.request.extensions.get('trace')
+    if isinstance(timer, _HTTPPhaseTimer):
+        timer.http_version = response.http_version
+
+async def _on_request_async(request: httpx.Request):
+    request.extensions['trace'] = _AsyncHTTPPhaseTimer(request.url.host)
+
+async def _on_response_async(response: httpx.Response):
+    _on_response(response)
+
+def _http2_enabled() -> bool:
+    """HTTP/2 is disabled in standalone/Docker mode to avoid protocol negotiation issues"""
+    app_mode = os.environ.get('APP_MODE', 'integrated').strip().strip("'\"")
+    return app_mode != 'standalone'
+
 def get_httpx_client() -> httpx.Client:
     """
     Returns an HTTP client with automatic protocol negotiation.
@@ -48,13 +291,7 @@ def request(
         httpx.HTTPError: If the request fails
     """
     client = get_httpx_client()
-    response = client.request(method, url, **kwargs)
-    
-    # Log the actual HTTP version used (info level for visibility)
-    if response.http_version:
-        logger.info(f"Request used {response.http_version} - URL: {url[:50]}...")
-    
-    return response
+    return client.request(method, url, **kwargs)
 
 # Shortcut methods for common HTTP methods
 def get(url: str, **kwargs) -> httpx.Response:
@@ -78,28 +315,24 @@ def _create_http_client() -> httpx.Client:
     Returns:
         httpx.Client: A configured HTTP client with protocol auto-negotiation
     """
-    import os
-    
     try:
         # Detect if running in standalone mode (Docker/production) vs integrated mode (local dev)
-        # In standalone mode, disable HTTP/2 to avoid protocol negotiation issues
-        app_mode = os.environ.get('APP_MODE', 'integrated').strip().strip("'\"")
-        is_standalone = app_mode == 'standalone'
-
         # Disable HTTP/2 in standalone/Docker environments to avoid protocol negotiation issues
-        http2_enabled = not is_standalone
+        http2_enabled = _http2_enabled()
+        is_standalone = not http2_enabled
         
         client = httpx.Client(
-            http2=http2_enabled,  # Disable HTTP/2 in standalone mode, enable in integrated mode
-            http1=True,  # Always enable HTTP/1.1 for compatibility
-            timeout=120.0,  # Increased timeout for large historical data requests
-            limits=httpx.Limits(
-                max_keepalive_connections=20,  # Balanced for most broker APIs
-                max_connections=50,  # Reasonable max without overloading
-                keepalive_expiry=120.0  # 2 minutes - good balance
+            # Separate pools per broker host and traffic class (orders vs data), limits from env
+            transport=BrokerPoolTransport(
+                http2=http2_enabled,  # Disable HTTP/2 in standalone mode, enable in integrated mode
+                # Add verify parameter to handle SSL/TLS issues in standalone mode
+                verify=True  # Can be set to False for debugging SSL issues (not recommended for production)
             ),
-            # Add verify parameter to handle SSL/TLS issues in standalone mode
-            verify=True  # Can be set to False for debugging SSL issues (not recommended for production)
+            # Keep HTTP_PROXY/HTTPS_PROXY/NO_PROXY working alongside the custom transport
+            mounts=_proxy_mounts(BrokerPoolTransport, http2_enabled),
+            timeout=120.0,  # Increased timeout for large historical data requests
+            # Per-phase timing (connect, TLS, TTFB, total) per broker host
+            event_hooks={'request': [_on_request], 'response': [_on_response]}
         )
         
         if is_standalone:
@@ -114,14 +347,156 @@ def _create_http_client() -> httpx.Client:
         raise
 
 
+def get_pool_stats():
+    """Connection counts per broker host and traffic class of the shared client"""
+    if _httpx_client is None:
+        return []
+    # The main transport plus the pooled transports of proxied URL patterns
+    transports = [getattr(_httpx_client, '_transport', None)] + list(getattr(_httpx_client, '_mounts', {}).values())
+    return [stats for transport in transports if isinstance(transport, BrokerPoolTransport) for stats in transport.get_stats()]
+
+
+# Async clients are bound to the event loop that created their connections
+_async_clients = weakref.WeakKeyDictionary()
+_async_loop = None
+_async_loop_lock = threading.Lock()
+
+def get_async_httpx_client() -> httpx.AsyncClient:
+    """
+    Returns the async HTTP client for the running event loop, with the same
+    per-host pools, timeouts and phase timing as the sync client.
+    Must be called from inside a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            transport=AsyncBrokerPoolTransport(http2=_http2_enabled(), verify=True),
+            mounts=_proxy_mounts(AsyncBrokerPoolTransport, _http2_enabled()),
+            timeout=120.0,
+            event_hooks={'request': [_on_request_async], 'response': [_on_response_async]}
+        )
+        _async_clients[loop] = client
+        logger.debug("Created async HTTP client for event loop")
+    return client
+
+async def async_request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Async counterpart of request() using the loop's shared async client"""
+    client = get_async_httpx_client()
+    return await client.request(method, url, **kwargs)
+
+async def async_get_json(method: str, url: str, **kwargs):
+    """
+    Make an async request and decode the JSON body the way the broker
+    get_api_response helpers do: empty or invalid bodies give {}.
+    Use async_request when the status code is needed.
+    """
+    response = await async_request(method, url, **kwargs)
+    if not response.text:
+        return {}
+    try:
+        return json.loads(response.text)
+    except json.JSONDecodeError:
+        logger.error(f"Failed to parse JSON response from {url[:80]}: {response.text[:200]}")
+        return {}
+
+def _get_async_loop():
+    """Start (once) the background event loop used by run_async"""
+    global _async_loop
+    if _async_loop is not None and _async_loop.is_running():
+        return _async_loop
+    with _async_loop_lock:
+        if _async_loop is None or not _async_loop.is_running():
+            loop = asyncio.new_event_loop()
+            started = original_threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            original_threading.Thread(target=_run, name='BrokerAsyncIO', daemon=True).start()
+            started.wait()
+            _async_loop = loop
+    return _async_loop
+
+def _wait_native(event, timeout: Optional[float]) -> bool:
+    """
+    Wait for an event set by the background loop's OS thread. A greenthread of a
+    monkey-patched eventlet worker cannot block on it directly (that stalls the hub)
+    or on a patched lock (the loop thread cannot switch to it), so it waits in an
+    eventlet.tpool thread, which wakes the hub when the wait returns.
+    """
+    if eventlet is not None and eventlet.patcher.is_monkey_patched('thread'):
+        from eventlet import tpool
+        return tpool.execute(event.wait, timeout)
+    return event.wait(timeout)
+
+def run_async(coro, timeout: Optional[float] = None):
+    """
+    Run a coroutine on the shared background event loop from synchronous code
+    and return its result, e.g. run_async(asyncio.gather(*calls)).
+    Raises TimeoutError (and cancels the coroutine) if it takes longer than timeout.
+    """
+    loop = _get_async_loop()
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if running_loop is loop:
+        coro.close()
+        raise RuntimeError("run_async cannot be called from the shared event loop; await the coroutine instead")
+
+    # The result is handed back through a native event rather than a concurrent.futures
+    # Future: under eventlet the Future's condition is a green lock the loop thread cannot notify
+    done = original_threading.Event()
+    outcome = {}
+
+    def _start():
+        try:
+            task = asyncio.ensure_future(coro)
+        except BaseException as e:
+            outcome['error'] = e
+            done.set()
+            return
+        outcome['task'] = task
+        task.add_done_callback(lambda _: done.set())
+
+    loop.call_soon_threadsafe(_start)
+    if not _wait_native(done, timeout):
+        loop.call_soon_threadsafe(lambda: outcome['task'].cancel() if 'task' in outcome else None)
+        raise TimeoutError(f"Coroutine did not finish within {timeout} seconds")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['task'].result()
+
+def run_concurrently(coros, timeout: Optional[float] = None):
+    """Run several coroutines concurrently; results keep input order, failures are returned as exceptions"""
+    async def _gather():
+        return await asyncio.gather(*coros, return_exceptions=True)
+    return run_async(_gather(), timeout)
+
+
 def cleanup_httpx_client():
     """
     Closes the global httpx client and releases its resources.
     Should be called when the application is shutting down.
     """
-    global _httpx_client
+    global _httpx_client, _async_loop
     
     if _httpx_client is not None:
         _httpx_client.close()
         _httpx_client = None
         logger.info("Closed HTTP client")
+
+    # Close the async client of the background loop and stop the loop
+    loop = _async_loop
+    if loop is not None and loop.is_running():
+        client = _async_clients.pop(loop, None)
+        if client is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(10)
+            except Exception as e:
+                logger.debug(f"Error closing async HTTP client: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        _async_loop = None
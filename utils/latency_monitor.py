@@ -1,9 +1,10 @@
 import time
 from functools import wraps
 from flask import g, request
-from database.latency_db import OrderLatency, latency_session, init_latency_db
+from database.latency_db import OrderLatency, latency_session, init_latency_db, latency_sketches
 from database.auth_db import get_broker_name
 from utils.logging import get_logger
+from utils.metrics import order_stage_latency_ms
 from flask_restx import Resource
 
 logger = get_logger(__name__)
@@ -52,6 +53,11 @@ class LatencyTracker:
         return (self.stage_times.get('validation', 0) + 
                 self.stage_times.get('broker_response', 0))
 
+def observe_stage_metrics(broker, api_type, latencies):
+    """Feed stage latencies (ms) into the metrics registry"""
+    for stage, value in latencies.items():
+        order_stage_latency_ms.observe(value, broker=broker or 'unknown', api_type=api_type, stage=stage)
+
 def track_latency(api_type):
     """Decorator to track latency for API endpoints"""
     def decorator(f):
@@ -116,19 +122,25 @@ def track_latency(api_type):
                 if 'apikey' in request_data:
                     broker_name = get_broker_name(request_data['apikey'])
                 
+                latencies = {
+                    'rtt': rtt,  # Round-trip time (comparable to Postman/Bruno)
+                    'validation': tracker.stage_times.get('validation', 0),
+                    'broker_response': tracker.stage_times.get('broker_response', 0),
+                    'overhead': overhead,
+                    'total': total
+                }
+                
+                # Update the streaming per-stage percentile sketches and metrics (in memory)
+                latency_sketches.add(broker_name, api_type, latencies)
+                observe_stage_metrics(broker_name, api_type, latencies)
+                
                 OrderLatency.log_latency(
                     order_id=order_id,
                     user_id=g.get('user_id'),
                     broker=broker_name,
                     symbol=request_data.get('symbol'),
                     order_type=api_type,
-                    latencies={
-                        'rtt': rtt,  # Round-trip time (comparable to Postman/Bruno)
-                        'validation': tracker.stage_times.get('validation', 0),
-                        'broker_response': tracker.stage_times.get('broker_response', 0),
-                        'overhead': overhead,
-                        'total': total
-                    },
+                    latencies=latencies,
                     request_body=request_data,
                     response_body=response_data,
                     status='SUCCESS' if status_code < 400 else 'FAILED',
@@ -148,19 +160,23 @@ def track_latency(api_type):
                 if 'request_data' in locals() and 'apikey' in request_data:
                     broker_name = get_broker_name(request_data['apikey'])
                 
+                latencies = {
+                    'rtt': rtt,
+                    'validation': tracker.stage_times.get('validation', 0),
+                    'broker_response': 0,
+                    'overhead': overhead,
+                    'total': total_time
+                }
+                latency_sketches.add(broker_name, api_type, latencies)
+                observe_stage_metrics(broker_name, api_type, latencies)
+                
                 OrderLatency.log_latency(
                     order_id='error',
                     user_id=g.get('user_id'),
                     broker=broker_name,
                     symbol=request_data.get('symbol') if 'request_data' in locals() else None,
                     order_type=api_type,
-                    latencies={
-                        'rtt': rtt,
-                        'validation': tracker.stage_times.get('validation', 0),
-                        'broker_response': 0,
-                        'overhead': overhead,
-                        'total': total_time
-                    },
+                    latencies=latencies,
                     request_body=request_data if 'request_data' in locals() else None,
                     response_body=None,
                     status='FAILED',
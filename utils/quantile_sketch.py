@@ -0,0 +1,143 @@
+"""
+Mergeable streaming quantile sketch for latency measurements.
+
+A log-bucketed sketch (DDSketch style): every value is mapped to a bucket whose
+width grows geometrically, so any quantile is answered within a fixed relative
+error (1% by default) using constant memory. Sketches built in different
+processes or time windows merge by adding bucket counts, and serialize to a
+small zlib-compressed blob for storage in the latency DB.
+"""
+
+import math
+import struct
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+# Values at or below this (in ms) are counted as zero
+MIN_TRACKED_VALUE = 1e-3
+
+_HEADER = struct.Struct('<BdIQddd')  # version, alpha, bins, zero_count, min, max, sum
+_BIN = struct.Struct('<iI')          # bucket index, count
+_VERSION = 1
+
+class QuantileSketch:
+    """Relative-error quantile sketch with bounded memory"""
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        """Add a value (negative values are clamped to zero)"""
+        if value is None or count <= 0:
+            return
+        value = max(float(value), 0.0)
+        if value <= MIN_TRACKED_VALUE:
+            self.zero_count += count
+        else:
+            index = self._index(value)
+            self.bins[index] = self.bins.get(index, 0) + count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def _collapse(self):
+        """Fold the lowest buckets together to respect max_bins (keeps tail accuracy)"""
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins + 1
+        target = indexes[excess]
+        self.bins[target] += sum(self.bins.pop(i) for i in indexes[:excess])
+
+    def merge(self, other: 'QuantileSketch'):
+        """Merge another sketch (must use the same relative accuracy) into this one"""
+        if other.count == 0:
+            return self
+        if not math.isclose(other.gamma, self.gamma):
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Return the estimated value at quantile q (0..1), or 0 for an empty sketch"""
+        if self.count == 0:
+            return 0.0
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(self.min, 0.0)
+
+        cumulative = self.zero_count
+        for index in sorted(self.bins):
+            cumulative += self.bins[index]
+            if cumulative > rank:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs: Iterable[float]) -> List[float]:
+        """Return several quantiles in one call"""
+        return [self.quantile(q) for q in qs]
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def to_bytes(self) -> bytes:
+        """Serialize to a compact compressed blob"""
+        header = _HEADER.pack(
+            _VERSION, self.relative_accuracy, len(self.bins), self.zero_count,
+            self.min if self.count else 0.0, self.max if self.count else 0.0, self.sum
+        )
+        body = b''.join(_BIN.pack(index, count) for index, count in sorted(self.bins.items()))
+        return zlib.compress(header + body)
+
+    @classmethod
+    def from_bytes(cls, blob: Optional[bytes]) -> 'QuantileSketch':
+        """Deserialize a blob produced by to_bytes (None gives an empty sketch)"""
+        if not blob:
+            return cls()
+        data = zlib.decompress(blob)
+        version, alpha, bin_count, zero_count, minimum, maximum, total = _HEADER.unpack_from(data)
+        if version != _VERSION:
+            raise ValueError(f"Unsupported sketch version: {version}")
+        sketch = cls(relative_accuracy=alpha)
+        offset = _HEADER.size
+        for _ in range(bin_count):
+            index, count = _BIN.unpack_from(data, offset)
+            sketch.bins[index] = count
+            offset += _BIN.size
+        sketch.zero_count = zero_count
+        sketch.count = zero_count + sum(sketch.bins.values())
+        sketch.sum = total
+        if sketch.count:
+            sketch.min = minimum
+            sketch.max = maximum
+        return sketch
@@ -0,0 +1,194 @@
+"""
+Process-wide token-bucket rate governor for outbound broker calls.
+
+Every service that calls a broker (REST API, webhooks, sandbox, MCP and
+Telegram all go through the services layer) acquires a token for the broker
+and endpoint class first, so we run as fast as the broker allows without
+tripping its 429s. Bulk operations that make one broker call per order
+(cancel all orders, close all positions) acquire inside the broker's loop,
+one token per call; an order that cannot get a token is recorded as failed
+and the loop moves on, so the caller learns which orders and positions were
+left untouched instead of getting a bare 429 halfway through. Limits use the same "N per second/minute" format as the
+Flask limiter settings and can be overridden per broker and class:
+
+    ANGEL_ORDERS_RATE_LIMIT="20 per second"
+    ZERODHA_HISTORY_RATE_LIMIT="3 per second"
+
+Without an override, the broker's documented limit from BROKER_RATE_LIMITS is
+used, then the global BROKER_<CLASS>_RATE_LIMIT default.
+"""
+
+import os
+import asyncio
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from utils.logging import get_logger
+from utils.metrics import registry
+
+logger = get_logger(__name__)
+
+# Endpoint classes
+ORDERS = 'orders'
+QUOTES = 'quotes'
+HISTORY = 'history'
+
+# Defaults when a broker has no specific limit
+DEFAULT_RATE_LIMITS = {
+    ORDERS: os.getenv('BROKER_ORDERS_RATE_LIMIT', os.getenv('ORDER_RATE_LIMIT', '10 per second')),
+    QUOTES: os.getenv('BROKER_QUOTES_RATE_LIMIT', '10 per second'),
+    HISTORY: os.getenv('BROKER_HISTORY_RATE_LIMIT', '3 per second'),
+}
+
+# Published per-broker API limits
+BROKER_RATE_LIMITS = {
+    'zerodha': {ORDERS: '10 per second', QUOTES: '1 per second', HISTORY: '3 per second'},
+    'angel': {ORDERS: '20 per second', QUOTES: '10 per second', HISTORY: '3 per second'},
+}
+
+# Longest time a caller waits for a token before the call is rejected
+MAX_WAIT_SECONDS = float(os.getenv('BROKER_RATE_MAX_WAIT', '10'))
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+rate_wait_ms = registry.histogram(
+    'openalgo_broker_rate_wait_ms', 'Time spent waiting for the broker rate governor in milliseconds',
+    ('broker', 'endpoint_class')
+)
+rate_rejected_total = registry.counter(
+    'openalgo_broker_rate_rejected_total', 'Broker calls rejected after waiting for the rate governor',
+    ('broker', 'endpoint_class')
+)
+
+def parse_rate_limit(limit: str) -> Tuple[int, float]:
+    """Parse '10 per second' or '100/minute' into (count, period seconds)"""
+    text = limit.strip().strip("'\"").lower().replace('/', ' per ')
+    count, _, period = text.partition(' per ')
+    period = period.strip().rstrip('s') or 'second'
+    if period not in _PERIODS:
+        raise ValueError(f"Invalid rate limit: {limit}")
+    return int(count), _PERIODS[period]
+
+class TokenBucket:
+    """Thread-safe token bucket; capacity equals the per-period count"""
+
+    def __init__(self, count: int, period: float = 1.0):
+        self.capacity = max(count, 1)
+        self.rate = self.capacity / period
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_limit(cls, limit: str) -> 'TokenBucket':
+        return cls(*parse_rate_limit(limit))
+
+    def _reserve(self, tokens: float) -> float:
+        """Take tokens now (possibly going negative) and return the wait needed before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def _refund(self, tokens: float):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> float:
+        """
+        Block until tokens are available. Returns the seconds waited, or -1 if
+        the wait would exceed timeout (no tokens are taken in that case).
+        """
+        wait = self._reserve(tokens)
+        if wait <= 0:
+            return 0.0
+        if timeout is not None and wait > timeout:
+            self._refund(tokens)
+            return -1
+        time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1, timeout: Optional[float] = None) -> float:
+        """Async variant of acquire that yields to the event loop while waiting"""
+        wait = self._reserve(tokens)
+        if wait <= 0:
+            return 0.0
+        if timeout is not None and wait > timeout:
+            self._refund(tokens)
+            return -1
+        await asyncio.sleep(wait)
+        return wait
+
+class RateGovernor:
+    """Token buckets keyed by (broker, endpoint class)"""
+
+    def __init__(self, max_wait: float = MAX_WAIT_SECONDS):
+        self.max_wait = max_wait
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def get_limit(self, broker: str, endpoint_class: str) -> str:
+        """Configured limit string for a broker and endpoint class"""
+        override = os.getenv(f'{broker.upper()}_{endpoint_class.upper()}_RATE_LIMIT')
+        if override:
+            return override
+        return BROKER_RATE_LIMITS.get(broker, {}).get(endpoint_class, DEFAULT_RATE_LIMITS[endpoint_class])
+
+    def get_bucket(self, broker: str, endpoint_class: str) -> TokenBucket:
+        key = (broker or 'unknown', endpoint_class)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    limit = self.get_limit(key[0], endpoint_class)
+                    try:
+                        bucket = TokenBucket.from_limit(limit)
+                    except ValueError:
+                        logger.error(f"Invalid rate limit '{limit}' for {key[0]} {endpoint_class}, using default")
+                        bucket = TokenBucket.from_limit(DEFAULT_RATE_LIMITS[endpoint_class])
+                    self._buckets[key] = bucket
+        return bucket
+
+    def _observe(self, broker, endpoint_class, waited):
+        if waited < 0:
+            rate_rejected_total.inc(broker=broker, endpoint_class=endpoint_class)
+            logger.warning(f"Broker rate limit budget exhausted for {broker} {endpoint_class}")
+            return False
+        if waited > 0:
+            rate_wait_ms.observe(waited * 1000, broker=broker, endpoint_class=endpoint_class)
+        return True
+
+    def acquire(self, broker: str, endpoint_class: str, tokens: float = 1) -> bool:
+        """Wait for a token; returns False if none is available within max_wait"""
+        waited = self.get_bucket(broker, endpoint_class).acquire(tokens, self.max_wait)
+        return self._observe(broker, endpoint_class, waited)
+
+    async def acquire_async(self, broker: str, endpoint_class: str, tokens: float = 1) -> bool:
+        """Async variant of acquire"""
+        waited = await self.get_bucket(broker, endpoint_class).acquire_async(tokens, self.max_wait)
+        return self._observe(broker, endpoint_class, waited)
+
+def rate_limited_response(endpoint_class: str) -> dict:
+    """Error body returned when the governor cannot grant a token in time"""
+    return {
+        'status': 'error',
+        'message': f'Broker {endpoint_class} rate limit reached. Please retry shortly.'
+    }
+
+def rate_limited_squareoff_response(skipped_positions: list) -> dict:
+    """
+    Error body for a close-all loop that kept going past positions it could
+    not get an order token for, naming the positions that are still open
+    """
+    return {
+        'status': 'error',
+        'message': (f'Broker {ORDERS} rate limit reached. Positions not squared off: '
+                    f'{", ".join(str(p) for p in skipped_positions)}. Please retry shortly.'),
+        'failed_positions': list(skipped_positions)
+    }
+
+# Global governor
+rate_governor = RateGovernor()
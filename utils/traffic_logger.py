@@ -1,11 +1,125 @@
-from flask import request, g, has_request_context
-from database.traffic_db import TrafficLog, logs_session
+from flask import request, g, session, has_request_context
+from database.traffic_db import TrafficLog, logs_session, UNMATCHED_ROUTE
+import os
 import time
+import queue
+from datetime import datetime, timezone
+import atexit
+import threading
 from utils.logging import get_logger
 from utils.ip_helper import get_real_ip
+from utils.metrics import http_requests_total, http_request_duration_ms, method_label
 
 logger = get_logger(__name__)
 
+class TrafficLogWriter:
+    """
+    Write-behind pipeline for traffic logs.
+    Requests only enqueue a row; a background thread bulk-inserts batches every
+    flush_interval seconds or batch_size rows, so logging I/O stays off the request path.
+    """
+
+    def __init__(self, max_queue_size=10000, batch_size=500, flush_interval=0.25):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+        self.written = 0
+
+    def start(self):
+        """Start the background writer thread (idempotent)"""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='TrafficLogWriter', daemon=True)
+            self._thread.start()
+
+    def submit(self, row):
+        """Queue a row for writing; drops (and counts) the row if the queue is full"""
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Traffic log queue full, {self.dropped} rows dropped so far")
+            return False
+
+    def queue_depth(self):
+        """Number of rows waiting to be written"""
+        return self._queue.qsize()
+
+    def _drain(self, batch):
+        """Move queued rows into batch without blocking, up to batch_size"""
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            if TrafficLog.log_requests_bulk(batch):
+                self.written += len(batch)
+            else:
+                self.dropped += len(batch)
+        finally:
+            logs_session.remove()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                first_row = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            # Let the batch fill for up to flush_interval or batch_size rows
+            batch = [first_row]
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                self._drain(batch)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                time.sleep(min(0.05, remaining))
+            self._write(batch)
+
+    def flush(self):
+        """Write everything currently queued (called on shutdown)"""
+        while True:
+            batch = self._drain([])
+            if not batch:
+                break
+            self._write(batch)
+
+    def shutdown(self):
+        """Stop the writer thread and flush remaining rows"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self.flush()
+
+    def get_stats(self):
+        """Writer statistics for monitoring"""
+        return {
+            'queue_depth': self.queue_depth(),
+            'written': self.written,
+            'dropped': self.dropped
+        }
+
+# Global traffic log writer
+traffic_log_writer = TrafficLogWriter(
+    max_queue_size=int(os.getenv('TRAFFIC_LOG_QUEUE_SIZE', '10000')),
+    batch_size=int(os.getenv('TRAFFIC_LOG_BATCH_SIZE', '500')),
+    flush_interval=float(os.getenv('TRAFFIC_LOG_FLUSH_INTERVAL', '0.25'))
+)
+
 class TrafficLoggerMiddleware:
     def __init__(self, app):
         self.app = app
@@ -19,6 +133,7 @@ class TrafficLoggerMiddleware:
         if (path_info.startswith('/static/') or 
             path_info == '/favicon.ico' or 
             path_info.startswith('/api/v1/latency/logs') or
+            path_info == '/metrics' or
             path_info.startswith('/traffic/') or
             path_info.startswith('/traffic/api/')):
             return self.app(environ, start_response)
@@ -32,20 +147,27 @@ class TrafficLoggerMiddleware:
                 
             try:
                 duration_ms = (time.time() - start_time) * 1000
-                TrafficLog.log_request(
-                    client_ip=get_real_ip(),
-                    method=request.method,
-                    path=request.path,
-                    status_code=status_code,
-                    duration_ms=duration_ms,
-                    host=request.host,
-                    error=error,
-                    user_id=getattr(g, 'user_id', None)
-                )
+                # Metric labels and rollup keys use the matched URL rule, so unknown paths
+                # (scanners, 404s) share one series instead of adding one per path
+                route = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+                http_requests_total.inc(method=method_label(request.method), endpoint=route, status=status_code)
+                http_request_duration_ms.observe(duration_ms, endpoint=route)
+                traffic_log_writer.submit({
+                    'route': route,
+                    'broker': getattr(g, 'broker', None) or session.get('broker'),
+                    'client_ip': get_real_ip(),
+                    'method': request.method,
+                    'path': request.path,
+                    'status_code': status_code,
+                    'duration_ms': duration_ms,
+                    'host': request.host,
+                    'error': error[:500] if error else None,
+                    'user_id': getattr(g, 'user_id', None),
+                    # Request time, so the log row and its rollup minute do not depend on when the batch is written
+                    'timestamp': datetime.now(timezone.utc)
+                })
             except Exception as e:
                 logger.error(f"Error logging traffic: {e}")
-            finally:
-                logs_session.remove()
         
         # Store the original start_response to intercept the status code
         def custom_start_response(status, headers, exc_info=None):
@@ -73,5 +195,9 @@ def init_traffic_logging(app):
     from database.traffic_db import init_logs_db
     init_logs_db()
     
+    # Start the background writer and flush queued rows on shutdown
+    traffic_log_writer.start()
+    atexit.register(traffic_log_writer.shutdown)
+    
     # Add middleware
     app.wsgi_app = TrafficLoggerMiddleware(app.wsgi_app)
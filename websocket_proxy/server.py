@@ -16,6 +16,7 @@ from .port_check import is_port_in_use, find_available_port
 from database.auth_db import get_broker_name
 from sqlalchemy import text
 from database.auth_db import verify_api_key
+from utils.metrics import zmq_messages_total, start_metrics_server
 from .broker_factory import create_broker_adapter
 from .base_adapter import BaseBrokerWebSocketAdapter
 
@@ -928,6 +929,8 @@ class WebSocketProxy:
                     logger.warning(f"Invalid mode in topic: {mode_str}")
                     continue
                 
+                zmq_messages_total.inc(broker=broker_name, mode=mode_str)
+                
                 # Find clients subscribed to this data
                 # Create a snapshot of the subscriptions before iteration to avoid
                 # 'dictionary changed size during iteration' errors
@@ -1019,4 +1022,10 @@ async def main():
                 logger.error(f"Error during cleanup: {cleanup_error}")
 
 if __name__ == "__main__":
+    # Standalone (Docker) mode: the app's /metrics cannot see this process, so the
+    # proxy serves its own registry when WEBSOCKET_METRICS_PORT is set
+    load_dotenv()
+    metrics_port = os.getenv('WEBSOCKET_METRICS_PORT')
+    if metrics_port:
+        start_metrics_server(os.getenv('WEBSOCKET_HOST', '127.0.0.1'), int(metrics_port))
     aio.run(main())
\ No newline at end of file